@@ -0,0 +1,118 @@
+"""
+Maintenance commands for the budget database.
+
+    python -m app.commands migrate
+    python -m app.commands verify-summary
+    python -m app.commands rebuild-summary
+    python -m app.commands archive --before 2025-01
+    python -m app.commands purge-idempotency-keys
+    python -m app.commands compact-changes
+"""
+
+import argparse
+import sys
+from dataclasses import replace
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.database import create_database_engine, migrate_database
+from app.repositories.archive_repository import ArchiveRepository
+from app.repositories.change_repository import ChangeRepository
+from app.repositories.summary_repository import SummaryRepository
+from app.repositories.transaction_repository import TransactionRepository
+from app.settings import Settings
+
+
+def verify_summary(session: Session, arguments: argparse.Namespace) -> int:
+    drifts = SummaryRepository(session=session).verify_totals()
+    for drift in drifts:
+        print(
+            f"category {drift.category_id} {drift.currency}: "
+            f"stored total {drift.stored_total} ({drift.stored_transaction_count} transactions), "
+            f"expected {drift.expected_total} ({drift.expected_transaction_count} transactions)"
+        )
+    print(f"{len(drifts)} drifted buckets")
+    return 1 if drifts else 0
+
+
+def rebuild_summary(session: Session, arguments: argparse.Namespace) -> int:
+    summary_repository = SummaryRepository(session=session)
+    drifts = summary_repository.verify_totals()
+    summary_repository.rebuild_totals()
+    print(f"summary rebuilt, {len(drifts)} drifted buckets fixed")
+    return 0
+
+
+def migrate(session: Session, arguments: argparse.Namespace) -> int:
+    # NOTE: the schema is already migrated before running any command
+    print("database migrated")
+    return 0
+
+
+def archive(session: Session, arguments: argparse.Namespace) -> int:
+    created = ArchiveRepository(session=session).create_archive(before=arguments.before)
+    if created is None:
+        print("nothing to archive")
+    else:
+        print(f"{created.transaction_count} transactions archived to {created.file_name}")
+    return 0
+
+
+def purge_idempotency_keys(session: Session, arguments: argparse.Namespace) -> int:
+    deleted = TransactionRepository(session=session).delete_expired_idempotency_keys()
+    print(f"{deleted} expired idempotency keys deleted")
+    return 0
+
+
+def compact_changes(session: Session, arguments: argparse.Namespace) -> int:
+    before = datetime.now(UTC).replace(tzinfo=None) - timedelta(seconds=arguments.retention)
+    deleted = ChangeRepository(session=session).compact_changes(before=before)
+    print(f"{deleted} superseded changes deleted")
+    return 0
+
+
+COMMANDS = {
+    "migrate": migrate,
+    "verify-summary": verify_summary,
+    "rebuild-summary": rebuild_summary,
+    "archive": archive,
+    "purge-idempotency-keys": purge_idempotency_keys,
+    "compact-changes": compact_changes,
+}
+
+
+def main(arguments: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=COMMANDS)
+    parser.add_argument("--database-url", help="defaults to BUDGET_DATABASE_URL or sqlite:///budget.db")
+    parser.add_argument(
+        "--before",
+        type=lambda month: datetime.strptime(month, "%Y-%m").date(),
+        help="archive: the month (YYYY-MM) whose previous transactions are archived",
+    )
+    parser.add_argument(
+        "--retention",
+        type=float,
+        help="compact-changes: seconds the superseded changes are kept, defaults to BUDGET_CHANGES_RETENTION",
+    )
+    parsed = parser.parse_args(arguments)
+    if parsed.command == "archive" and parsed.before is None:
+        parser.error("archive needs --before")
+
+    settings = Settings.from_environment()
+    if parsed.database_url:
+        settings = replace(settings, database_url=parsed.database_url)
+    if parsed.retention is None:
+        parsed.retention = settings.changes_retention
+    engine = create_database_engine(settings)
+    migrate_database(engine)
+    try:
+        with (session := Session(bind=engine)).begin():
+            return COMMANDS[parsed.command](session, parsed)
+    finally:
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
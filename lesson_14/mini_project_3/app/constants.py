@@ -10,3 +10,7 @@ class Currencies(StrEnum):
     SYRIAN_POUND = "SYRIAN_POUND"
     UK_POUND = "UK_POUND"
     LIRA = "LIRA"
+
+
+# the exchange rates are stored as integers, scaled by this factor
+RATE_SCALE = 1_000_000
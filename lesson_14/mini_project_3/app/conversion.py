@@ -0,0 +1,78 @@
+"""
+Conversion of the summary totals to a single reporting currency.
+
+The (category, currency, total) rows are laid out as a categories x
+currencies matrix of integer minor units and converted with one NumPy
+pass: the matrix product with the rates gives, per category, the exact sum
+of every total in the common reference unit, which is then divided once by
+the rate of the reporting currency and rounded half to even to whole minor
+units. Everything is integer arithmetic, so the results are reproducible.
+"""
+
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+from app.constants import Currencies
+
+
+CURRENCIES = tuple(Currencies)
+_CURRENCY_INDEXES = {currency: index for index, currency in enumerate(CURRENCIES)}
+
+# the products are computed with Python ints (object arrays) past this bound
+_INT64_BOUND = float(2**62)
+
+
+def convert_totals(
+    rows: Sequence[tuple[int, Currencies, int]],
+    *,
+    rates: Mapping[Currencies, int],
+    to: Currencies,
+) -> list[tuple[int, int]]:
+    """
+    Returns the (category_id, total) pairs, ordered by category_id, of the
+    rows converted to the currency to. Every currency of the rows and to
+    itself must have a rate.
+    """
+
+    if not rows:
+        return []
+
+    category_ids, currencies, totals = zip(*rows)
+    category_ids, category_indexes = np.unique(np.array(category_ids, dtype=np.int64), return_inverse=True)
+    matrix = np.zeros((len(category_ids), len(CURRENCIES)), dtype=np.int64)
+    np.add.at(matrix, (category_indexes, [_CURRENCY_INDEXES[currency] for currency in currencies]), totals)
+    return convert_matrix(category_ids, matrix, rates=rates, to=to)
+
+
+def convert_matrix(
+    category_ids: np.ndarray,
+    matrix: np.ndarray,
+    *,
+    rates: Mapping[Currencies, int],
+    to: Currencies,
+) -> list[tuple[int, int]]:
+    """
+    Same as convert_totals, from the categories x CURRENCIES matrix of the
+    totals, whose rows are the sorted category_ids.
+    """
+
+    if not len(category_ids):
+        return []
+
+    rate_vector = np.array([rates.get(currency, 0) for currency in CURRENCIES], dtype=np.int64)
+
+    # NOTE: an upper bound of the products, so they never overflow silently
+    if np.abs(matrix).astype(np.float64).sum(axis=1).max() * float(rate_vector.max()) >= _INT64_BOUND:
+        matrix, rate_vector = matrix.astype(object), rate_vector.astype(object)
+
+    converted = _divide_half_even(matrix @ rate_vector, rates[to])
+    return list(zip(category_ids.tolist(), converted.tolist()))
+
+
+def _divide_half_even(numerators: np.ndarray, denominator: int) -> np.ndarray:
+    # NOTE: not np.divmod, which does not support object arrays
+    quotients, remainders = numerators // denominator, numerators % denominator
+    doubled = remainders * 2
+    round_up = (doubled > denominator) | ((doubled == denominator) & (quotients % 2 == 1))
+    return quotients + round_up.astype(quotients.dtype)
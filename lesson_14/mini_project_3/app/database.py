@@ -0,0 +1,191 @@
+from typing import TypeVar
+
+from sqlalchemy import Connection, Engine, MetaData, create_engine, event, inspect, make_url, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.schema import CreateTable
+
+from app.models import ChangeModel, DbModel
+from app.settings import Settings
+
+
+EngineT = TypeVar("EngineT", Engine, AsyncEngine)
+# execution option of the engines with the BEGIN mode of their transactions
+BEGIN_MODE_OPTION = "sqlite_begin_mode"
+
+
+def create_database_engine(settings: Settings) -> Engine:
+    """
+    Creates the engine for the configured database. The SQLite pragmas are
+    applied once when the pool opens a new connection, instead of once per
+    request, and every pooled connection keeps them until it is closed.
+    """
+
+    engine = create_engine(settings.database_url, **_pool_options(settings))
+    _set_sqlite_pragmas_on_connect(engine, settings)
+    if settings.explicit_transactions:
+        _begin_transactions_explicitly(engine)
+    _detach_databases_on_checkin(engine)
+    return engine
+
+
+def create_async_database_engine(settings: Settings) -> AsyncEngine:
+    """
+    Same as create_database_engine but for the async mode, the sqlite driver
+    of the configured URL is replaced by aiosqlite.
+    """
+
+    url = make_url(settings.database_url).set(drivername="sqlite+aiosqlite")
+    engine = create_async_engine(url, **_pool_options(settings))
+    _set_sqlite_pragmas_on_connect(engine.sync_engine, settings)
+    if settings.explicit_transactions:
+        _begin_transactions_explicitly(engine.sync_engine)
+    _detach_databases_on_checkin(engine.sync_engine)
+    return engine
+
+
+def read_only(engine: EngineT) -> EngineT:
+    """
+    The engine sharing the pool of engine whose transactions begin
+    DEFERRED, so they do not take the write lock of the database.
+    """
+
+    return engine.execution_options(**{BEGIN_MODE_OPTION: "DEFERRED"})
+
+
+def _pool_options(settings: Settings) -> dict:
+    if make_url(settings.database_url).database in (None, "", ":memory:"):
+        # in memory databases use a single connection per thread instead of a pool
+        return {}
+    return {"pool_size": settings.pool_size, "max_overflow": settings.max_overflow}
+
+
+def _set_sqlite_pragmas_on_connect(engine: Engine, settings: Settings) -> None:
+    pragmas = {
+        # SQLite should raise exceptions when wrong foreign keys are used
+        "foreign_keys": "ON",
+        "journal_mode": settings.journal_mode,
+        "synchronous": settings.synchronous,
+        "mmap_size": settings.mmap_size,
+        "cache_size": settings.cache_size,
+        "busy_timeout": settings.busy_timeout,
+    }
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+
+def _begin_transactions_explicitly(engine: Engine) -> None:
+    """
+    The sqlite3 driver only begins a transaction right before the first
+    INSERT, UPDATE or DELETE, so the reads before it are not part of the
+    transaction and the write lock is taken halfway through the request.
+    Instead the driver is left in autocommit mode and every transaction
+    begins IMMEDIATE, taking the write lock up front (waiting up to the
+    busy timeout for it), unless the engine is read_only.
+    """
+
+    @event.listens_for(engine, "connect")
+    def disable_driver_transactions(dbapi_connection, connection_record) -> None:
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def begin(connection: Connection) -> None:
+        connection.exec_driver_sql(f"BEGIN {connection.get_execution_options().get(BEGIN_MODE_OPTION, 'IMMEDIATE')}")
+
+
+def _detach_databases_on_checkin(engine: Engine) -> None:
+    """
+    The archives are attached to the connection which reads or writes them,
+    and a database written in a transaction can only be detached after the
+    commit, so no pooled connection is handed out with an archive attached.
+    """
+
+    @event.listens_for(engine, "checkin")
+    def detach_databases(dbapi_connection, connection_record) -> None:
+        if dbapi_connection is None:
+            return
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA database_list")
+        for _, name, _ in cursor.fetchall():
+            if name not in ("main", "temp"):
+                cursor.execute(f'DETACH DATABASE "{name}"')
+        cursor.close()
+
+
+def migrate_database(engine: Engine) -> None:
+    """
+    Brings the schema of an existing database up to date with the models.
+
+    create_all only creates the missing tables (with their indexes), so the
+    columns and indexes added later to an already existing table are
+    created here, and the tables created before they used AUTOINCREMENT
+    are rebuilt with it.
+    """
+
+    with engine.begin() as connection:
+        _add_missing_columns(connection)
+        _add_autoincrement(connection)
+    DbModel.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        for table in DbModel.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
+
+
+def _add_missing_columns(connection: Connection) -> None:
+    # NOTE: SQLite can only add nullable columns, the existing rows get the column default
+    inspector = inspect(connection)
+    for table in DbModel.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            if column.default is not None:
+                value = column.default.arg(None) if column.default.is_callable else column.default.arg
+                connection.execute(table.update().values({column.name: value}))
+
+
+def _add_autoincrement(connection: Connection) -> None:
+    """
+    SQLite can not alter a primary key, so the table is copied into a new
+    one created with AUTOINCREMENT and renamed back. Its indexes and
+    triggers go with the old table, create_all creates them again. The
+    sequence starts after the highest id the table or the change log has
+    seen, which includes the ids of the rows archived before this ran.
+    """
+
+    for table in DbModel.metadata.sorted_tables:
+        if not table.dialect_options["sqlite"]["autoincrement"]:
+            continue
+        query = text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name")
+        table_sql = connection.execute(query, {"name": table.name}).scalar()
+        if table_sql is None or "AUTOINCREMENT" in table_sql.upper():
+            continue
+
+        # the copy needs the tables of its foreign keys next to it
+        metadata = MetaData()
+        for other_table in DbModel.metadata.sorted_tables:
+            other_table.to_metadata(metadata)
+        rebuilt = table.to_metadata(metadata, name=f"{table.name}_autoincrement")
+        columns = ", ".join(column.name for column in table.columns)
+        connection.execute(CreateTable(rebuilt))
+        connection.execute(text(f"INSERT INTO {rebuilt.name} ({columns}) SELECT {columns} FROM {table.name}"))
+        connection.execute(text(f"DROP TABLE {table.name}"))
+        connection.execute(text(f"ALTER TABLE {rebuilt.name} RENAME TO {table.name}"))
+
+        last_ids = [f"SELECT max(id) FROM {table.name}"]
+        if inspect(connection).has_table(ChangeModel.__tablename__):
+            last_ids.append(f"SELECT max(row_id) FROM {ChangeModel.__tablename__} WHERE table_name = '{table.name}'")
+        last_id = max((connection.execute(text(query)).scalar() or 0 for query in last_ids), default=0)
+        connection.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": table.name})
+        connection.execute(
+            text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"), {"name": table.name, "seq": last_id}
+        )
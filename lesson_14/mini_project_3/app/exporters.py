@@ -0,0 +1,92 @@
+"""
+Export of the transactions (GET /transactions/export) to CSV, Arrow IPC
+stream and Parquet.
+
+The rows come from the cursor in fixed-size batches of plain column rows
+(see EXPORT_COLUMNS), every batch is encoded on its own and yielded as soon
+as it is written, so the memory used does not depend on the number of rows
+and no object is built per row besides the rows of the cursor.
+"""
+
+import csv
+import io
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import dataclass
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# the names and order of EXPORT_COLUMNS, created_at is stored as text in UTC
+EXPORT_SCHEMA = pa.schema(
+    [
+        ("id", pa.int64()),
+        ("category_id", pa.int64()),
+        ("amount", pa.int64()),
+        ("currency", pa.string()),
+        ("created_at", pa.timestamp("us", tz="UTC")),
+    ]
+)
+
+
+def export_csv(batches: Iterable[Sequence[Sequence]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_SCHEMA.names)
+    for rows in batches:
+        writer.writerows(rows)
+        yield _drain(buffer).encode()
+    if remaining := _drain(buffer):
+        # the header, when there were no batches
+        yield remaining.encode()
+
+
+def export_arrow(batches: Iterable[Sequence[Sequence]]) -> Iterator[bytes]:
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, EXPORT_SCHEMA) as writer:
+        for rows in batches:
+            writer.write_batch(_record_batch(rows))
+            yield _drain(sink)
+    yield _drain(sink)
+
+
+def export_parquet(batches: Iterable[Sequence[Sequence]]) -> Iterator[bytes]:
+    # NOTE: every batch is a row group, the footer with their offsets is written at the end
+    sink = io.BytesIO()
+    with pq.ParquetWriter(sink, EXPORT_SCHEMA) as writer:
+        for rows in batches:
+            writer.write_batch(_record_batch(rows))
+            yield _drain(sink)
+    yield _drain(sink)
+
+
+@dataclass(frozen=True)
+class ExportFormat:
+    media_type: str
+    file_extension: str
+    export: Callable[[Iterable[Sequence[Sequence]]], Iterator[bytes]]
+
+
+EXPORT_FORMATS = {
+    "csv": ExportFormat("text/csv", "csv", export_csv),
+    "arrow": ExportFormat("application/vnd.apache.arrow.stream", "arrows", export_arrow),
+    "parquet": ExportFormat("application/vnd.apache.parquet", "parquet", export_parquet),
+}
+
+
+def _record_batch(rows: Sequence[Sequence]) -> pa.RecordBatch:
+    columns = list(zip(*rows)) if rows else [()] * len(EXPORT_SCHEMA)
+    arrays = [pa.array(column, type=field.type) for column, field in zip(columns[:-1], EXPORT_SCHEMA)]
+    # the text of created_at is parsed by arrow instead of building a datetime per row
+    created_at = pa.array(columns[-1], type=pa.string()).cast(pa.timestamp("us"))
+    arrays.append(created_at.cast(EXPORT_SCHEMA.field("created_at").type))
+    return pa.RecordBatch.from_arrays(arrays, schema=EXPORT_SCHEMA)
+
+
+def _drain(buffer: io.StringIO | io.BytesIO) -> str | bytes:
+    """Takes what was written to buffer so far, leaving it empty."""
+
+    value = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return value
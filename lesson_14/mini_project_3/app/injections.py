@@ -1,40 +1,276 @@
-from collections.abc import Generator
-from typing import Annotated
+import inspect
+from collections.abc import AsyncGenerator, Callable, Generator
+from typing import Annotated, Any
 
-from fastapi import Depends, Request
-from sqlalchemy import text
+from fastapi import Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.repositories.category_repository import CategoryRepository
-from app.repositories.summary_repository import SummaryRepository
-from app.repositories.transaction_repository import TransactionRepository
+from app.cache import CacheBackend
+from app.repositories.category_repository import AsyncCategoryRepository, CategoryRepository
+from app.repositories.exchange_rate_repository import ExchangeRateRepository
+from app.repositories.memory_repository import (
+    MemoryCategoryRepository,
+    MemoryExchangeRateRepository,
+    MemoryStore,
+    MemorySummaryRepository,
+    MemoryTransactionRepository,
+    MemoryVersionRepository,
+)
+from app.repositories.summary_repository import AsyncSummaryRepository, SummaryRepository
+from app.repositories.transaction_repository import AsyncTransactionRepository, TransactionRepository
+from app.repositories.version_repository import AsyncVersionRepository, VersionRepository
+from app.settings import Settings
+from app.summary_index import SummaryIndex
+from app.writer import WriterClient
 
 
 def get_session(request: Request) -> Generator[Session]:
     """
     This injection will reuse the already configured database engine
-    from the fastapi instance lifespan.
+    from the fastapi instance lifespan. The SQLite pragmas (like the
+    foreign keys check) are already set on every pooled connection.
+
+    The session is lazy: a connection is only checked out of the pool,
+    and the transaction begun, when a repository runs its first query.
+    It begins DEFERRED, so the requests which only read (whatever their
+    method) do not take the write lock, unless the first query is run by
+    a method marked with writes, which begins it IMMEDIATE instead.
+    """
+
+    with Session(bind=request.app.state.read_only_database_engine) as session:
+        yield session
+        session.commit()
+
+
+async def get_read_only_engine(request: Request) -> Engine:
+    """For the endpoints which read in many short DB transactions instead of one session."""
+
+    return request.app.state.read_only_database_engine
+
+
+async def get_settings(request: Request) -> Settings:
+    return request.app.state.settings
+
+
+async def get_cache(request: Request) -> CacheBackend | None:
+    return request.app.state.cache
+
+
+async def get_idempotency_cache(request: Request) -> CacheBackend | None:
+    return request.app.state.idempotency_cache
+
+
+async def get_writer(request: Request) -> WriterClient | None:
+    return request.app.state.writer
+
+
+async def get_summary_index(request: Request) -> SummaryIndex | None:
+    return request.app.state.summary_index
+
+
+async def get_async_session(request: Request) -> AsyncGenerator[AsyncSession]:
+    """
+    Same as get_session but for the async mode, where the lifespan also
+    configures an async database engine.
     """
 
-    with (session := Session(bind=request.app.state.database_engine)).begin():
-        # SQLite should raise exceptions when wrong foreign keys are used
-        session.execute(text("PRAGMA foreign_keys = ON;"))
+    async with AsyncSession(bind=request.app.state.read_only_async_database_engine) as session:
         yield session
+        await session.commit()
 
 
 def get_category_repository(
     session: Annotated[Session, Depends(get_session)],
+    cache: Annotated[CacheBackend | None, Depends(get_cache)],
+    writer: Annotated[WriterClient | None, Depends(get_writer)],
 ) -> CategoryRepository:
-    return CategoryRepository(session=session)
+    return CategoryRepository(session=session, cache=cache, writer=writer)
 
 
 def get_transaction_repository(
     session: Annotated[Session, Depends(get_session)],
+    cache: Annotated[CacheBackend | None, Depends(get_cache)],
+    writer: Annotated[WriterClient | None, Depends(get_writer)],
+    summary_index: Annotated[SummaryIndex | None, Depends(get_summary_index)],
+    idempotency_cache: Annotated[CacheBackend | None, Depends(get_idempotency_cache)],
 ) -> TransactionRepository:
-    return TransactionRepository(session=session)
+    return TransactionRepository(
+        session=session,
+        cache=cache,
+        writer=writer,
+        summary_index=summary_index,
+        idempotency_cache=idempotency_cache,
+    )
 
 
 def get_summary_repository(
     session: Annotated[Session, Depends(get_session)],
+    cache: Annotated[CacheBackend | None, Depends(get_cache)],
+    summary_index: Annotated[SummaryIndex | None, Depends(get_summary_index)],
 ) -> SummaryRepository:
-    return SummaryRepository(session=session)
+    return SummaryRepository(session=session, cache=cache, summary_index=summary_index)
+
+
+def get_export_repository(
+    session: Annotated[Session, Depends(get_session)],
+) -> TransactionRepository:
+    # NOTE: the exporters encode the batches of a sync cursor in the threadpool, so also in async mode
+    return TransactionRepository(session=session)
+
+
+def get_exchange_rate_repository(
+    session: Annotated[Session, Depends(get_session)],
+    cache: Annotated[CacheBackend | None, Depends(get_cache)],
+    writer: Annotated[WriterClient | None, Depends(get_writer)],
+) -> ExchangeRateRepository:
+    return ExchangeRateRepository(session=session, cache=cache, writer=writer)
+
+
+def get_version_repository(
+    session: Annotated[Session, Depends(get_session)],
+) -> VersionRepository:
+    return VersionRepository(session=session)
+
+
+# NOTE: the repositories of the memory backend, create_app overrides the ones above with them
+
+
+async def get_memory_store(request: Request) -> MemoryStore:
+    return request.app.state.memory_store
+
+
+async def get_memory_category_repository(
+    store: Annotated[MemoryStore, Depends(get_memory_store)],
+) -> MemoryCategoryRepository:
+    return MemoryCategoryRepository(store=store)
+
+
+async def get_memory_transaction_repository(
+    store: Annotated[MemoryStore, Depends(get_memory_store)],
+) -> MemoryTransactionRepository:
+    return MemoryTransactionRepository(store=store)
+
+
+async def get_memory_summary_repository(
+    store: Annotated[MemoryStore, Depends(get_memory_store)],
+) -> MemorySummaryRepository:
+    return MemorySummaryRepository(store=store)
+
+
+async def get_memory_exchange_rate_repository(
+    store: Annotated[MemoryStore, Depends(get_memory_store)],
+) -> MemoryExchangeRateRepository:
+    return MemoryExchangeRateRepository(store=store)
+
+
+async def get_memory_version_repository(
+    store: Annotated[MemoryStore, Depends(get_memory_store)],
+) -> MemoryVersionRepository:
+    return MemoryVersionRepository(store=store)
+
+
+MEMORY_REPOSITORIES = {
+    get_category_repository: get_memory_category_repository,
+    get_transaction_repository: get_memory_transaction_repository,
+    get_export_repository: get_memory_transaction_repository,
+    get_summary_repository: get_memory_summary_repository,
+    get_exchange_rate_repository: get_memory_exchange_rate_repository,
+    get_version_repository: get_memory_version_repository,
+}
+
+
+# NOTE: async injections, so FastAPI does not run them in the threadpool
+
+
+async def get_async_category_repository(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend | None, Depends(get_cache)],
+) -> AsyncCategoryRepository:
+    return AsyncCategoryRepository(session=session, cache=cache)
+
+
+async def get_async_transaction_repository(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend | None, Depends(get_cache)],
+    summary_index: Annotated[SummaryIndex | None, Depends(get_summary_index)],
+    idempotency_cache: Annotated[CacheBackend | None, Depends(get_idempotency_cache)],
+) -> AsyncTransactionRepository:
+    return AsyncTransactionRepository(
+        session=session,
+        cache=cache,
+        summary_index=summary_index,
+        idempotency_cache=idempotency_cache,
+    )
+
+
+async def get_async_summary_repository(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+    cache: Annotated[CacheBackend | None, Depends(get_cache)],
+    summary_index: Annotated[SummaryIndex | None, Depends(get_summary_index)],
+) -> AsyncSummaryRepository:
+    return AsyncSummaryRepository(session=session, cache=cache, summary_index=summary_index)
+
+
+async def get_async_version_repository(
+    session: Annotated[AsyncSession, Depends(get_async_session)],
+) -> AsyncVersionRepository:
+    return AsyncVersionRepository(session=session)
+
+
+# NOTE: create_app overrides the sync repositories with these ones in async mode
+ASYNC_REPOSITORIES = {
+    get_category_repository: get_async_category_repository,
+    get_transaction_repository: get_async_transaction_repository,
+    get_summary_repository: get_async_summary_repository,
+    get_version_repository: get_async_version_repository,
+}
+
+
+async def call_repository(method: Callable[..., Any], /, **kwargs) -> Any:
+    """
+    Calls a repository method from an async endpoint, so the same endpoint
+    serves the sync repositories and the async ones (see create_app): the
+    methods of the async ones are awaited, the sync ones run in the
+    threadpool, like the body of a sync endpoint would.
+    """
+
+    if inspect.iscoroutinefunction(method):
+        return await method(**kwargs)
+    return await run_in_threadpool(method, **kwargs)
+
+
+# Conditional GET
+
+
+class ConditionalGet:
+    """
+    Injection for GET endpoints which supports conditional requests. The
+    ETag is derived from the version counters of the tables the response is
+    built from, so when the client sends it back at If-None-Match and none
+    of those tables changed, the 304 is raised before the endpoint runs any
+    query or serialization. Otherwise the ETag is set on the response.
+    """
+
+    def __init__(self, *tables: str):
+        self.tables = tables
+
+    async def __call__(
+        self,
+        request: Request,
+        response: Response,
+        version_repository: Annotated[VersionRepository, Depends(get_version_repository)],
+    ) -> str:
+        versions = await call_repository(version_repository.get_versions, tables=self.tables)
+        etag = '"' + ".".join(f"{table}-{version}" for table, version in versions.items()) + '"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if if_none_match := request.headers.get("if-none-match"):
+            client_etags = {client_etag.strip().removeprefix("W/") for client_etag in if_none_match.split(",")}
+            if etag in client_etags or "*" in client_etags:
+                raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response.headers.update(headers)
+        return etag
@@ -2,10 +2,28 @@ from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
-from sqlalchemy import create_engine
 
-from app.models import DbModel
-from app.routers import category_router, transaction_router, summary_router
+from app.cache import CacheBackend, CacheStats, LRUCache
+from app.database import create_async_database_engine, create_database_engine, migrate_database, read_only
+from app.injections import ASYNC_REPOSITORIES, MEMORY_REPOSITORIES
+from app.middlewares import ConcurrencyLimitMiddleware, ProfilingMiddleware
+from app.profiling import Metrics, instrument_engine
+from app.repositories.memory_repository import MemoryStore
+from app.repositories.transaction_repository import SEARCH_QUERIES, SEARCH_ROW_QUERIES
+from app.routers import (
+    category_router,
+    change_router,
+    exchange_rate_router,
+    metrics_router,
+    summary_router,
+    transaction_router,
+)
+from app.settings import Settings
+from app.summary_index import SummaryIndex
+from app.writer import WriterClient
+
+
+STORAGE_BACKENDS = ("sqlalchemy", "memory")
 
 
 @asynccontextmanager
@@ -20,18 +38,108 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None]:
     one of the reasons why at the tests we configured another DB connection.
     """
 
-    app.state.database_engine = create_engine("sqlite:///budget.db")
-    DbModel.metadata.create_all(bind=app.state.database_engine)
+    if app.state.settings.storage_backend == "memory":
+        # NOTE: no DB at all, the store is created with the app
+        yield
+        return
+    app.state.database_engine = create_database_engine(app.state.settings)
+    app.state.read_only_database_engine = read_only(app.state.database_engine)
+    migrate_database(app.state.database_engine)
+    if app.state.settings.async_mode:
+        app.state.async_database_engine = create_async_database_engine(app.state.settings)
+        app.state.read_only_async_database_engine = read_only(app.state.async_database_engine)
+    if app.state.settings.summary_index:
+        app.state.summary_index = SummaryIndex(engine=app.state.read_only_database_engine)
+        app.state.summary_index.refresh()
+    if app.state.settings.profiling:
+        threshold = app.state.settings.slow_query_threshold
+        compiled_cache_stats = app.state.metrics.caches.setdefault("sql_compiled", CacheStats())
+        instrument_engine(
+            app.state.database_engine,
+            slow_query_threshold=threshold,
+            compiled_cache_stats=compiled_cache_stats,
+        )
+        if app.state.settings.async_mode:
+            instrument_engine(
+                app.state.async_database_engine.sync_engine,
+                slow_query_threshold=threshold,
+                compiled_cache_stats=compiled_cache_stats,
+            )
+    if app.state.writer is not None:
+        app.state.writer.start()
     yield
+    if app.state.writer is not None:
+        app.state.writer.stop()
+    if app.state.settings.async_mode:
+        await app.state.async_database_engine.dispose()
     app.state.database_engine.dispose()
 
 
-def create_app() -> FastAPI:
+def create_app(
+    settings: Settings | None = None,
+    *,
+    cache: CacheBackend | None = None,
+    writer: WriterClient | None = None,
+) -> FastAPI:
+    """
+    Creates the app, by default configured from the environment (see
+    Settings). A cache backend other than the in-process LRUCache can be
+    passed as cache, and the client of a writer process (see app.server)
+    as writer, then the app only reads and sends its writes to the writer.
+
+    With the memory storage backend the categories, transactions, summary
+    and exchange rates endpoints are served from a MemoryStore instead of
+    the DB, and the change feed (read from a DB table) is not included.
+    """
+
     app = FastAPI(
         title="Budget API",
         version="0.1.0",
         lifespan=lifespan,
     )
+    app.state.settings = settings = settings or Settings.from_environment()
+    if cache is None and settings.cache_enabled:
+        cache = LRUCache(max_size=settings.cache_max_size, ttl=settings.cache_ttl)
+    app.state.cache = cache
+    # NOTE: the stored responses never change, so unlike cache it is also safe with several workers
+    app.state.idempotency_cache = LRUCache(
+        max_size=settings.idempotency_cache_max_size,
+        ttl=settings.idempotency_key_ttl,
+    )
+    if writer is not None and settings.async_mode:
+        # NOTE: the async repositories run the sync ones without a writer, and waiting would block the event loop
+        raise ValueError("A writer can not be used in async mode")
+    app.state.writer = writer
+    if settings.async_mode:
+        app.dependency_overrides.update(ASYNC_REPOSITORIES)
+    if settings.storage_backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend {settings.storage_backend!r}, expected one of {STORAGE_BACKENDS}")
+    memory_backend = settings.storage_backend == "memory"
+    if memory_backend:
+        if writer is not None or settings.async_mode:
+            # NOTE: the store is in the memory of one process, and its repositories are sync
+            raise ValueError("The memory storage backend can not be used with a writer or in async mode")
+        app.state.memory_store = MemoryStore()
+        app.dependency_overrides.update(MEMORY_REPOSITORIES)
+    # NOTE: loaded by the lifespan, when enabled
+    app.state.summary_index = None
+    app.add_middleware(
+        ConcurrencyLimitMiddleware,
+        limit=settings.pool_size + settings.max_overflow,
+        # NOTE: the change feed waits (long-poll and event streams) without holding a connection
+        exclude=("/changes/",),
+    )
+    if settings.profiling:
+        # NOTE: added last so it is the outermost, the time waiting for the limit is included
+        app.state.metrics = Metrics()
+        app.state.metrics.caches.update(
+            search_queries=SEARCH_QUERIES.stats,
+            search_row_queries=SEARCH_ROW_QUERIES.stats,
+            idempotency=app.state.idempotency_cache.stats,
+        )
+        if cache is not None:
+            app.state.metrics.caches["repositories"] = cache.stats
+        app.add_middleware(ProfilingMiddleware, metrics=app.state.metrics)
 
     app.include_router(
         category_router.router,
@@ -51,4 +159,23 @@ def create_app() -> FastAPI:
         tags=["Summary"],
     )
 
+    app.include_router(
+        exchange_rate_router.router,
+        prefix="/rates",
+        tags=["Exchange rates"],
+    )
+
+    if not memory_backend:
+        app.include_router(
+            change_router.router,
+            prefix="/changes",
+            tags=["Changes"],
+        )
+
+    if settings.profiling:
+        app.include_router(
+            metrics_router.router,
+            tags=["Metrics"],
+        )
+
     return app
@@ -0,0 +1,78 @@
+from time import perf_counter
+
+import anyio
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.profiling import Metrics, RequestProfile, current_profile
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Lets at most `limit` requests run at the same time, the rest wait here.
+
+    A sync endpoint holds its DB connection until the response has been
+    serialized, and FastAPI serializes it in the threadpool. With more
+    requests in flight than pooled connections, every thread can end up
+    blocked waiting for a connection that is held by a request that waits
+    for a thread, so the limit should be the size of the connection pool.
+
+    The paths in exclude (matched exactly) are not limited, they are for
+    long-lived requests which only check out a connection now and then.
+    """
+
+    def __init__(self, app: ASGIApp, *, limit: int, exclude: tuple[str, ...] = ()):
+        self.app = app
+        self.limiter = anyio.CapacityLimiter(limit)
+        self.exclude = exclude
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        async with self.limiter:
+            await self.app(scope, receive, send)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles every HTTP request (see app.profiling): reports its phases at
+    the Server-Timing header of the response and records them in metrics
+    once the response has been sent.
+    """
+
+    def __init__(self, app: ASGIApp, *, metrics: Metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        status = 500
+
+        async def send_with_server_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", profile.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_server_timing)
+        finally:
+            current_profile.reset(token)
+            # NOTE: the route is set at the scope by the router, None when no route matched
+            route = scope.get("route")
+            self.metrics.observe(
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+                duration=perf_counter() - profile.started,
+                profile=profile,
+            )
@@ -1,4 +1,6 @@
-from sqlalchemy import ForeignKey, String
+from datetime import UTC, date, datetime
+
+from sqlalchemy import Connection, ForeignKey, Index, String, UniqueConstraint, event, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 from app.constants import Currencies
@@ -16,7 +18,243 @@ class CategoryModel(DbModel):
 
 class TransactionModel(DbModel):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # every filter shape of TransactionSearchParams can be answered with one of these
+        Index("ix_transactions_category_id_currency_amount", "category_id", "currency", "amount"),
+        Index("ix_transactions_currency_amount", "currency", "amount"),
+        Index("ix_transactions_amount", "amount"),
+        Index("ix_transactions_created_at", "created_at"),
+        # NOTE: the ids of the archived (or deleted) newest transactions are never handed out again
+        {"sqlite_autoincrement": True},
+    )
 
     category_id: Mapped[str] = mapped_column(ForeignKey(CategoryModel.id), nullable=False)
     amount: Mapped[int]
     currency: Mapped[Currencies]
+    # UTC, stored without timezone
+    created_at: Mapped[datetime] = mapped_column(nullable=False, default=lambda: datetime.now(UTC).replace(tzinfo=None))
+
+
+class CategoryCurrencyTotalModel(DbModel):
+    """
+    Materialized `GROUP BY category_id, currency` of the transactions table,
+    so the summary can be read without scanning every transaction.
+
+    It is kept up to date by the triggers below, which apply the delta of
+    every insert, update and delete of a transaction inside the same DB
+    transaction, no matter if it was done by a repository, a bulk insert or
+    the ORM. A bucket is removed when its last transaction is gone.
+    """
+
+    __tablename__ = "category_currency_totals"
+    __table_args__ = (UniqueConstraint("category_id", "currency"),)
+
+    category_id: Mapped[int] = mapped_column(ForeignKey(CategoryModel.id), nullable=False)
+    currency: Mapped[Currencies]
+    total: Mapped[int] = mapped_column(nullable=False, default=0)
+    transaction_count: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+class DailyTotalModel(DbModel):
+    """
+    Rollup of the transactions per day (UTC) of created_at, category and
+    currency, kept up to date by the same kind of triggers as the totals.
+    """
+
+    __tablename__ = "daily_totals"
+    __table_args__ = (UniqueConstraint("day", "category_id", "currency"),)
+
+    day: Mapped[date] = mapped_column(nullable=False)
+    category_id: Mapped[int] = mapped_column(ForeignKey(CategoryModel.id), nullable=False)
+    currency: Mapped[Currencies]
+    total: Mapped[int] = mapped_column(nullable=False, default=0)
+    transaction_count: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+class MonthlyTotalModel(DbModel):
+    """Same as DailyTotalModel but per month, stored as its first day."""
+
+    __tablename__ = "monthly_totals"
+    __table_args__ = (UniqueConstraint("month", "category_id", "currency"),)
+
+    month: Mapped[date] = mapped_column(nullable=False)
+    category_id: Mapped[int] = mapped_column(ForeignKey(CategoryModel.id), nullable=False)
+    currency: Mapped[Currencies]
+    total: Mapped[int] = mapped_column(nullable=False, default=0)
+    transaction_count: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+class ArchiveModel(DbModel):
+    """
+    SQLite file, next to the database, where the transactions created from
+    start (inclusive) to end (exclusive) were moved. The totals and rollups
+    still include them.
+    """
+
+    __tablename__ = "archives"
+
+    file_name: Mapped[str] = mapped_column(String(length=255), nullable=False, unique=True)
+    start: Mapped[date] = mapped_column(nullable=False)
+    end: Mapped[date] = mapped_column(nullable=False)
+    transaction_count: Mapped[int] = mapped_column(nullable=False)
+
+
+class TableVersionModel(DbModel):
+    """
+    Version counter per table, bumped by the repositories in the same DB
+    transaction as every write to the table. The ETags are derived from it.
+    """
+
+    __tablename__ = "table_versions"
+
+    name: Mapped[str] = mapped_column(String(length=50), nullable=False, unique=True)
+    version: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+class IdempotencyKeyModel(DbModel):
+    """
+    Response of a request sent with an Idempotency-Key header, replayed to
+    the retries of that request until expires_at (UTC, without timezone).
+    The unique key decides which one of concurrent duplicates creates the
+    resource, the others find its row instead.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    key: Mapped[str] = mapped_column(String(length=255), nullable=False, unique=True)
+    # sha256 of the request body, a key can not be reused for another request
+    request_hash: Mapped[str] = mapped_column(String(length=64), nullable=False)
+    # JSON, set in the same DB transaction as the key is claimed
+    response: Mapped[str | None]
+    expires_at: Mapped[datetime] = mapped_column(nullable=False, index=True)
+
+
+class ChangeModel(DbModel):
+    """
+    Append-only log of the changes of the categories and transactions,
+    written by the repositories in the same DB transaction as the change.
+
+    The id is the sequence number of the change. SQLite has one writer at a
+    time, so the changes are committed in the order of their ids, and a
+    client which read up to an id never misses a later one (AUTOINCREMENT,
+    so the ids are never reused). Compaction (see ChangeRepository) drops
+    the old entries superseded by a newer one of the same row.
+    """
+
+    __tablename__ = "changes"
+    __table_args__ = (
+        Index("ix_changes_table_name_row_id_id", "table_name", "row_id", "id"),
+        {"sqlite_autoincrement": True},
+    )
+
+    table_name: Mapped[str] = mapped_column(String(length=50), nullable=False)
+    row_id: Mapped[int] = mapped_column(nullable=False)
+    # create, update or delete
+    operation: Mapped[str] = mapped_column(String(length=6), nullable=False)
+    # JSON of the row after the change, None when deleted
+    data: Mapped[str | None]
+    # UTC, stored without timezone
+    created_at: Mapped[datetime] = mapped_column(nullable=False, default=lambda: datetime.now(UTC).replace(tzinfo=None))
+
+
+class ExchangeRateModel(DbModel):
+    """
+    Value of one minor unit of a currency in a common reference unit,
+    stored as an integer scaled by RATE_SCALE. A conversion only uses the
+    ratio between two rates, so the reference unit itself does not matter.
+    """
+
+    __tablename__ = "exchange_rates"
+
+    currency: Mapped[Currencies] = mapped_column(unique=True)
+    rate: Mapped[int] = mapped_column(nullable=False)
+
+
+def _bucket_columns(keys: dict[str, str], row: str) -> list[str]:
+    return [expression.format(row=row) for expression in keys.values()]
+
+
+def _add_to_bucket(table: str, keys: dict[str, str]) -> str:
+    names, columns = ", ".join(keys), ", ".join(_bucket_columns(keys, "NEW"))
+    return f"""
+    INSERT INTO {table} ({names}, total, transaction_count)
+    VALUES ({columns}, NEW.amount, 1)
+    ON CONFLICT ({names}) DO UPDATE SET
+        total = total + excluded.total,
+        transaction_count = transaction_count + 1;
+"""
+
+
+def _remove_from_bucket(table: str, keys: dict[str, str]) -> str:
+    bucket = " AND ".join(f"{key} = {column}" for key, column in zip(keys, _bucket_columns(keys, "OLD")))
+    return f"""
+    UPDATE {table}
+    SET total = total - OLD.amount, transaction_count = transaction_count - 1
+    WHERE {bucket};
+    DELETE FROM {table}
+    WHERE {bucket} AND transaction_count <= 0;
+"""
+
+
+def _backfill_buckets(table: str, keys: dict[str, str]) -> str:
+    names, columns = ", ".join(keys), ", ".join(_bucket_columns(keys, "transactions"))
+    return (
+        f"INSERT INTO {table} ({names}, total, transaction_count) "
+        f"SELECT {columns}, sum(amount), count(*) FROM transactions GROUP BY {columns}"
+    )
+
+
+_TRANSACTION_KEYS = {"category_id": "{row}.category_id", "currency": "{row}.currency"}
+
+# the tables maintained by triggers, with the prefix of their triggers, the
+# bucket of a transaction and the transaction columns which can move it
+_BUCKET_TABLES = {
+    CategoryCurrencyTotalModel.__table__: ("transactions_totals", _TRANSACTION_KEYS, "category_id, currency, amount"),
+    DailyTotalModel.__table__: (
+        "transactions_daily_totals",
+        {"day": "date({row}.created_at)", **_TRANSACTION_KEYS},
+        "category_id, currency, amount, created_at",
+    ),
+    MonthlyTotalModel.__table__: (
+        "transactions_monthly_totals",
+        {"month": "date({row}.created_at, 'start of month')", **_TRANSACTION_KEYS},
+        "category_id, currency, amount, created_at",
+    ),
+}
+
+
+def _bucket_triggers() -> dict[str, str]:
+    triggers = {}
+    for table, (prefix, keys, columns) in _BUCKET_TABLES.items():
+        add, remove = _add_to_bucket(table.name, keys), _remove_from_bucket(table.name, keys)
+        triggers[f"{prefix}_insert"] = f"AFTER INSERT ON transactions BEGIN {add} END"
+        triggers[f"{prefix}_delete"] = f"AFTER DELETE ON transactions BEGIN {remove} END"
+        triggers[f"{prefix}_update"] = f"AFTER UPDATE OF {columns} ON transactions BEGIN {remove} {add} END"
+    return triggers
+
+
+_TRIGGERS = _bucket_triggers()
+
+# NOTE: archiving moves transactions out of the table without changing the totals
+ARCHIVE_SKIPPED_TRIGGERS = tuple(name for name in _TRIGGERS if name.endswith("_delete"))
+
+
+def create_trigger(connection: Connection, name: str) -> None:
+    connection.execute(text(f"CREATE TRIGGER IF NOT EXISTS {name} {_TRIGGERS[name]}"))
+
+
+@event.listens_for(DbModel.metadata, "after_create")
+def _create_triggers(target, connection, tables=(), **kwargs) -> None:
+    if not all(
+        connection.dialect.has_table(connection, table.name)
+        for table in (TransactionModel.__table__, *_BUCKET_TABLES)
+    ):
+        return
+
+    for name in _TRIGGERS:
+        create_trigger(connection, name)
+
+    for table, (_, keys, _) in _BUCKET_TABLES.items():
+        if table in tables:
+            # backfill, for databases that already had transactions before the table existed
+            connection.execute(text(_backfill_buckets(table.name, keys)))
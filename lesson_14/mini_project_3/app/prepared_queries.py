@@ -0,0 +1,49 @@
+"""
+Statements prepared once per filter shape.
+
+A search has 4 optional filters, so only 16 shapes of WHERE clause. Instead
+of building a select() (and computing its cache key) on every call, the
+statement of every shape is built once, with a bind parameter per filter,
+and a call only passes the values: SQLAlchemy memoizes the cache key of a
+statement object, so it finds its SQL in the compiled cache of the engine
+right away. The shape is the bitmask of the filters that are set.
+"""
+
+import threading
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from sqlalchemy import Executable
+
+from app.cache import CacheStats
+
+
+class PreparedQueries:
+    def __init__(self, filters: Sequence[str], build: Callable[[frozenset[str]], Executable]):
+        # NOTE: build gets the names of the filters that are set, it binds them with bindparam(name)
+        self.filters = tuple(filters)
+        self.build = build
+        self.stats = CacheStats()
+        self._statements: dict[int, Executable] = {}
+        self._lock = threading.Lock()
+
+    def get(self, params: Any) -> tuple[Executable, dict[str, Any]]:
+        """The statement for the filters (attributes) of params which are not None, and its parameters."""
+
+        parameters = {}
+        mask = 0
+        for bit, name in enumerate(self.filters):
+            if (value := getattr(params, name)) is not None:
+                parameters[name] = value
+                mask |= 1 << bit
+        with self._lock:
+            statement = self._statements.get(mask)
+            if statement is None:
+                self.stats.misses += 1
+                statement = self._statements[mask] = self.build(frozenset(parameters))
+            else:
+                self.stats.hits += 1
+        return statement, parameters
+
+    def __len__(self) -> int:
+        return len(self._statements)
@@ -0,0 +1,259 @@
+"""
+Opt-in request profiling (Settings.profiling).
+
+While a request is profiled (see ProfilingMiddleware) its RequestProfile is
+the value of current_profile, which is also seen by the threadpool and the
+greenlets of the async mode, so:
+
+- instrument_engine counts the SQL statements and their time,
+- ProfiledRoute times the dependencies, the endpoint and the serialization,
+
+and the middleware reports them at the Server-Timing header and records
+them in Metrics, rendered for Prometheus at /metrics. The hits, misses,
+evictions and expirations of the caches registered in Metrics.caches (like the compiled cache of the
+engines, counted by instrument_engine) are rendered there too.
+"""
+
+import inspect
+import logging
+from collections import defaultdict
+from collections.abc import Callable
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from time import perf_counter
+from typing import Any
+
+from fastapi.routing import APIRoute
+from sqlalchemy import Engine, event
+from sqlalchemy.engine.interfaces import CacheStats as CompiledCacheStats
+
+from app.cache import CacheStats
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RequestProfile:
+    started: float = field(default_factory=perf_counter)
+    handler_started: float | None = None
+    endpoint_started: float | None = None
+    endpoint_finished: float | None = None
+    handler_finished: float | None = None
+    sql_statements: int = 0
+    sql_duration: float = 0.0
+    slow_queries: int = 0
+
+    def phases(self) -> dict[str, float]:
+        """The seconds of each phase of the request that has finished, besides the SQL."""
+
+        phases = {}
+        if self.handler_started is not None and self.endpoint_started is not None:
+            phases["deps"] = self.endpoint_started - self.handler_started
+        if self.endpoint_started is not None and self.endpoint_finished is not None:
+            phases["endpoint"] = self.endpoint_finished - self.endpoint_started
+        if self.endpoint_finished is not None and self.handler_finished is not None:
+            phases["serialize"] = self.handler_finished - self.endpoint_finished
+        return phases
+
+    def server_timing(self) -> str:
+        timings = [f"{phase};dur={seconds * 1000:.3f}" for phase, seconds in self.phases().items()]
+        timings.append(f'sql;dur={self.sql_duration * 1000:.3f};desc="{self.sql_statements} statements"')
+        timings.append(f"total;dur={(perf_counter() - self.started) * 1000:.3f}")
+        return ", ".join(timings)
+
+
+current_profile: ContextVar[RequestProfile | None] = ContextVar("current_profile", default=None)
+
+
+def instrument_engine(
+    engine: Engine,
+    *,
+    slow_query_threshold: float,
+    compiled_cache_stats: CacheStats | None = None,
+) -> None:
+    """
+    Adds the SQL of the engine to the profile of the current request, and
+    logs the slow queries. The statements found in (or added to) the
+    compiled cache of the engine are counted in compiled_cache_stats.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(connection, cursor, statement, parameters, context, executemany) -> None:
+        connection.info.setdefault("query_started", []).append(perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stop_timer(connection, cursor, statement, parameters, context, executemany) -> None:
+        duration = perf_counter() - connection.info["query_started"].pop()
+        profile = current_profile.get()
+        if profile is not None:
+            profile.sql_statements += 1
+            profile.sql_duration += duration
+        if duration >= slow_query_threshold:
+            if profile is not None:
+                profile.slow_queries += 1
+            logger.warning("slow query (%.1fms): %s", duration * 1000, statement)
+        # NOTE: None for the driver SQL, like the BEGIN of app.database
+        if compiled_cache_stats is not None and context is not None:
+            if context.cache_hit == CompiledCacheStats.CACHE_HIT:
+                compiled_cache_stats.hits += 1
+            elif context.cache_hit == CompiledCacheStats.CACHE_MISS:
+                compiled_cache_stats.misses += 1
+
+    @event.listens_for(engine, "handle_error")
+    def discard_timer(exception_context) -> None:
+        if exception_context.connection is not None and exception_context.cursor is not None:
+            exception_context.connection.info.get("query_started", [None]).pop()
+
+
+def _time_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    # NOTE: wraps keeps the signature FastAPI reads the parameters from
+    if inspect.iscoroutinefunction(endpoint):
+
+        @wraps(endpoint)
+        async def timed_endpoint(*args, **kwargs):
+            if (profile := current_profile.get()) is None:
+                return await endpoint(*args, **kwargs)
+            profile.endpoint_started = perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                profile.endpoint_finished = perf_counter()
+
+        return timed_endpoint
+
+    @wraps(endpoint)
+    def timed_endpoint(*args, **kwargs):
+        if (profile := current_profile.get()) is None:
+            return endpoint(*args, **kwargs)
+        profile.endpoint_started = perf_counter()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            profile.endpoint_finished = perf_counter()
+
+    return timed_endpoint
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Route which times its handler and its endpoint while the request is
+    profiled. FastAPI solves the dependencies before calling the endpoint
+    and serializes the response after it, which gives the other phases.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs):
+        super().__init__(path, _time_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def profiled_handler(request):
+            if (profile := current_profile.get()) is None:
+                return await handler(request)
+            profile.handler_started = perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                profile.handler_finished = perf_counter()
+
+        return profiled_handler
+
+
+class Metrics:
+    """
+    Per route metrics of the profiled requests, kept in process (every
+    worker has its own) and rendered in the Prometheus text format.
+    """
+
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        # (method, route, status) -> counts per bucket, sum, count
+        self.durations = defaultdict(lambda: [[0] * len(self.buckets), 0.0, 0])
+        # (method, route, phase) -> seconds
+        self.phases = defaultdict(float)
+        # (method, route) -> statements, slow queries
+        self.sql = defaultdict(lambda: [0, 0])
+        # name -> stats of an in-process cache, kept up to date by the cache itself
+        self.caches: dict[str, CacheStats] = {}
+
+    def observe(self, *, method: str, route: str, status: int, duration: float, profile: RequestProfile) -> None:
+        bucket_counts, _, _ = histogram = self.durations[(method, route, str(status))]
+        for index, upper_bound in enumerate(self.buckets):
+            if duration <= upper_bound:
+                bucket_counts[index] += 1
+        histogram[1] += duration
+        histogram[2] += 1
+        for phase, seconds in {**profile.phases(), "sql": profile.sql_duration}.items():
+            self.phases[(method, route, phase)] += seconds
+        sql = self.sql[(method, route)]
+        sql[0] += profile.sql_statements
+        sql[1] += profile.slow_queries
+
+    def render(self) -> str:
+        lines = [
+            "# HELP budget_request_duration_seconds Duration of the requests.",
+            "# TYPE budget_request_duration_seconds histogram",
+        ]
+        for (method, route, status), (bucket_counts, total, count) in sorted(self.durations.items()):
+            labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+            for upper_bound, bucket_count in zip(self.buckets, bucket_counts):
+                lines.append(f'budget_request_duration_seconds_bucket{{{labels},le="{upper_bound}"}} {bucket_count}')
+            lines.append(f'budget_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"budget_request_duration_seconds_sum{{{labels}}} {total}")
+            lines.append(f"budget_request_duration_seconds_count{{{labels}}} {count}")
+
+        lines += [
+            "# HELP budget_request_phase_seconds_total Time spent in each phase of the requests.",
+            "# TYPE budget_request_phase_seconds_total counter",
+        ]
+        for (method, route, phase), seconds in sorted(self.phases.items()):
+            labels = f'method="{method}",route="{_escape(route)}",phase="{phase}"'
+            lines.append(f"budget_request_phase_seconds_total{{{labels}}} {seconds}")
+
+        lines += [
+            "# HELP budget_sql_statements_total SQL statements executed by the requests.",
+            "# TYPE budget_sql_statements_total counter",
+        ]
+        lines += [
+            f'budget_sql_statements_total{{method="{method}",route="{_escape(route)}"}} {statements}'
+            for (method, route), (statements, _) in sorted(self.sql.items())
+        ]
+        lines += [
+            "# HELP budget_slow_queries_total SQL statements slower than the slow query threshold.",
+            "# TYPE budget_slow_queries_total counter",
+        ]
+        lines += [
+            f'budget_slow_queries_total{{method="{method}",route="{_escape(route)}"}} {slow_queries}'
+            for (method, route), (_, slow_queries) in sorted(self.sql.items())
+        ]
+        lines += [
+            "# HELP budget_cache_lookups_total Lookups of the in-process caches, by result.",
+            "# TYPE budget_cache_lookups_total counter",
+        ]
+        for name, stats in sorted(self.caches.items()):
+            lines.append(f'budget_cache_lookups_total{{cache="{_escape(name)}",result="hit"}} {stats.hits}')
+            lines.append(f'budget_cache_lookups_total{{cache="{_escape(name)}",result="miss"}} {stats.misses}')
+        lines += [
+            "# HELP budget_cache_evictions_total Entries evicted from the full in-process caches.",
+            "# TYPE budget_cache_evictions_total counter",
+        ]
+        lines += [
+            f'budget_cache_evictions_total{{cache="{_escape(name)}"}} {stats.evictions}'
+            for name, stats in sorted(self.caches.items())
+        ]
+        lines += [
+            "# HELP budget_cache_expirations_total Expired entries of the in-process caches.",
+            "# TYPE budget_cache_expirations_total counter",
+        ]
+        lines += [
+            f'budget_cache_expirations_total{{cache="{_escape(name)}"}} {stats.expirations}'
+            for name, stats in sorted(self.caches.items())
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(label: str) -> str:
+    return label.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
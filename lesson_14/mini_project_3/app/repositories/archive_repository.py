@@ -0,0 +1,107 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import date, datetime, time
+from pathlib import Path
+
+from sqlalchemy import TableClause, column, delete, func, insert, select, table, text
+from sqlalchemy.exc import OperationalError
+
+from app.models import ARCHIVE_SKIPPED_TRIGGERS, ArchiveModel, TransactionModel, create_trigger
+from app.repositories.base_repository import BaseSqlAlchemyRepository
+from app.schemas import Archive
+
+
+def archive_table(schema: str) -> TableClause:
+    """The transactions table of the archive attached as schema."""
+
+    return table(
+        TransactionModel.__tablename__,
+        *(column(transaction_column.name, transaction_column.type) for transaction_column in TransactionModel.__table__.c),
+        schema=schema,
+    )
+
+
+class ArchiveRepository(BaseSqlAlchemyRepository):
+    def create_archive(self, *, before: date) -> Archive | None:
+        """
+        Moves every transaction created before the day before into a new
+        SQLite file next to the database. The totals and rollups are not
+        changed, so the summaries still include the archived transactions.
+        Returns None when there is nothing to archive.
+
+        The archived transactions are removed from the cache of the
+        repository, but the archive command runs without the cache of a
+        running server, where they stay until they expire (cache_ttl).
+        """
+
+        archived = TransactionModel.created_at < datetime.combine(before, time())
+        first_created_at = self.session.execute(select(func.min(TransactionModel.created_at)).filter(archived)).scalar()
+        if first_created_at is None:
+            return None
+
+        start = first_created_at.date()
+        database_path = Path(self.session.get_bind().url.database)
+        archive = ArchiveModel(
+            file_name=f"{database_path.stem}.archive-{start:%Y-%m-%d}-{before:%Y-%m-%d}.db",
+            start=start,
+            end=before,
+            transaction_count=0,
+        )
+        self.session.add(archive)
+        self.session.flush()
+
+        # NOTE: not detached here, a written database can only be detached after the commit
+        schema = self._attach(archive)
+        self.session.execute(text(f'CREATE TABLE "{schema}".transactions AS SELECT * FROM main.transactions WHERE 0'))
+        self.session.execute(text(f'CREATE INDEX "{schema}".ix_transactions_created_at ON transactions (created_at)'))
+        transactions = TransactionModel.__table__
+        archive.transaction_count = self.session.execute(
+            insert(archive_table(schema)).from_select(
+                [transaction_column.name for transaction_column in transactions.c],
+                select(transactions).filter(archived),
+            )
+        ).rowcount
+
+        for trigger in ARCHIVE_SKIPPED_TRIGGERS:
+            self.session.execute(text(f"DROP TRIGGER {trigger}"))
+        self.session.execute(delete(TransactionModel).filter(archived))
+        for trigger in ARCHIVE_SKIPPED_TRIGGERS:
+            create_trigger(self.session.connection(), trigger)
+
+        self._bump_versions(TransactionModel.__tablename__)
+        return Archive.model_validate(archive)
+
+    def get_archives(self, *, start: date | None = None, end: date | None = None) -> list[Archive]:
+        """The archives with transactions created from the day start to the day end (exclusive)."""
+
+        query = select(ArchiveModel).order_by(ArchiveModel.start.asc())
+        if start is not None:
+            query = query.filter(ArchiveModel.end > start)
+        if end is not None:
+            query = query.filter(ArchiveModel.start < end)
+        return [Archive.model_validate(archive) for archive in self.session.execute(query).scalars()]
+
+    @contextmanager
+    def attached(self, archive: Archive) -> Iterator[TableClause]:
+        """
+        Attaches the archive to the connection of the session while in the
+        with block, and yields its transactions table.
+        """
+
+        schema = self._attach(archive)
+        try:
+            yield archive_table(schema)
+        finally:
+            try:
+                self.session.execute(text(f'DETACH DATABASE "{schema}"'))
+            except OperationalError:
+                # locked until the end of a transaction which already wrote, detached at the checkin instead
+                pass
+
+    def _attach(self, archive: Archive | ArchiveModel) -> str:
+        schema = f"archive_{Path(archive.file_name).stem.replace('.', '_').replace('-', '_')}"
+        attached_schemas = {name for _, name, _ in self.session.execute(text("PRAGMA database_list"))}
+        if schema not in attached_schemas:
+            path = Path(self.session.get_bind().url.database).with_name(archive.file_name)
+            self.session.execute(text(f'ATTACH DATABASE :path AS "{schema}"'), {"path": str(path)})
+        return schema
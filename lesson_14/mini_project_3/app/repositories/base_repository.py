@@ -1,12 +1,189 @@
+import json
+from collections.abc import Callable, Sequence
+from functools import wraps
+from typing import Any
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.cache import CacheBackend
+from app.database import BEGIN_MODE_OPTION
+from app.models import ChangeModel, TableVersionModel
+from app.summary_index import SummaryIndex
+from app.writer import WriterClient
+
+
+def writes(method: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Marks a repository method which writes. When the repository has a
+    writer (see app.writer) the call is sent to the writer process, which
+    runs it with a repository of its own, and its result is returned (or
+    its exception raised) here.
+
+    Otherwise, when the session has not begun its transaction yet, it is
+    begun IMMEDIATE, taking the write lock up front (see app.database),
+    even if the session was opened on a read_only engine.
+    """
+
+    @wraps(method)
+    def write(self: "BaseSqlAlchemyRepository", **kwargs) -> Any:
+        if self.writer is not None:
+            return self.writer.call(type(self), method.__name__, kwargs)
+        if not self.session.in_transaction():
+            # NOTE: a transaction already begun DEFERRED by a read takes the lock at the first write
+            self.session.connection(execution_options={BEGIN_MODE_OPTION: "IMMEDIATE"})
+        return method(self, **kwargs)
+
+    return write
+
 
 class BaseSqlAlchemyRepository:
     session: Session
+    cache: CacheBackend | None
+    writer: WriterClient | None
+    summary_index: SummaryIndex | None
+    idempotency_cache: CacheBackend | None
 
     class TransactionNotFound(Exception): ...
 
     class CategoryNotFound(Exception): ...
 
-    def __init__(self, *, session: Session):
+    class CategoryAlreadyExists(Exception): ...
+
+    class ExchangeRateNotFound(Exception): ...
+
+    class InvalidCursor(Exception): ...
+
+    class SummaryIndexDisabled(Exception): ...
+
+    class IdempotencyKeyReused(Exception): ...
+
+    def __init__(
+        self,
+        *,
+        session: Session,
+        cache: CacheBackend | None = None,
+        writer: WriterClient | None = None,
+        summary_index: SummaryIndex | None = None,
+        idempotency_cache: CacheBackend | None = None,
+    ):
         self.session = session
+        self.cache = cache
+        self.writer = writer
+        self.summary_index = summary_index
+        self.idempotency_cache = idempotency_cache
+
+    def _get_cached(self, key: str, load: Callable[[], Any], *, table: str) -> Any:
+        """
+        Returns the cached value of key, or loads it from the DB and caches it
+        when there is no cache entry (or no cache at all).
+
+        The entries are keyed by the version of the table they are loaded
+        from, read in the same DB transaction as the value, like the ETag of
+        ConditionalGet. A write of any process bumps the version, so the
+        entries cached before it are not read anymore (they are evicted or
+        expire), and a request still reading an older snapshot caches the
+        old value under the old version only.
+        """
+
+        if self.cache is None:
+            return load()
+        query = select(TableVersionModel.version).filter(TableVersionModel.name == table)
+        key = f"{key}@{self.session.execute(query).scalar() or 0}"
+        if (value := self.cache.get(key)) is None:
+            value = load()
+            self.cache.set(key, value)
+        return value
+
+    def _bump_versions(self, *tables: str) -> None:
+        query = insert(TableVersionModel).values([{"name": table, "version": 1} for table in tables])
+        query = query.on_conflict_do_update(
+            index_elements=[TableVersionModel.name],
+            set_={"version": TableVersionModel.version + 1},
+        )
+        self.session.execute(query)
+
+        if self.summary_index is not None and self.summary_index.source_table in tables:
+            self._refresh_summary_index_after_commit()
+
+    def _log_changes(self, table: str, operation: str, rows: Sequence[dict[str, Any]]) -> None:
+        """
+        Appends the changes of rows (the whole rows, only their id when
+        deleted) to the change log, in the DB transaction of the change.
+        """
+
+        if not rows:
+            return
+        changes = [
+            {
+                "table_name": table,
+                "row_id": row["id"],
+                "operation": operation,
+                "data": None if operation == "delete" else json.dumps(row),
+            }
+            for row in rows
+        ]
+        self.session.execute(insert(ChangeModel), changes)
+
+    def _refresh_summary_index_after_commit(self) -> None:
+        # NOTE: once per DB transaction, it reloads every total anyway
+        if self.session.info.get("refresh_summary_index"):
+            return
+        self.session.info["refresh_summary_index"] = True
+
+        def refresh(*args) -> None:
+            self.session.info.pop("refresh_summary_index", None)
+            self.summary_index.refresh()
+
+        event.listen(self.session, "after_commit", refresh, once=True)
+
+
+class BaseAsyncSqlAlchemyRepository:
+    """
+    Base of the repositories used by the async mode. Instead of duplicating
+    every query, the methods of the sync repository are run with
+    AsyncSession.run_sync, which executes them in a greenlet where every
+    DB call awaits the async driver instead of blocking the event loop.
+    """
+
+    session: AsyncSession
+    cache: CacheBackend | None
+    summary_index: SummaryIndex | None
+    idempotency_cache: CacheBackend | None
+    sync_repository_class: type[BaseSqlAlchemyRepository]
+
+    TransactionNotFound = BaseSqlAlchemyRepository.TransactionNotFound
+    CategoryNotFound = BaseSqlAlchemyRepository.CategoryNotFound
+    CategoryAlreadyExists = BaseSqlAlchemyRepository.CategoryAlreadyExists
+    ExchangeRateNotFound = BaseSqlAlchemyRepository.ExchangeRateNotFound
+    InvalidCursor = BaseSqlAlchemyRepository.InvalidCursor
+    SummaryIndexDisabled = BaseSqlAlchemyRepository.SummaryIndexDisabled
+    IdempotencyKeyReused = BaseSqlAlchemyRepository.IdempotencyKeyReused
+
+    def __init__(
+        self,
+        *,
+        session: AsyncSession,
+        cache: CacheBackend | None = None,
+        summary_index: SummaryIndex | None = None,
+        idempotency_cache: CacheBackend | None = None,
+    ):
+        self.session = session
+        self.cache = cache
+        self.summary_index = summary_index
+        self.idempotency_cache = idempotency_cache
+
+    async def _run_sync(self, method: Callable[..., Any], **kwargs) -> Any:
+        return await self.session.run_sync(
+            lambda session: method(
+                self.sync_repository_class(
+                    session=session,
+                    cache=self.cache,
+                    summary_index=self.summary_index,
+                    idempotency_cache=self.idempotency_cache,
+                ),
+                **kwargs,
+            )
+        )
@@ -1,42 +1,81 @@
-from sqlalchemy import select, exists
+from sqlalchemy import delete, exists, select
+from sqlalchemy.exc import IntegrityError
 
-from app.models import CategoryModel, TransactionModel
-from app.repositories.base_repository import BaseSqlAlchemyRepository
+from app.models import CategoryCurrencyTotalModel, CategoryModel
+from app.repositories.base_repository import BaseAsyncSqlAlchemyRepository, BaseSqlAlchemyRepository, writes
 from app.schemas import Category
 
 
+CATEGORIES_CACHE_KEY = "categories"
+CATEGORY_ROWS_CACHE_KEY = "categories:rows"
+
+
 class CategoryRepository(BaseSqlAlchemyRepository):
+    @writes
     def create_category(self, *, name: str) -> Category:
         # NOTE: with ORM
         new_category = CategoryModel(name=name)
         self.session.add(new_category)
-        self.session.flush()
-        return Category.model_validate(new_category)
+        try:
+            self.session.flush()
+        except IntegrityError as exception:
+            raise self.CategoryAlreadyExists(name) from exception
+        category = Category.model_validate(new_category)
+        self._bump_versions(CategoryModel.__tablename__)
+        self._log_changes(CategoryModel.__tablename__, "create", [category.model_dump(mode="json")])
+        return category
 
     def get_categories(self) -> list[Category]:
+        return self._get_cached(CATEGORIES_CACHE_KEY, self._load_categories, table=CategoryModel.__tablename__)
+
+    def get_category_rows(self) -> list[tuple]:
+        """Plain (name, id) tuples for the fast serialization path."""
+
+        return self._get_cached(CATEGORY_ROWS_CACHE_KEY, self._load_category_rows, table=CategoryModel.__tablename__)
+
+    def _load_category_rows(self) -> list[tuple]:
+        query = select(CategoryModel.name, CategoryModel.id).order_by(CategoryModel.id.asc())
+        return [tuple(row) for row in self.session.execute(query)]
+
+    def _load_categories(self) -> list[Category]:
         query = select(CategoryModel).order_by(CategoryModel.id.asc())
         results = self.session.execute(query).scalars()
         return [Category.model_validate(item) for item in results]
 
+    @writes
     def delete_category(self, *, category_id: int) -> dict | None:
-        # Check if category has associated transactions
-        has_transactions = self.session.execute(
-            select(exists().where(TransactionModel.category_id == category_id))
-        ).scalar()
-        
-        if has_transactions:
-            return {"msg": "Cannot delete category associated with transactions. So delete the transactions first."}
-        
+        # NOTE: one DELETE ... WHERE NOT EXISTS, the totals also count the archived transactions. The
+        # subquery can not be evaluated in Python, and the categories are not kept loaded in a session,
+        # so the identity map is not synchronized (which would fetch the deleted rows again)
+        has_transactions = exists().where(CategoryCurrencyTotalModel.category_id == category_id)
         query = (
-            select(CategoryModel)
-            .filter(CategoryModel.id == category_id)
-            .with_for_update()
+            delete(CategoryModel)
+            .filter(CategoryModel.id == category_id, ~has_transactions)
+            .returning(CategoryModel.id)
+            .execution_options(synchronize_session=False)
         )
-        category = self.session.execute(query).scalar_one_or_none()
-        
-        if category:
-            self.session.delete(category)
-            self.session.flush()
+        if self.session.execute(query).scalar_one_or_none() is not None:
+            self._bump_versions(CategoryModel.__tablename__)
+            self._log_changes(CategoryModel.__tablename__, "delete", [{"id": category_id}])
             return {"msg": "Category deleted successfully"}
-        
+
+        # only when nothing was deleted, to tell why
+        if self.session.execute(select(has_transactions)).scalar():
+            return {"msg": "Cannot delete category associated with transactions. So delete the transactions first."}
         return {"msg": "Category not found"}
+
+
+class AsyncCategoryRepository(BaseAsyncSqlAlchemyRepository):
+    sync_repository_class = CategoryRepository
+
+    async def create_category(self, *, name: str) -> Category:
+        return await self._run_sync(CategoryRepository.create_category, name=name)
+
+    async def get_categories(self) -> list[Category]:
+        return await self._run_sync(CategoryRepository.get_categories)
+
+    async def get_category_rows(self) -> list[tuple]:
+        return await self._run_sync(CategoryRepository.get_category_rows)
+
+    async def delete_category(self, *, category_id: int) -> dict | None:
+        return await self._run_sync(CategoryRepository.delete_category, category_id=category_id)
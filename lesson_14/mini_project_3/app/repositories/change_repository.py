@@ -0,0 +1,52 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import delete, exists, func, select
+from sqlalchemy.orm import aliased
+
+from app.models import ChangeModel
+from app.repositories.base_repository import BaseSqlAlchemyRepository, writes
+from app.schemas import Change
+
+
+class ChangeRepository(BaseSqlAlchemyRepository):
+    def get_changes(self, *, since: int, limit: int) -> list[Change]:
+        """The first limit changes after the sequence number since."""
+
+        query = (
+            select(ChangeModel.id, ChangeModel.table_name, ChangeModel.row_id, ChangeModel.operation, ChangeModel.data)
+            .filter(ChangeModel.id > since)
+            .order_by(ChangeModel.id.asc())
+            .limit(limit)
+        )
+        return [
+            Change(
+                seq=seq,
+                table=table,
+                id=row_id,
+                operation=operation,
+                data=None if data is None else json.loads(data),
+            )
+            for seq, table, row_id, operation, data in self.session.execute(query)
+        ]
+
+    def get_last_seq(self) -> int:
+        return self.session.execute(select(func.max(ChangeModel.id))).scalar() or 0
+
+    @writes
+    def compact_changes(self, *, before: datetime) -> int:
+        """
+        Deletes the changes logged before before (UTC) which are superseded
+        by a newer change of the same row, and returns how many. The last
+        change of every row is kept, so a client syncing from any sequence
+        number still gets the current state of every row changed after it.
+        """
+
+        newer = aliased(ChangeModel)
+        superseded = exists().where(
+            newer.table_name == ChangeModel.table_name,
+            newer.row_id == ChangeModel.row_id,
+            newer.id > ChangeModel.id,
+        )
+        query = delete(ChangeModel).filter(ChangeModel.created_at < before, superseded)
+        return self.session.execute(query).rowcount
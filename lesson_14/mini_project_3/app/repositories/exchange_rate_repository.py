@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+
+from app.constants import RATE_SCALE, Currencies
+from app.models import ExchangeRateModel
+from app.repositories.base_repository import BaseSqlAlchemyRepository, writes
+from app.schemas import ExchangeRate
+
+
+EXCHANGE_RATES_CACHE_KEY = "exchange_rates"
+
+
+class ExchangeRateRepository(BaseSqlAlchemyRepository):
+    def get_rates(self) -> dict[Currencies, int]:
+        """The stored rates per currency, scaled by RATE_SCALE."""
+
+        return self._get_cached(EXCHANGE_RATES_CACHE_KEY, self._load_rates, table=ExchangeRateModel.__tablename__)
+
+    def _load_rates(self) -> dict[Currencies, int]:
+        query = select(ExchangeRateModel.currency, ExchangeRateModel.rate)
+        return dict(self.session.execute(query).tuples().all())
+
+    def get_exchange_rates(self) -> list[ExchangeRate]:
+        return [
+            ExchangeRate(currency=currency, rate=Decimal(rate) / RATE_SCALE)
+            for currency, rate in sorted(self.get_rates().items())
+        ]
+
+    @writes
+    def set_exchange_rate(self, *, currency: Currencies, rate: Decimal) -> ExchangeRate:
+        query = insert(ExchangeRateModel).values(currency=currency, rate=int(rate * RATE_SCALE))
+        query = query.on_conflict_do_update(
+            index_elements=[ExchangeRateModel.currency],
+            set_={"rate": query.excluded.rate},
+        )
+        self.session.execute(query)
+        self._bump_versions(ExchangeRateModel.__tablename__)
+        return ExchangeRate(currency=currency, rate=rate)
+
+    @writes
+    def delete_exchange_rate(self, *, currency: Currencies) -> None:
+        query = delete(ExchangeRateModel).filter(ExchangeRateModel.currency == currency)
+        if self.session.execute(query).rowcount == 0:
+            raise self.ExchangeRateNotFound(currency)
+        self._bump_versions(ExchangeRateModel.__tablename__)
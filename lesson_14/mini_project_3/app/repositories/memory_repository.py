@@ -0,0 +1,517 @@
+"""
+In-memory storage backend, selected with Settings(storage_backend="memory").
+
+MemoryStore keeps the categories and transactions in dicts by id, with two
+secondary indexes kept up to date on every write: the ids of the
+transactions of every category (for the searches by category and the
+category deletes) and the totals per category and currency (for the
+summary, like the triggers of the SQLite tables). The Memory*Repository
+classes have the interface and exceptions of the SQLAlchemy repositories
+for the categories, transactions, exchange rates and summary, so the
+routers work with either of them, and tests/test_repository_conformance.py
+checks both.
+
+A store lives in one process and nothing is persisted, so it is meant for
+the tests and for single-process deployments which can lose their data.
+The writes are applied at once, under the lock of the store, instead of in
+a DB transaction. The search pages, exports and range summaries scan the
+matching transactions, there is no index by amount or created_at.
+"""
+
+import threading
+from collections import defaultdict
+from collections.abc import Iterable, Iterator, Sequence
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from app.constants import RATE_SCALE, Currencies
+from app.conversion import convert_totals
+from app.models import CategoryModel, ExchangeRateModel, TransactionModel
+from app.repositories.base_repository import BaseSqlAlchemyRepository
+from app.repositories.summary_repository import Bucket, _as_utc, bucket_summaries
+from app.repositories.transaction_repository import (
+    TRANSACTIONS_NOT_FOUND_MSG,
+    _utc_now,
+    decode_cursor,
+    encode_cursor,
+    hash_request,
+)
+from app.schemas import (
+    BucketSummary,
+    Category,
+    CategoryFacet,
+    CategorySummary,
+    ConvertedCategorySummary,
+    CreateTransaction,
+    CurrencyFacet,
+    ExchangeRate,
+    Transaction,
+    TransactionChanges,
+    TransactionFacets,
+    TransactionFilter,
+    TransactionSearchPage,
+    TransactionSearchParams,
+    TransactionSearchRequest,
+    TransactionSummary,
+)
+
+
+class MemoryStore:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.categories: dict[int, Category] = {}
+        self.category_names: set[str] = set()
+        # NOTE: ids only grow and are never reused, so the dicts iterate in id order
+        self.transactions: dict[int, Transaction] = {}
+        # naive UTC, like the stored datetimes
+        self.created_at: dict[int, datetime] = {}
+        self.category_transaction_ids: defaultdict[int, set[int]] = defaultdict(set)
+        # (category_id, currency) -> [total, transaction_count]
+        self.totals: dict[tuple[int, Currencies], list[int]] = {}
+        # scaled by RATE_SCALE, like the stored rates
+        self.rates: dict[Currencies, int] = {}
+        self.versions: defaultdict[str, int] = defaultdict(int)
+        # key -> (request hash, expires at, transaction)
+        self.idempotency_keys: dict[str, tuple[str, datetime, Transaction]] = {}
+        self.last_category_id = 0
+        self.last_transaction_id = 0
+
+    def add_transaction(self, transaction: Transaction, created_at: datetime) -> None:
+        self.transactions[transaction.id] = transaction
+        self.created_at[transaction.id] = created_at
+        self._index(transaction)
+
+    def replace_transaction(self, transaction: Transaction) -> None:
+        # NOTE: assigning an existing key keeps its position, so the id order
+        self._unindex(self.transactions[transaction.id])
+        self.transactions[transaction.id] = transaction
+        self._index(transaction)
+
+    def remove_transaction(self, transaction_id: int) -> Transaction:
+        transaction = self.transactions.pop(transaction_id)
+        del self.created_at[transaction_id]
+        self._unindex(transaction)
+        return transaction
+
+    def _index(self, transaction: Transaction) -> None:
+        self.category_transaction_ids[transaction.category_id].add(transaction.id)
+        total = self.totals.setdefault((transaction.category_id, transaction.currency), [0, 0])
+        total[0] += transaction.amount
+        total[1] += 1
+
+    def _unindex(self, transaction: Transaction) -> None:
+        self.category_transaction_ids[transaction.category_id].discard(transaction.id)
+        key = (transaction.category_id, transaction.currency)
+        total = self.totals[key]
+        total[0] -= transaction.amount
+        total[1] -= 1
+        if total[1] <= 0:
+            del self.totals[key]
+
+    def bump_version(self, table: str) -> None:
+        self.versions[table] += 1
+
+
+class BaseMemoryRepository:
+    store: MemoryStore
+
+    TransactionNotFound = BaseSqlAlchemyRepository.TransactionNotFound
+    CategoryNotFound = BaseSqlAlchemyRepository.CategoryNotFound
+    CategoryAlreadyExists = BaseSqlAlchemyRepository.CategoryAlreadyExists
+    ExchangeRateNotFound = BaseSqlAlchemyRepository.ExchangeRateNotFound
+    InvalidCursor = BaseSqlAlchemyRepository.InvalidCursor
+    SummaryIndexDisabled = BaseSqlAlchemyRepository.SummaryIndexDisabled
+    IdempotencyKeyReused = BaseSqlAlchemyRepository.IdempotencyKeyReused
+
+    def __init__(self, *, store: MemoryStore):
+        self.store = store
+
+
+class MemoryCategoryRepository(BaseMemoryRepository):
+    def create_category(self, *, name: str) -> Category:
+        with self.store.lock:
+            if name in self.store.category_names:
+                raise self.CategoryAlreadyExists(name)
+            self.store.last_category_id += 1
+            category = Category(id=self.store.last_category_id, name=name)
+            self.store.categories[category.id] = category
+            self.store.category_names.add(name)
+            self.store.bump_version(CategoryModel.__tablename__)
+        return category
+
+    def get_categories(self) -> list[Category]:
+        with self.store.lock:
+            return list(self.store.categories.values())
+
+    def get_category_rows(self) -> list[tuple]:
+        with self.store.lock:
+            return [(category.name, category.id) for category in self.store.categories.values()]
+
+    def delete_category(self, *, category_id: int) -> dict | None:
+        with self.store.lock:
+            if category_id not in self.store.categories:
+                return {"msg": "Category not found"}
+            if self.store.category_transaction_ids.get(category_id):
+                return {"msg": "Cannot delete category associated with transactions. So delete the transactions first."}
+            category = self.store.categories.pop(category_id)
+            self.store.category_names.discard(category.name)
+            self.store.category_transaction_ids.pop(category_id, None)
+            self.store.bump_version(CategoryModel.__tablename__)
+        return {"msg": "Category deleted successfully"}
+
+
+class MemoryTransactionRepository(BaseMemoryRepository):
+    def create_transaction(self, *, transaction_to_create: CreateTransaction) -> Transaction:
+        with self.store.lock:
+            if transaction_to_create.category_id not in self.store.categories:
+                raise self.CategoryNotFound
+            transaction = self._add(transaction_to_create)
+            self.store.bump_version(TransactionModel.__tablename__)
+        return transaction
+
+    def create_transactions(
+        self,
+        *,
+        transactions_to_create: Sequence[CreateTransaction],
+        chunk_size: int = 500,
+    ) -> list[int | None]:
+        with self.store.lock:
+            ids = [
+                self._add(transaction).id if transaction.category_id in self.store.categories else None
+                for transaction in transactions_to_create
+            ]
+            if any(transaction_id is not None for transaction_id in ids):
+                self.store.bump_version(TransactionModel.__tablename__)
+        return ids
+
+    def create_transaction_once(
+        self,
+        *,
+        transaction_to_create: CreateTransaction,
+        idempotency_key: str,
+        ttl: float,
+    ) -> tuple[Transaction, bool]:
+        body_hash = hash_request(transaction_to_create)
+        with self.store.lock:
+            stored = self.store.idempotency_keys.get(idempotency_key)
+            if stored is not None and stored[1] > _utc_now():
+                stored_hash, _, transaction = stored
+                if stored_hash != body_hash:
+                    raise self.IdempotencyKeyReused
+                return transaction, True
+
+            transaction = self.create_transaction(transaction_to_create=transaction_to_create)
+            expires_at = _utc_now() + timedelta(seconds=ttl)
+            self.store.idempotency_keys[idempotency_key] = (body_hash, expires_at, transaction)
+        return transaction, False
+
+    def delete_expired_idempotency_keys(self) -> int:
+        now = _utc_now()
+        with self.store.lock:
+            expired = [key for key, (_, expires_at, _) in self.store.idempotency_keys.items() if expires_at <= now]
+            for key in expired:
+                del self.store.idempotency_keys[key]
+        return len(expired)
+
+    def get_transaction(self, *, transaction_id: int) -> Transaction:
+        with self.store.lock:
+            if (transaction := self.store.transactions.get(transaction_id)) is None:
+                raise self.TransactionNotFound
+        return transaction
+
+    def update_transaction(self, *, transaction_id: int, transaction_to_update: CreateTransaction) -> Transaction:
+        with self.store.lock:
+            if transaction_id not in self.store.transactions:
+                raise self.TransactionNotFound
+            if transaction_to_update.category_id not in self.store.categories:
+                raise self.CategoryNotFound
+            transaction = Transaction(id=transaction_id, **transaction_to_update.model_dump())
+            self.store.replace_transaction(transaction)
+            self.store.bump_version(TransactionModel.__tablename__)
+        return transaction
+
+    def delete_transaction(self, *, transaction_id: int) -> None:
+        with self.store.lock:
+            if transaction_id not in self.store.transactions:
+                raise self.TransactionNotFound
+            self.store.remove_transaction(transaction_id)
+            self.store.bump_version(TransactionModel.__tablename__)
+        return {"msg": "Transaction deleted successfully."}
+
+    def search_transactions(self, *, params: TransactionSearchParams) -> dict | list[Transaction]:
+        with self.store.lock:
+            transactions = list(self._filter(params))
+        if not transactions:
+            return {"msg": TRANSACTIONS_NOT_FOUND_MSG}
+        return transactions
+
+    def search_transaction_page(self, *, params: TransactionSearchRequest) -> TransactionSearchPage:
+        """
+        Same as the SQLAlchemy one: the matching transactions sorted by
+        params.order_by then id, from the keyset cursor or offset, with
+        their total and facets.
+        """
+
+        order_by = params.order_by or "id"
+        order_name = order_by.removeprefix("-")
+        descending = order_by.startswith("-")
+        after = None if params.cursor is None else decode_cursor(params.cursor, order_by=order_by)
+
+        def keyset(transaction: Transaction) -> tuple[int | datetime, int]:
+            if order_name == "created_at":
+                return self.store.created_at[transaction.id], transaction.id
+            return getattr(transaction, order_name), transaction.id
+
+        with self.store.lock:
+            matching = sorted(
+                ((keyset(transaction), transaction) for transaction in self._filter(params)),
+                key=lambda item: item[0],
+                reverse=descending,
+            )
+
+        rows = matching
+        if after is not None:
+            rows = [item for item in rows if (item[0] < after if descending else item[0] > after)]
+        start = params.offset or 0
+        # NOTE: one more row than the limit, which tells if there is a next page
+        rows = rows[start:] if params.limit is None else rows[start : start + params.limit + 1]
+        next_cursor = None
+        if params.limit is not None and len(rows) > params.limit:
+            rows = rows[: params.limit]
+            if rows:
+                (value, last_id), _ = rows[-1]
+                next_cursor = encode_cursor(value, last_id, order_by=order_by)
+
+        facets = None
+        if params.facets:
+            currencies: defaultdict[Currencies, list[int]] = defaultdict(lambda: [0, 0])
+            categories: defaultdict[int, list[int]] = defaultdict(lambda: [0, 0])
+            for _, transaction in matching:
+                for facet in (currencies[transaction.currency], categories[transaction.category_id]):
+                    facet[0] += 1
+                    facet[1] += transaction.amount
+            facets = TransactionFacets(
+                currencies=[
+                    CurrencyFacet(currency=currency, count=count, total=total)
+                    for currency, (count, total) in sorted(currencies.items(), key=lambda item: item[0].value)
+                ],
+                categories=[
+                    CategoryFacet(category_id=category_id, count=count, total=total)
+                    for category_id, (count, total) in sorted(categories.items())
+                ],
+            )
+        return TransactionSearchPage(
+            transactions=[transaction for _, transaction in rows],
+            total=len(matching),
+            next_cursor=next_cursor,
+            facets=facets,
+        )
+
+    def get_all_transactions(self, *, limit: int | None = None, after_id: int | None = None) -> list[Transaction]:
+        with self.store.lock:
+            return list(islice(self._after(after_id), limit))
+
+    def stream_transactions(
+        self,
+        *,
+        limit: int | None = None,
+        after_id: int | None = None,
+        batch_size: int = 1000,
+    ) -> Iterator[list[Transaction]]:
+        yield from _batches(self.get_all_transactions(limit=limit, after_id=after_id), batch_size)
+
+    def search_transaction_rows(self, *, params: TransactionSearchParams) -> list[tuple]:
+        with self.store.lock:
+            return [_row(transaction) for transaction in self._filter(params)]
+
+    def get_all_transaction_rows(self, *, limit: int | None = None, after_id: int | None = None) -> list[tuple]:
+        with self.store.lock:
+            return [_row(transaction) for transaction in islice(self._after(after_id), limit)]
+
+    def stream_transaction_rows(
+        self,
+        *,
+        limit: int | None = None,
+        after_id: int | None = None,
+        batch_size: int = 1000,
+    ) -> Iterator[list[tuple]]:
+        yield from _batches(self.get_all_transaction_rows(limit=limit, after_id=after_id), batch_size)
+
+    def export_transaction_rows(
+        self,
+        *,
+        params: TransactionSearchParams,
+        batch_size: int = 10_000,
+    ) -> Iterator[list[tuple]]:
+        with self.store.lock:
+            rows = [
+                (
+                    transaction.id,
+                    transaction.category_id,
+                    transaction.amount,
+                    transaction.currency.value,
+                    # NOTE: the text of the EXPORT_COLUMNS, as SQLite stores the datetimes
+                    self.store.created_at[transaction.id].strftime("%Y-%m-%d %H:%M:%S.%f"),
+                )
+                for transaction in self._filter(params)
+            ]
+        yield from _batches(rows, batch_size)
+
+    def update_transactions(
+        self,
+        *,
+        params: TransactionFilter,
+        changes: TransactionChanges,
+        dry_run: bool = False,
+    ) -> int:
+        values = changes.model_dump(exclude_none=True)
+        with self.store.lock:
+            matching = list(self._filter(params))
+            if dry_run:
+                return len(matching)
+            if matching and "category_id" in values and values["category_id"] not in self.store.categories:
+                raise self.CategoryNotFound
+            for transaction in matching:
+                self.store.replace_transaction(transaction.model_copy(update=values))
+            if matching:
+                self.store.bump_version(TransactionModel.__tablename__)
+        return len(matching)
+
+    def delete_transactions(self, *, params: TransactionFilter, dry_run: bool = False) -> int:
+        with self.store.lock:
+            matching = list(self._filter(params))
+            if dry_run:
+                return len(matching)
+            for transaction in matching:
+                self.store.remove_transaction(transaction.id)
+            if matching:
+                self.store.bump_version(TransactionModel.__tablename__)
+        return len(matching)
+
+    def _add(self, transaction_to_create: CreateTransaction) -> Transaction:
+        self.store.last_transaction_id += 1
+        transaction = Transaction(id=self.store.last_transaction_id, **transaction_to_create.model_dump())
+        self.store.add_transaction(transaction, _utc_now())
+        return transaction
+
+    def _after(self, after_id: int | None) -> Iterator[Transaction]:
+        transactions = self.store.transactions.values()
+        if after_id is None:
+            return iter(transactions)
+        return (transaction for transaction in transactions if transaction.id > after_id)
+
+    def _filter(self, params: TransactionSearchParams | TransactionFilter) -> Iterator[Transaction]:
+        """The transactions matching params, in id order, from the narrowest index."""
+
+        transactions = self.store.transactions
+        candidates: Iterable[int] = transactions.keys()
+        if isinstance(params, TransactionFilter) and params.ids is not None:
+            candidates = sorted(set(params.ids))
+        elif params.category_id is not None:
+            candidates = sorted(self.store.category_transaction_ids.get(params.category_id, ()))
+        for transaction_id in candidates:
+            transaction = transactions.get(transaction_id)
+            if transaction is not None and _matches(transaction, params):
+                yield transaction
+
+
+class MemorySummaryRepository(BaseMemoryRepository):
+    def get_sumary_per_category(self) -> list[CategorySummary]:
+        with self.store.lock:
+            totals = sorted(
+                (category_id, currency, total) for (category_id, currency), (total, _) in self.store.totals.items()
+            )
+        summaries: dict[int, CategorySummary] = {}
+        for category_id, currency, total in totals:
+            summary = summaries.setdefault(category_id, CategorySummary(id=category_id, currencies=[]))
+            summary.currencies.append(TransactionSummary(currency=currency, total=total))
+        return list(summaries.values())
+
+    def get_converted_summary_per_category(self, *, currency: Currencies) -> list[ConvertedCategorySummary]:
+        with self.store.lock:
+            rates = dict(self.store.rates)
+            rows = [
+                (category_id, row_currency, total)
+                for (category_id, row_currency), (total, _) in self.store.totals.items()
+            ]
+        if missing_rates := ({currency} | {row_currency for _, row_currency, _ in rows}) - rates.keys():
+            raise self.ExchangeRateNotFound(*sorted(missing_rates))
+        return [
+            ConvertedCategorySummary(id=category_id, currency=currency, total=total)
+            for category_id, total in convert_totals(rows, rates=rates, to=currency)
+        ]
+
+    def get_range_summary(
+        self,
+        *,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        bucket: Bucket = "month",
+    ) -> list[BucketSummary]:
+        start, end = _as_utc(start), _as_utc(end)
+        aggregates = defaultdict(lambda: [0, 0])
+        with self.store.lock:
+            for transaction in self.store.transactions.values():
+                created_at = self.store.created_at[transaction.id]
+                if (start is not None and created_at < start) or (end is not None and created_at >= end):
+                    continue
+                day = created_at.date()
+                aggregate = aggregates[
+                    (day if bucket == "day" else day.replace(day=1), transaction.category_id, transaction.currency)
+                ]
+                aggregate[0] += transaction.amount
+                aggregate[1] += 1
+        return bucket_summaries(aggregates)
+
+    def verify_summary_index(self):
+        raise self.SummaryIndexDisabled
+
+
+class MemoryExchangeRateRepository(BaseMemoryRepository):
+    def get_rates(self) -> dict[Currencies, int]:
+        with self.store.lock:
+            return dict(self.store.rates)
+
+    def get_exchange_rates(self) -> list[ExchangeRate]:
+        return [
+            ExchangeRate(currency=currency, rate=Decimal(rate) / RATE_SCALE)
+            for currency, rate in sorted(self.get_rates().items())
+        ]
+
+    def set_exchange_rate(self, *, currency: Currencies, rate: Decimal) -> ExchangeRate:
+        with self.store.lock:
+            self.store.rates[currency] = int(rate * RATE_SCALE)
+            self.store.bump_version(ExchangeRateModel.__tablename__)
+        return ExchangeRate(currency=currency, rate=rate)
+
+    def delete_exchange_rate(self, *, currency: Currencies) -> None:
+        with self.store.lock:
+            if self.store.rates.pop(currency, None) is None:
+                raise self.ExchangeRateNotFound(currency)
+            self.store.bump_version(ExchangeRateModel.__tablename__)
+
+
+class MemoryVersionRepository(BaseMemoryRepository):
+    def get_versions(self, *, tables: tuple[str, ...]) -> dict[str, int]:
+        with self.store.lock:
+            return {table: self.store.versions.get(table, 0) for table in tables}
+
+
+def _matches(transaction: Transaction, params: TransactionSearchParams) -> bool:
+    return (
+        (params.category_id is None or transaction.category_id == params.category_id)
+        and (params.min_amount is None or transaction.amount >= params.min_amount)
+        and (params.max_amount is None or transaction.amount <= params.max_amount)
+        and (params.currency is None or transaction.currency == params.currency)
+    )
+
+
+def _batches(items: list, batch_size: int) -> Iterator[list]:
+    for start in range(0, len(items), batch_size):
+        yield items[start : start + batch_size]
+
+
+def _row(transaction: Transaction) -> tuple:
+    # NOTE: the TRANSACTION_COLUMNS of the SQLAlchemy repository, with the currency as stored
+    return (transaction.category_id, transaction.amount, transaction.currency.value, transaction.id)
@@ -1,23 +1,130 @@
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from datetime import UTC, date, datetime, time, timedelta
 from itertools import groupby
-from sqlalchemy import func, select
+from typing import Literal
 
-from app.models import CategoryModel, TransactionModel
-from app.repositories.base_repository import BaseSqlAlchemyRepository
-from app.schemas import CategorySummary, TransactionSummary
+from sqlalchemy import ColumnElement, Date, TableClause, delete, func, insert, select
+
+from app.constants import Currencies
+from app.conversion import convert_matrix, convert_totals
+from app.models import CategoryCurrencyTotalModel, DailyTotalModel, DbModel, MonthlyTotalModel, TransactionModel
+from app.repositories.archive_repository import ArchiveRepository
+from app.repositories.base_repository import BaseAsyncSqlAlchemyRepository, BaseSqlAlchemyRepository
+from app.repositories.exchange_rate_repository import ExchangeRateRepository
+from app.schemas import BucketSummary, CategorySummary, ConvertedCategorySummary, TotalsDrift, TransactionSummary
+
+
+Bucket = Literal["day", "month"]
+DateRange = tuple[date | None, date | None]
+DatetimeRange = tuple[datetime | None, datetime | None]
+
+
+def _totals_keys(transactions: TableClause) -> tuple[ColumnElement, ...]:
+    return transactions.c.category_id, transactions.c.currency
+
+
+def _daily_keys(transactions: TableClause) -> tuple[ColumnElement, ...]:
+    return func.date(transactions.c.created_at, type_=Date).label("day"), *_totals_keys(transactions)
+
+
+def _monthly_keys(transactions: TableClause) -> tuple[ColumnElement, ...]:
+    month = func.date(transactions.c.created_at, "start of month", type_=Date).label("month")
+    return month, *_totals_keys(transactions)
+
+
+# the tables maintained by the triggers, with how they group the transactions
+_AGGREGATES: tuple[tuple[type[DbModel], Callable[[TableClause], tuple[ColumnElement, ...]]], ...] = (
+    (CategoryCurrencyTotalModel, _totals_keys),
+    (DailyTotalModel, _daily_keys),
+    (MonthlyTotalModel, _monthly_keys),
+)
+
+
+def _ceil_day(moment: datetime) -> date:
+    return moment.date() if moment.time() == time() else moment.date() + timedelta(days=1)
+
+
+def _ceil_month(day: date) -> date:
+    if day.day == 1:
+        return day
+    return (day.replace(day=1) + timedelta(days=31)).replace(day=1)
+
+
+def _as_utc(moment: datetime | None) -> datetime | None:
+    # the transactions are stored in UTC without timezone
+    if moment is None or moment.tzinfo is None:
+        return moment
+    return moment.astimezone(UTC).replace(tzinfo=None)
+
+
+def _split_range(
+    start: datetime | None,
+    end: datetime | None,
+    bucket: Bucket,
+) -> tuple[list[DatetimeRange], list[DateRange], list[DateRange]]:
+    """
+    Splits [start, end) in the ranges answered by each source: the whole
+    months from the monthly rollup (only for month buckets), the whole days
+    left at the edges from the daily rollup, and the partial days left at
+    the edges from the transactions themselves. None is an open bound.
+    """
+
+    first_day = None if start is None else _ceil_day(start)
+    last_day = None if end is None else end.date()
+    if first_day is not None and last_day is not None and first_day >= last_day:
+        return [(start, end)], [], []
+
+    raw_ranges = []
+    if start is not None and start < datetime.combine(first_day, time()):
+        raw_ranges.append((start, datetime.combine(first_day, time())))
+    if end is not None and datetime.combine(last_day, time()) < end:
+        raw_ranges.append((datetime.combine(last_day, time()), end))
+
+    first_month = None if first_day is None else _ceil_month(first_day)
+    last_month = None if last_day is None else last_day.replace(day=1)
+    if bucket == "day" or (first_month is not None and last_month is not None and first_month >= last_month):
+        return raw_ranges, [(first_day, last_day)], []
+
+    daily_ranges = []
+    if first_day is not None and first_day < first_month:
+        daily_ranges.append((first_day, first_month))
+    if last_day is not None and last_month < last_day:
+        daily_ranges.append((last_month, last_day))
+    return raw_ranges, daily_ranges, [(first_month, last_month)]
+
+
+def bucket_summaries(aggregates: dict[tuple[date, int, Currencies], list[int]]) -> list[BucketSummary]:
+    """
+    The BucketSummary list of the [total, transaction_count] aggregates per
+    (bucket, category_id, currency), in that order, without the empty ones.
+    """
+
+    summaries = []
+    keys = sorted(key for key, (_, transaction_count) in aggregates.items() if transaction_count)
+    for bucket_start, bucket_keys in groupby(keys, key=lambda key: key[0]):
+        categories = [
+            CategorySummary(
+                id=category_id,
+                currencies=[TransactionSummary(currency=key[2], total=aggregates[key][0]) for key in category_keys],
+            )
+            for category_id, category_keys in groupby(bucket_keys, key=lambda key: key[1])
+        ]
+        summaries.append(BucketSummary(bucket=bucket_start, categories=categories))
+    return summaries
 
 
 class SummaryRepository(BaseSqlAlchemyRepository):
     def get_sumary_per_category(self) -> list[CategorySummary]:
-        query = (
-            select(
-                CategoryModel.id.label("category_id"),
-                TransactionModel.currency,
-                func.sum(TransactionModel.amount).label("total"),
-            )
-            .join(CategoryModel, CategoryModel.id == TransactionModel.category_id)
-            .group_by(CategoryModel.id, TransactionModel.currency)
-            .order_by(CategoryModel.id.asc(), TransactionModel.currency.asc())
-        )
+        if self.summary_index is not None:
+            return self.summary_index.get(self.session).summary
+
+        # NOTE: read from the materialized totals instead of grouping every transaction
+        query = select(
+            CategoryCurrencyTotalModel.category_id,
+            CategoryCurrencyTotalModel.currency,
+            CategoryCurrencyTotalModel.total,
+        ).order_by(CategoryCurrencyTotalModel.category_id.asc(), CategoryCurrencyTotalModel.currency.asc())
         results = self.session.execute(query).mappings()
         return [
             CategorySummary(
@@ -29,3 +136,210 @@ class SummaryRepository(BaseSqlAlchemyRepository):
             )
             for category_id, summaries in groupby(results, key=lambda result: result.category_id)
         ]
+
+    def get_converted_summary_per_category(self, *, currency: Currencies) -> list[ConvertedCategorySummary]:
+        """
+        The total per category across every currency, converted to currency
+        with the exchange rates (see app.conversion).
+        """
+
+        rates = ExchangeRateRepository(session=self.session, cache=self.cache).get_rates()
+        if self.summary_index is not None:
+            snapshot = self.summary_index.get(self.session)
+            if missing_rates := ({currency} | snapshot.currencies()) - rates.keys():
+                raise self.ExchangeRateNotFound(*sorted(missing_rates))
+            converted = convert_matrix(snapshot.category_ids, snapshot.totals, rates=rates, to=currency)
+        else:
+            query = select(
+                CategoryCurrencyTotalModel.category_id,
+                CategoryCurrencyTotalModel.currency,
+                CategoryCurrencyTotalModel.total,
+            )
+            rows = self.session.execute(query).tuples().all()
+            if missing_rates := ({currency} | {row_currency for _, row_currency, _ in rows}) - rates.keys():
+                raise self.ExchangeRateNotFound(*sorted(missing_rates))
+            converted = convert_totals(rows, rates=rates, to=currency)
+
+        return [
+            ConvertedCategorySummary(id=category_id, currency=currency, total=total)
+            for category_id, total in converted
+        ]
+
+    def get_range_summary(
+        self,
+        *,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        bucket: Bucket = "month",
+    ) -> list[BucketSummary]:
+        """
+        The totals per day or month bucket, category and currency of the
+        transactions created from start to end (exclusive). The whole months
+        and days are read from the rollups, so only the partial days at the
+        edges are aggregated from the transactions, including the archives
+        of those days (the other archives are not even attached).
+        """
+
+        start, end = _as_utc(start), _as_utc(end)
+        raw_ranges, daily_ranges, monthly_ranges = _split_range(start, end, bucket)
+        to_bucket = (lambda day: day) if bucket == "day" else (lambda day: day.replace(day=1))
+
+        aggregates = defaultdict(lambda: [0, 0])
+        for day, category_id, currency, total, transaction_count in (
+            *self._get_rollup_rows(MonthlyTotalModel, MonthlyTotalModel.month, monthly_ranges),
+            *self._get_rollup_rows(DailyTotalModel, DailyTotalModel.day, daily_ranges),
+            *self._get_transaction_rows(raw_ranges),
+        ):
+            aggregate = aggregates[(to_bucket(day), category_id, currency)]
+            aggregate[0] += total
+            aggregate[1] += transaction_count
+        return bucket_summaries(aggregates)
+
+    def _get_rollup_rows(self, model: type[DbModel], bucket_column, ranges: list[DateRange]) -> Iterable[tuple]:
+        for first, last in ranges:
+            query = select(
+                bucket_column,
+                model.category_id,
+                model.currency,
+                model.total,
+                model.transaction_count,
+            )
+            if first is not None:
+                query = query.filter(bucket_column >= first)
+            if last is not None:
+                query = query.filter(bucket_column < last)
+            yield from self.session.execute(query).tuples().all()
+
+    def _get_transaction_rows(self, ranges: list[DatetimeRange]) -> Iterable[tuple]:
+        archive_repository = ArchiveRepository(session=self.session)
+        for first, last in ranges:
+            archives = archive_repository.get_archives(
+                start=None if first is None else first.date(),
+                end=None if last is None else _ceil_day(last),
+            )
+            yield from self._aggregate_range(TransactionModel.__table__, first, last)
+            for archive in archives:
+                with archive_repository.attached(archive) as archived_transactions:
+                    yield from self._aggregate_range(archived_transactions, first, last)
+
+    def _aggregate_range(self, transactions: TableClause, first: datetime | None, last: datetime | None) -> list[tuple]:
+        query = _aggregate_query(transactions, _daily_keys(transactions))
+        if first is not None:
+            query = query.filter(transactions.c.created_at >= first)
+        if last is not None:
+            query = query.filter(transactions.c.created_at < last)
+        return self.session.execute(query).tuples().all()
+
+    def verify_totals(self) -> list[TotalsDrift]:
+        """
+        Recomputes the totals from the transactions (including the archived
+        ones) and returns every bucket where they differ from the materialized
+        ones.
+        """
+
+        stored = {
+            (row.category_id, row.currency): (row.total, row.transaction_count)
+            for row in self.session.execute(select(CategoryCurrencyTotalModel)).scalars()
+        }
+        expected = self._aggregate_transactions(_totals_keys)
+
+        drifts = []
+        for category_id, currency in sorted(stored.keys() | expected.keys()):
+            stored_total, stored_count = stored.get((category_id, currency), (0, 0))
+            expected_total, expected_count = expected.get((category_id, currency), (0, 0))
+            if (stored_total, stored_count) != (expected_total, expected_count):
+                drifts.append(
+                    TotalsDrift(
+                        category_id=category_id,
+                        currency=currency,
+                        stored_total=stored_total,
+                        expected_total=expected_total,
+                        stored_transaction_count=stored_count,
+                        expected_transaction_count=expected_count,
+                    )
+                )
+        return drifts
+
+    def rebuild_totals(self) -> None:
+        """
+        Throws away the materialized totals and rollups and recomputes them
+        from scratch.
+        """
+
+        # NOTE: everything is read first, so every archive is detached right after reading it
+        rebuilt = {}
+        for model, keys in _AGGREGATES:
+            names = [key.name for key in keys(TransactionModel.__table__)]
+            rebuilt[model] = [
+                {**dict(zip(names, key)), "total": total, "transaction_count": transaction_count}
+                for key, (total, transaction_count) in self._aggregate_transactions(keys).items()
+            ]
+
+        for model, rows in rebuilt.items():
+            self.session.execute(delete(model))
+            if rows:
+                self.session.execute(insert(model), rows)
+        # NOTE: the totals may have changed, so do the ETags and the summary index
+        self._bump_versions(TransactionModel.__tablename__)
+
+    def verify_summary_index(self) -> list[TotalsDrift]:
+        """
+        The buckets where the summary index differs from the totals, after
+        which it is rebuilt from them (see SummaryIndex.verify).
+        """
+
+        if self.summary_index is None:
+            raise self.SummaryIndexDisabled
+        return self.summary_index.verify(self.session)
+
+    def _aggregate_transactions(
+        self,
+        keys: Callable[[TableClause], tuple[ColumnElement, ...]],
+    ) -> dict[tuple, tuple[int, int]]:
+        """(total, transaction_count) per keys of every transaction, archived or not."""
+
+        aggregates = defaultdict(lambda: (0, 0))
+
+        def add(transactions: TableClause) -> None:
+            for *key, total, transaction_count in self.session.execute(
+                _aggregate_query(transactions, keys(transactions))
+            ):
+                previous_total, previous_count = aggregates[tuple(key)]
+                aggregates[tuple(key)] = (previous_total + total, previous_count + transaction_count)
+
+        add(TransactionModel.__table__)
+        archive_repository = ArchiveRepository(session=self.session)
+        for archive in archive_repository.get_archives():
+            with archive_repository.attached(archive) as archived_transactions:
+                add(archived_transactions)
+        return dict(aggregates)
+
+
+def _aggregate_query(transactions: TableClause, keys: tuple[ColumnElement, ...]):
+    return select(
+        *keys,
+        func.sum(transactions.c.amount).label("total"),
+        func.count().label("transaction_count"),
+    ).group_by(*keys)
+
+
+class AsyncSummaryRepository(BaseAsyncSqlAlchemyRepository):
+    sync_repository_class = SummaryRepository
+
+    async def get_sumary_per_category(self) -> list[CategorySummary]:
+        return await self._run_sync(SummaryRepository.get_sumary_per_category)
+
+    async def get_converted_summary_per_category(self, *, currency: Currencies) -> list[ConvertedCategorySummary]:
+        return await self._run_sync(SummaryRepository.get_converted_summary_per_category, currency=currency)
+
+    async def verify_summary_index(self) -> list[TotalsDrift]:
+        return await self._run_sync(SummaryRepository.verify_summary_index)
+
+    async def get_range_summary(
+        self,
+        *,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        bucket: Bucket = "month",
+    ) -> list[BucketSummary]:
+        return await self._run_sync(SummaryRepository.get_range_summary, start=start, end=end, bucket=bucket)
@@ -1,12 +1,157 @@
-from sqlalchemy import insert, select
+import base64
+import binascii
+import hashlib
+import json
+from collections.abc import AsyncIterator, Iterator, Sequence
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import (
+    BindParameter,
+    Row,
+    Select,
+    String,
+    bindparam,
+    delete,
+    event,
+    func,
+    literal,
+    null,
+    select,
+    tuple_,
+    type_coerce,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.exc import IntegrityError, NoResultFound
 
-from app.models import TransactionModel
-from app.repositories.base_repository import BaseSqlAlchemyRepository
-from app.schemas import CreateTransaction, Transaction, TransactionSearchParams
+from app.models import CategoryModel, IdempotencyKeyModel, TransactionModel
+from app.prepared_queries import PreparedQueries
+from app.repositories.base_repository import BaseAsyncSqlAlchemyRepository, BaseSqlAlchemyRepository, writes
+from app.schemas import (
+    CategoryFacet,
+    CreateTransaction,
+    CurrencyFacet,
+    Transaction,
+    TransactionChanges,
+    TransactionFacets,
+    TransactionFilter,
+    TransactionSearchPage,
+    TransactionSearchParams,
+    TransactionSearchRequest,
+)
+
+
+# plain columns for the fast serialization path, in the field order of the Transaction schema
+TRANSACTION_COLUMNS = (
+    TransactionModel.category_id,
+    TransactionModel.amount,
+    # the enum value as stored, without converting it to Currencies
+    type_coerce(TransactionModel.currency, String).label("currency"),
+    TransactionModel.id,
+)
+
+# plain columns for the exports, in the order of app.exporters.EXPORT_SCHEMA
+EXPORT_COLUMNS = (
+    TransactionModel.id,
+    TransactionModel.category_id,
+    TransactionModel.amount,
+    type_coerce(TransactionModel.currency, String).label("currency"),
+    # the text as stored, parsed by the exporters
+    type_coerce(TransactionModel.created_at, String).label("created_at"),
+)
+
+# the columns of the changed rows logged by the bulk update, validated as Transaction
+CHANGE_COLUMNS = (TransactionModel.category_id, TransactionModel.amount, TransactionModel.currency, TransactionModel.id)
+
+# columns of the rows of a search page
+PAGE_COLUMN_NAMES = ("id", "category_id", "amount", "currency", "created_at")
+
+TRANSACTIONS_NOT_FOUND_MSG = "Transaction not found for the provided details"
+
+# the optional filters of TransactionSearchParams
+SEARCH_FILTERS = ("category_id", "min_amount", "max_amount", "currency")
+
+
+def search_criteria(filters: frozenset[str], values: dict[str, Any] | None = None) -> list:
+    """
+    The criteria of the set filters. Without values they are bound by name,
+    for the prepared statements, otherwise to the values.
+    """
+
+    def parameter(name: str) -> BindParameter:
+        # NOTE: unique, the bulk UPDATE also binds category_id (and amount, currency) by name in its SET clause
+        return bindparam(name) if values is None else bindparam(name, values[name], unique=True)
+
+    criteria = []
+    if "category_id" in filters:
+        criteria.append(TransactionModel.category_id == parameter("category_id"))
+    if "min_amount" in filters:
+        criteria.append(TransactionModel.amount >= parameter("min_amount"))
+    if "max_amount" in filters:
+        criteria.append(TransactionModel.amount <= parameter("max_amount"))
+    if "currency" in filters:
+        criteria.append(TransactionModel.currency == parameter("currency"))
+    return criteria
+
+
+SEARCH_QUERIES = PreparedQueries(
+    SEARCH_FILTERS,
+    lambda filters: select(TransactionModel).filter(*search_criteria(filters)),
+)
+SEARCH_ROW_QUERIES = PreparedQueries(
+    SEARCH_FILTERS,
+    lambda filters: select(*TRANSACTION_COLUMNS).filter(*search_criteria(filters)),
+)
+
+
+def all_transactions_query(*, after_id: int | None = None) -> Select:
+    """The transactions in id order, after the given id, shared by the sync and async listings."""
+
+    query = select(TransactionModel).order_by(TransactionModel.id.asc())
+    if after_id is not None:
+        query = query.filter(TransactionModel.id > after_id)
+    return query
+
+
+def encode_cursor(value: int | datetime, last_id: int, *, order_by: str) -> str:
+    """The next_cursor of a search page, after the row with the value (of the order_by column) and last_id."""
+
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([order_by, value, last_id]).encode()).decode()
+
+
+def decode_cursor(cursor: str, *, order_by: str) -> tuple[int | datetime, int]:
+    try:
+        cursor_order_by, value, last_id = json.loads(base64.urlsafe_b64decode(cursor))
+        if cursor_order_by != order_by or not isinstance(last_id, int):
+            raise ValueError("cursor of another order")
+        if order_by.removeprefix("-") == "created_at":
+            return datetime.fromisoformat(value), last_id
+        if not isinstance(value, int):
+            raise ValueError("not an integer")
+        return value, last_id
+    except (binascii.Error, ValueError, TypeError) as exception:
+        raise BaseSqlAlchemyRepository.InvalidCursor from exception
+
+
+def transaction_cache_key(transaction_id: int) -> str:
+    return f"transactions:{transaction_id}"
+
+
+def hash_request(transaction_to_create: CreateTransaction) -> str:
+    return hashlib.sha256(transaction_to_create.model_dump_json().encode()).hexdigest()
+
+
+def _utc_now() -> datetime:
+    # NOTE: naive, like the stored datetimes
+    return datetime.now(UTC).replace(tzinfo=None)
 
 
 class TransactionRepository(BaseSqlAlchemyRepository):
+    @writes
     def create_transaction(self, *, transaction_to_create: CreateTransaction) -> Transaction:
         # NOTE: without ORM
         data = {
@@ -19,9 +164,171 @@ class TransactionRepository(BaseSqlAlchemyRepository):
             result = self.session.execute(query).scalar_one()
         except IntegrityError as exception:
             raise self.CategoryNotFound from exception
-        return Transaction.model_validate(result)
+        transaction = Transaction.model_validate(result)
+        self._bump_versions(TransactionModel.__tablename__)
+        self._log_changes(TransactionModel.__tablename__, "create", [transaction.model_dump(mode="json")])
+        return transaction
+
+    @writes
+    def create_transactions(
+        self,
+        *,
+        transactions_to_create: Sequence[CreateTransaction],
+        chunk_size: int = 500,
+    ) -> list[int | None]:
+        """
+        Inserts many transactions inside the current DB transaction, using
+        one multi-row INSERT per chunk instead of one statement per row.
+
+        The category ids are validated once per distinct id, so the result
+        has the new id of every inserted row, or None for the rows whose
+        category does not exist (those rows are not inserted).
+        """
+
+        category_ids = {transaction.category_id for transaction in transactions_to_create}
+        existing_category_ids = set(
+            self.session.execute(select(CategoryModel.id).filter(CategoryModel.id.in_(category_ids))).scalars()
+        )
+
+        positions = []
+        rows = []
+        for position, transaction in enumerate(transactions_to_create):
+            if transaction.category_id in existing_category_ids:
+                positions.append(position)
+                rows.append(
+                    {
+                        "category_id": transaction.category_id,
+                        "amount": transaction.amount,
+                        "currency": transaction.currency,
+                    }
+                )
+
+        query = (
+            insert(TransactionModel)
+            .returning(TransactionModel.id, sort_by_parameter_order=True)
+            .execution_options(insertmanyvalues_page_size=chunk_size)
+        )
+        ids: list[int | None] = [None] * len(transactions_to_create)
+        new_ids = iter(positions)
+        try:
+            for start in range(0, len(rows), chunk_size):
+                chunk = rows[start : start + chunk_size]
+                for row, new_id in zip(chunk, self.session.execute(query, chunk).scalars()):
+                    ids[next(new_ids)] = row["id"] = new_id
+        except IntegrityError as exception:
+            # a category was deleted after being validated
+            raise self.CategoryNotFound from exception
+        if rows:
+            self._bump_versions(TransactionModel.__tablename__)
+            self._log_changes(
+                TransactionModel.__tablename__,
+                "create",
+                [Transaction.model_validate(row).model_dump(mode="json") for row in rows],
+            )
+        return ids
+
+    def create_transaction_once(
+        self,
+        *,
+        transaction_to_create: CreateTransaction,
+        idempotency_key: str,
+        ttl: float,
+    ) -> tuple[Transaction, bool]:
+        """
+        create_transaction deduplicated by idempotency_key: the first request
+        with a key creates the transaction and stores it as the response of
+        the key for ttl seconds, the next ones with the same key (and body)
+        get the stored transaction back without inserting anything. Returns
+        the transaction and if it was replayed.
+
+        The stored responses are also kept in idempotency_cache once they
+        are committed, so most retries do not even read the key.
+        """
+
+        body_hash = hash_request(transaction_to_create)
+        if self.idempotency_cache is not None:
+            cached = self.idempotency_cache.get(idempotency_key)
+            if cached is not None and cached[1] > _utc_now():
+                stored_hash, _, transaction = cached
+                if stored_hash != body_hash:
+                    raise self.IdempotencyKeyReused
+                return transaction, True
+
+        transaction, replayed, expires_at = self._create_transaction_once(
+            transaction_to_create=transaction_to_create,
+            idempotency_key=idempotency_key,
+            request_hash=body_hash,
+            ttl=ttl,
+        )
+        if self.idempotency_cache is not None:
+
+            def cache_response(*args) -> None:
+                self.idempotency_cache.set(idempotency_key, (body_hash, expires_at, transaction))
+
+            # NOTE: a replayed response (or one of the writer) is already committed
+            if replayed or self.writer is not None:
+                cache_response()
+            else:
+                event.listen(self.session, "after_commit", cache_response, once=True)
+        return transaction, replayed
+
+    @writes
+    def _create_transaction_once(
+        self,
+        *,
+        transaction_to_create: CreateTransaction,
+        idempotency_key: str,
+        request_hash: str,
+        ttl: float,
+    ) -> tuple[Transaction, bool, datetime]:
+        now = _utc_now()
+        expires_at = now + timedelta(seconds=ttl)
+        # NOTE: claims the key, or takes over an expired one, in one statement. A concurrent
+        # duplicate conflicts on the unique key once the first one commits, and reads its response
+        claim = (
+            insert(IdempotencyKeyModel)
+            .values(key=idempotency_key, request_hash=request_hash, expires_at=expires_at)
+            .on_conflict_do_update(
+                index_elements=[IdempotencyKeyModel.key],
+                set_={"request_hash": request_hash, "response": None, "expires_at": expires_at},
+                where=IdempotencyKeyModel.expires_at <= now,
+            )
+            .returning(IdempotencyKeyModel.id)
+        )
+        # NOTE: a failed create does not keep the key, even if the DB transaction goes on
+        with self.session.begin_nested():
+            if (key_id := self.session.execute(claim).scalar()) is None:
+                query = select(
+                    IdempotencyKeyModel.request_hash,
+                    IdempotencyKeyModel.response,
+                    IdempotencyKeyModel.expires_at,
+                ).filter(IdempotencyKeyModel.key == idempotency_key)
+                stored_hash, response, stored_expires_at = self.session.execute(query).one()
+                if stored_hash != request_hash:
+                    raise self.IdempotencyKeyReused
+                return Transaction.model_validate_json(response), True, stored_expires_at
+
+            transaction = self.create_transaction(transaction_to_create=transaction_to_create)
+            self.session.execute(
+                update(IdempotencyKeyModel)
+                .filter(IdempotencyKeyModel.id == key_id)
+                .values(response=transaction.model_dump_json())
+            )
+            return transaction, False, expires_at
+
+    @writes
+    def delete_expired_idempotency_keys(self) -> int:
+        query = delete(IdempotencyKeyModel).filter(IdempotencyKeyModel.expires_at <= _utc_now())
+        return self.session.execute(query).rowcount
 
     def get_transaction(self, *, transaction_id: int) -> Transaction:
+        return self._get_cached(
+            transaction_cache_key(transaction_id),
+            lambda: self._load_transaction(transaction_id=transaction_id),
+            table=TransactionModel.__tablename__,
+        )
+
+    def _load_transaction(self, *, transaction_id: int) -> Transaction:
         query = select(TransactionModel).filter(TransactionModel.id == transaction_id)
         try:
             result = self.session.execute(query).scalar_one()
@@ -29,62 +336,396 @@ class TransactionRepository(BaseSqlAlchemyRepository):
             raise self.TransactionNotFound from exception
         return Transaction.model_validate(result)
     
+    @writes
     def update_transaction(self, *, transaction_id: int, transaction_to_update: CreateTransaction) -> Transaction:
+        # NOTE: one UPDATE ... RETURNING, without loading the transaction first
         query = (
-            select(TransactionModel)
+            update(TransactionModel)
             .filter(TransactionModel.id == transaction_id)
-            .with_for_update()
+            .values(
+                category_id=transaction_to_update.category_id,
+                amount=transaction_to_update.amount,
+                currency=transaction_to_update.currency,
+            )
+            .returning(TransactionModel)
         )
-        try:
-            transaction_model = self.session.execute(query).scalar_one()
-        except NoResultFound as exception:
-            raise self.TransactionNotFound from exception
-        
-        transaction_model.category_id = transaction_to_update.category_id
-        transaction_model.amount = transaction_to_update.amount
-        transaction_model.currency = transaction_to_update.currency
-        
-        self.session.add(transaction_model)
-        self.session.flush()
-        
-        return Transaction.model_validate(transaction_model)
-    
+        transaction_model = self.session.execute(query).scalar_one_or_none()
+        if transaction_model is None:
+            raise self.TransactionNotFound
+
+        transaction = Transaction.model_validate(transaction_model)
+        self._bump_versions(TransactionModel.__tablename__)
+        self._log_changes(TransactionModel.__tablename__, "update", [transaction.model_dump(mode="json")])
+        return transaction
+
+    @writes
     def delete_transaction(self, *, transaction_id: int) -> None:
-        query = (
-            select(TransactionModel)
-            .filter(TransactionModel.id == transaction_id)
-            .with_for_update()
-        )
-        try:
-            transaction_model = self.session.execute(query).scalar_one()
-        except NoResultFound as exception:
-            raise self.TransactionNotFound from exception
-        
-        self.session.delete(transaction_model)
-        self.session.flush()
+        query = delete(TransactionModel).filter(TransactionModel.id == transaction_id).returning(TransactionModel.id)
+        if self.session.execute(query).scalar_one_or_none() is None:
+            raise self.TransactionNotFound
+
+        self._bump_versions(TransactionModel.__tablename__)
+        self._log_changes(TransactionModel.__tablename__, "delete", [{"id": transaction_id}])
         return {"msg": "Transaction deleted successfully."}
-    
+
     def search_transactions(self, *, params: TransactionSearchParams) -> dict | list[Transaction]:
-        query = select(TransactionModel)
-        
-        if params.category_id is not None:
-            query = query.filter(TransactionModel.category_id == params.category_id)
-        if params.min_amount is not None:
-            query = query.filter(TransactionModel.amount >= params.min_amount)
-        if params.max_amount is not None:
-            query = query.filter(TransactionModel.amount <= params.max_amount)
-        if params.currency is not None:
-            query = query.filter(TransactionModel.currency == params.currency)
-        
-        results = self.session.execute(query).scalars().all()
+        query, parameters = SEARCH_QUERIES.get(params)
+        results = self.session.execute(query, parameters).scalars().all()
         
         if not results:
-            return {"msg": "Transaction not found for the provided details"}
+            return {"msg": TRANSACTIONS_NOT_FOUND_MSG}
         
         transactions = [Transaction.model_validate(item) for item in results]
         return transactions
 
-    def get_all_transactions(self) -> list[Transaction]:
-        query = select(TransactionModel).order_by(TransactionModel.id.asc())
+    def search_transaction_page(self, *, params: TransactionSearchRequest) -> TransactionSearchPage:
+        """
+        A page of the transactions matching the filters of params, with the
+        number of them all and, with params.facets, their count and sum per
+        currency and per category. Everything is read with one statement:
+        the page rows, numbered by row_number() in their order, and the
+        aggregates of the same matching rows are combined with UNION ALL.
+        """
+
+        order_by = params.order_by or "id"
+        order_column_name = order_by.removeprefix("-")
+        descending = order_by.startswith("-")
+        matching = (
+            self._search_transactions_query(params=params)
+            .with_only_columns(*(TransactionModel.__table__.c))
+            .cte("matching")
+        )
+        order_column = matching.c[order_column_name]
+        ordering = [order_column.desc(), matching.c.id.desc()] if descending else [order_column, matching.c.id]
+
+        page = select(
+            literal("transaction").label("kind"),
+            func.row_number().over(order_by=ordering).label("position"),
+            *(matching.c[name] for name in PAGE_COLUMN_NAMES),
+            null().label("facet_count"),
+            null().label("facet_sum"),
+        )
+        if params.cursor is not None:
+            value, last_id = decode_cursor(params.cursor, order_by=order_by)
+            keyset, after = tuple_(order_column, matching.c.id), tuple_(literal(value, order_column.type), last_id)
+            page = page.filter(keyset < after if descending else keyset > after)
+        # NOTE: one more row than the limit, which tells if there is a next page
+        page = page.order_by(*ordering).offset(params.offset)
+        if params.limit is not None:
+            page = page.limit(params.limit + 1)
+        page = page.subquery()
+
+        def aggregate(kind: str, *keys):
+            # the same columns as the page, only the keys are not null
+            columns = {name: null() for name in PAGE_COLUMN_NAMES} | {key.name: key for key in keys}
+            return select(
+                literal(kind),
+                null(),
+                *columns.values(),
+                func.count(),
+                func.sum(matching.c.amount),
+            ).group_by(*keys)
+
+        aggregates = [aggregate("total")]
+        if params.facets:
+            aggregates += [aggregate("currency", matching.c.currency), aggregate("category", matching.c.category_id)]
+        query = union_all(select(page), *aggregates).order_by(page.c.position)
+
+        transactions, total, currencies, categories = [], 0, [], []
+        for row in self.session.execute(query):
+            if row.kind == "transaction":
+                transactions.append(row)
+            elif row.kind == "total":
+                total = row.facet_count
+            elif row.kind == "currency":
+                currencies.append(CurrencyFacet(currency=row.currency, count=row.facet_count, total=row.facet_sum))
+            else:
+                categories.append(CategoryFacet(category_id=row.category_id, count=row.facet_count, total=row.facet_sum))
+
+        next_cursor = None
+        if params.limit is not None and len(transactions) > params.limit:
+            transactions = transactions[: params.limit]
+            if transactions:
+                last = transactions[-1]
+                next_cursor = encode_cursor(getattr(last, order_column_name), last.id, order_by=order_by)
+        return TransactionSearchPage(
+            transactions=[Transaction.model_validate(transaction) for transaction in transactions],
+            total=total,
+            next_cursor=next_cursor,
+            facets=TransactionFacets(
+                currencies=sorted(currencies, key=lambda facet: facet.currency.value),
+                categories=sorted(categories, key=lambda facet: facet.category_id),
+            )
+            if params.facets
+            else None,
+        )
+
+    def get_all_transactions(self, *, limit: int | None = None, after_id: int | None = None) -> list[Transaction]:
+        # NOTE: keyset pagination, the next page starts after the last id of the previous one
+        query = all_transactions_query(after_id=after_id).limit(limit)
         results = self.session.execute(query).scalars().all()
-        return [Transaction.model_validate(item) for item in results]
\ No newline at end of file
+        return [Transaction.model_validate(item) for item in results]
+
+    def stream_transactions(
+        self,
+        *,
+        limit: int | None = None,
+        after_id: int | None = None,
+        batch_size: int = 1000,
+    ) -> Iterator[list[Transaction]]:
+        """
+        Same rows as get_all_transactions, but fetched from the cursor in
+        batches of batch_size rows, so only one batch is kept in memory
+        at a time no matter how big the transactions table is.
+        """
+
+        query = (
+            all_transactions_query(after_id=after_id)
+            .limit(limit)
+            .execution_options(yield_per=batch_size)
+        )
+        for partition in self.session.execute(query).scalars().partitions():
+            yield [Transaction.model_validate(item) for item in partition]
+
+    def search_transaction_rows(self, *, params: TransactionSearchParams) -> list[tuple]:
+        query, parameters = SEARCH_ROW_QUERIES.get(params)
+        return [tuple(row) for row in self.session.execute(query, parameters)]
+
+    def get_all_transaction_rows(self, *, limit: int | None = None, after_id: int | None = None) -> list[tuple]:
+        query = (
+            all_transactions_query(after_id=after_id)
+            .limit(limit)
+            .with_only_columns(*TRANSACTION_COLUMNS)
+        )
+        return [tuple(row) for row in self.session.execute(query)]
+
+    def stream_transaction_rows(
+        self,
+        *,
+        limit: int | None = None,
+        after_id: int | None = None,
+        batch_size: int = 1000,
+    ) -> Iterator[list[tuple]]:
+        query = (
+            all_transactions_query(after_id=after_id)
+            .limit(limit)
+            .with_only_columns(*TRANSACTION_COLUMNS)
+            .execution_options(yield_per=batch_size)
+        )
+        for partition in self.session.execute(query).partitions():
+            yield [tuple(row) for row in partition]
+
+    def export_transaction_rows(
+        self,
+        *,
+        params: TransactionSearchParams,
+        batch_size: int = 10_000,
+    ) -> Iterator[Sequence[Row]]:
+        """
+        The EXPORT_COLUMNS of the transactions matching params, in batches of
+        batch_size rows. The query runs on the connection of the session,
+        skipping the ORM loading of every row, and the rows are not copied
+        into tuples since the exporters only iterate them.
+        """
+
+        query = (
+            self._search_transactions_query(params=params)
+            .with_only_columns(*EXPORT_COLUMNS)
+            .order_by(TransactionModel.id.asc())
+            .execution_options(yield_per=batch_size)
+        )
+        yield from self.session.connection().execute(query).partitions()
+
+    def update_transactions(
+        self,
+        *,
+        params: TransactionFilter,
+        changes: TransactionChanges,
+        dry_run: bool = False,
+    ) -> int:
+        """
+        Applies the changes to every transaction matching params with one
+        UPDATE statement, and returns how many were updated (or would be,
+        with dry_run, which only counts them without the write lock).
+        """
+
+        if dry_run:
+            return self._count_transactions(self._filter_criteria(params=params))
+        return self._update_transactions(params=params, changes=changes)
+
+    @writes
+    def _update_transactions(self, *, params: TransactionFilter, changes: TransactionChanges) -> int:
+        criteria = self._filter_criteria(params=params)
+        # NOTE: "fetch" synchronizes the transactions loaded in the session from the RETURNING rows
+        query = (
+            update(TransactionModel)
+            .filter(*criteria)
+            .values(**changes.model_dump(exclude_none=True))
+            .returning(*CHANGE_COLUMNS)
+            .execution_options(synchronize_session="fetch")
+        )
+        try:
+            updated = [Transaction.model_validate(row) for row in self.session.execute(query)]
+        except IntegrityError as exception:
+            raise self.CategoryNotFound from exception
+        self._changed_transactions([transaction.id for transaction in updated])
+        self._log_changes(
+            TransactionModel.__tablename__,
+            "update",
+            [transaction.model_dump(mode="json") for transaction in updated],
+        )
+        return len(updated)
+
+    def delete_transactions(self, *, params: TransactionFilter, dry_run: bool = False) -> int:
+        """Same as update_transactions but deleting the matching transactions."""
+
+        if dry_run:
+            return self._count_transactions(self._filter_criteria(params=params))
+        return self._delete_transactions(params=params)
+
+    @writes
+    def _delete_transactions(self, *, params: TransactionFilter) -> int:
+        query = (
+            delete(TransactionModel)
+            .filter(*self._filter_criteria(params=params))
+            .returning(TransactionModel.id)
+            .execution_options(synchronize_session="fetch")
+        )
+        deleted_ids = self.session.execute(query).scalars().all()
+        self._changed_transactions(deleted_ids)
+        self._log_changes(TransactionModel.__tablename__, "delete", [{"id": deleted_id} for deleted_id in deleted_ids])
+        return len(deleted_ids)
+
+    def _count_transactions(self, criteria: list) -> int:
+        return self.session.execute(select(func.count()).select_from(TransactionModel).filter(*criteria)).scalar()
+
+    def _changed_transactions(self, transaction_ids: list[int]) -> None:
+        if transaction_ids:
+            self._bump_versions(TransactionModel.__tablename__)
+
+    def _search_transactions_query(self, *, params: TransactionSearchParams):
+        return select(TransactionModel).filter(*self._filter_criteria(params=params))
+
+    def _filter_criteria(self, *, params: TransactionSearchParams | TransactionFilter) -> list:
+        values = {name: value for name in SEARCH_FILTERS if (value := getattr(params, name)) is not None}
+        criteria = search_criteria(frozenset(values), values)
+        if isinstance(params, TransactionFilter) and params.ids is not None:
+            # NOTE: one JSON parameter instead of one per id, which SQLite limits to 32766
+            ids = func.json_each(json.dumps(params.ids)).table_valued("value")
+            criteria.append(TransactionModel.id.in_(select(ids.c.value)))
+        return criteria
+
+
+class AsyncTransactionRepository(BaseAsyncSqlAlchemyRepository):
+    sync_repository_class = TransactionRepository
+
+    async def create_transaction(self, *, transaction_to_create: CreateTransaction) -> Transaction:
+        return await self._run_sync(
+            TransactionRepository.create_transaction,
+            transaction_to_create=transaction_to_create,
+        )
+
+    async def create_transaction_once(
+        self,
+        *,
+        transaction_to_create: CreateTransaction,
+        idempotency_key: str,
+        ttl: float,
+    ) -> tuple[Transaction, bool]:
+        return await self._run_sync(
+            TransactionRepository.create_transaction_once,
+            transaction_to_create=transaction_to_create,
+            idempotency_key=idempotency_key,
+            ttl=ttl,
+        )
+
+    async def get_transaction(self, *, transaction_id: int) -> Transaction:
+        return await self._run_sync(TransactionRepository.get_transaction, transaction_id=transaction_id)
+
+    async def update_transaction(self, *, transaction_id: int, transaction_to_update: CreateTransaction) -> Transaction:
+        return await self._run_sync(
+            TransactionRepository.update_transaction,
+            transaction_id=transaction_id,
+            transaction_to_update=transaction_to_update,
+        )
+
+    async def delete_transaction(self, *, transaction_id: int) -> None:
+        return await self._run_sync(TransactionRepository.delete_transaction, transaction_id=transaction_id)
+
+    async def create_transactions(
+        self,
+        *,
+        transactions_to_create: Sequence[CreateTransaction],
+        chunk_size: int = 500,
+    ) -> list[int | None]:
+        return await self._run_sync(
+            TransactionRepository.create_transactions,
+            transactions_to_create=transactions_to_create,
+            chunk_size=chunk_size,
+        )
+
+    async def update_transactions(
+        self,
+        *,
+        params: TransactionFilter,
+        changes: TransactionChanges,
+        dry_run: bool = False,
+    ) -> int:
+        return await self._run_sync(
+            TransactionRepository.update_transactions,
+            params=params,
+            changes=changes,
+            dry_run=dry_run,
+        )
+
+    async def delete_transactions(self, *, params: TransactionFilter, dry_run: bool = False) -> int:
+        return await self._run_sync(TransactionRepository.delete_transactions, params=params, dry_run=dry_run)
+
+    async def search_transactions(self, *, params: TransactionSearchParams) -> dict | list[Transaction]:
+        return await self._run_sync(TransactionRepository.search_transactions, params=params)
+
+    async def search_transaction_page(self, *, params: TransactionSearchRequest) -> TransactionSearchPage:
+        return await self._run_sync(TransactionRepository.search_transaction_page, params=params)
+
+    async def get_all_transactions(self, *, limit: int | None = None, after_id: int | None = None) -> list[Transaction]:
+        return await self._run_sync(TransactionRepository.get_all_transactions, limit=limit, after_id=after_id)
+
+    async def search_transaction_rows(self, *, params: TransactionSearchParams) -> list[tuple]:
+        return await self._run_sync(TransactionRepository.search_transaction_rows, params=params)
+
+    async def get_all_transaction_rows(self, *, limit: int | None = None, after_id: int | None = None) -> list[tuple]:
+        return await self._run_sync(TransactionRepository.get_all_transaction_rows, limit=limit, after_id=after_id)
+
+    async def stream_transactions(
+        self,
+        *,
+        limit: int | None = None,
+        after_id: int | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[Transaction]]:
+        # NOTE: a generator can not be run with run_sync, so the rows are streamed with the async API
+        query = (
+            all_transactions_query(after_id=after_id)
+            .limit(limit)
+            .execution_options(yield_per=batch_size)
+        )
+        results = await self.session.stream_scalars(query)
+        async for partition in results.partitions():
+            yield [Transaction.model_validate(item) for item in partition]
+
+    async def stream_transaction_rows(
+        self,
+        *,
+        limit: int | None = None,
+        after_id: int | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[list[tuple]]:
+        query = (
+            all_transactions_query(after_id=after_id)
+            .limit(limit)
+            .with_only_columns(*TRANSACTION_COLUMNS)
+            .execution_options(yield_per=batch_size)
+        )
+        results = await self.session.stream(query)
+        async for partition in results.partitions():
+            yield [tuple(row) for row in partition]
@@ -0,0 +1,18 @@
+from sqlalchemy import select
+
+from app.models import TableVersionModel
+from app.repositories.base_repository import BaseAsyncSqlAlchemyRepository, BaseSqlAlchemyRepository
+
+
+class VersionRepository(BaseSqlAlchemyRepository):
+    def get_versions(self, *, tables: tuple[str, ...]) -> dict[str, int]:
+        query = select(TableVersionModel.name, TableVersionModel.version).filter(TableVersionModel.name.in_(tables))
+        versions = dict(self.session.execute(query).tuples().all())
+        return {table: versions.get(table, 0) for table in tables}
+
+
+class AsyncVersionRepository(BaseAsyncSqlAlchemyRepository):
+    sync_repository_class = VersionRepository
+
+    async def get_versions(self, *, tables: tuple[str, ...]) -> dict[str, int]:
+        return await self._run_sync(VersionRepository.get_versions, tables=tables)
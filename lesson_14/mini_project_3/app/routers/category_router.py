@@ -1,12 +1,16 @@
 from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 
-from app.injections import get_category_repository
-from app.repositories.category_repository import CategoryRepository
+from app.injections import ConditionalGet, call_repository, get_category_repository, get_settings
+from app.models import CategoryModel
+from app.profiling import ProfiledRoute
+from app.repositories.category_repository import AsyncCategoryRepository, CategoryRepository
 from app.schemas import Category, CreateCategory
+from app.serializers import encode_categories
+from app.settings import Settings
 
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
 @router.post(
@@ -14,30 +18,43 @@ router = APIRouter()
     status_code=status.HTTP_201_CREATED,
     responses={status.HTTP_409_CONFLICT: {}},
 )
-def create_category(
+async def create_category(
     category_to_create: CreateCategory,
-    category_repository: Annotated[CategoryRepository, Depends(get_category_repository)],
+    category_repository: Annotated[CategoryRepository | AsyncCategoryRepository, Depends(get_category_repository)],
 ) -> Category:
     try:
-        return category_repository.create_category(name=category_to_create.name)
+        return await call_repository(category_repository.create_category, name=category_to_create.name)
     except Exception as exception:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT) from exception
 
 
-@router.get("/", status_code=status.HTTP_200_OK)
-def get_all_categories(
-    category_repository: Annotated[CategoryRepository, Depends(get_category_repository)],
-) -> list[Category]:
-    return category_repository.get_categories()
+@router.get(
+    "/",
+    status_code=status.HTTP_200_OK,
+    response_model=list[Category],
+    dependencies=[Depends(ConditionalGet(CategoryModel.__tablename__))],
+)
+async def get_all_categories(
+    response: Response,
+    category_repository: Annotated[CategoryRepository | AsyncCategoryRepository, Depends(get_category_repository)],
+    settings: Annotated[Settings, Depends(get_settings)],
+) -> list[Category] | Response:
+    if settings.fast_serialization:
+        return Response(
+            encode_categories(await call_repository(category_repository.get_category_rows)),
+            media_type="application/json",
+            headers=dict(response.headers),
+        )
+    return await call_repository(category_repository.get_categories)
 
 @router.delete(
     "/{category_id}",
     status_code=status.HTTP_200_OK,
     responses={status.HTTP_404_NOT_FOUND: {}, status.HTTP_409_CONFLICT: {}},
 )
-def delete_category(
+async def delete_category(
     category_id: int,
-    category_repository: Annotated[CategoryRepository, Depends(get_category_repository)],
+    category_repository: Annotated[CategoryRepository | AsyncCategoryRepository, Depends(get_category_repository)],
 ) -> dict | None:
     ''' Deletes a category by its ID.'''
-    return category_repository.delete_category(category_id=category_id)  
\ No newline at end of file
+    return await call_repository(category_repository.delete_category, category_id=category_id)  
\ No newline at end of file
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from typing import Annotated
+from fastapi import APIRouter, Depends, Header, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session
+
+from app.injections import get_read_only_engine, get_settings
+from app.profiling import ProfiledRoute
+from app.repositories.change_repository import ChangeRepository
+from app.schemas import Change, ChangeFeed
+from app.settings import Settings
+
+
+router = APIRouter(route_class=ProfiledRoute)
+
+# seconds between the comments keeping an idle event stream open
+HEARTBEAT_INTERVAL = 15.0
+
+
+def read_changes(engine: Engine, *, since: int, limit: int) -> tuple[list[Change], int]:
+    # NOTE: a DB transaction per read, one kept open would not see the later changes
+    with Session(bind=engine) as session:
+        change_repository = ChangeRepository(session=session)
+        if limit == 0:
+            return [], change_repository.get_last_seq()
+        changes = change_repository.get_changes(since=since, limit=limit)
+    return changes, changes[-1].seq if changes else since
+
+
+def encode_event(change: Change) -> str:
+    return f"id: {change.seq}\nevent: change\ndata: {change.model_dump_json()}\n\n"
+
+
+@router.get(
+    "/",
+    status_code=status.HTTP_200_OK,
+    response_model=ChangeFeed,
+    responses={status.HTTP_200_OK: {"content": {"text/event-stream": {}}}},
+)
+async def get_changes(
+    request: Request,
+    engine: Annotated[Engine, Depends(get_read_only_engine)],
+    settings: Annotated[Settings, Depends(get_settings)],
+    since: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=0, le=1000)] = 100,
+    wait: Annotated[float | None, Query(ge=0)] = None,
+    accept: Annotated[str, Header()] = "",
+    last_event_id: Annotated[int | None, Header()] = None,
+) -> ChangeFeed | StreamingResponse:
+    '''
+    The changes of the categories and transactions after the sequence
+    number since, in order, with the whole row (only its id when deleted).
+    A client keeps its copy in sync by applying them and passing
+    next_since as since the next time, limit=0 only returns the current
+    sequence number (to read before a full pull of the lists).
+
+    With wait (seconds) the request waits for the first changes when there
+    are none yet (long-poll). With Accept: text/event-stream they are sent
+    as Server-Sent Events, as they happen, for wait seconds (the longest by
+    default), and a reconnecting client resumes from its Last-Event-ID.
+    '''
+    max_wait = min(settings.changes_max_wait if wait is None else wait, settings.changes_max_wait)
+    deadline = time.monotonic() + max_wait
+    if "text/event-stream" in accept:
+        since = since if last_event_id is None else last_event_id
+        events = stream_changes(engine, since=since, limit=limit or 100, deadline=deadline, settings=settings)
+        return StreamingResponse(events, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    if wait is None:
+        deadline = time.monotonic()
+    # NOTE: the writes of other processes are only seen by reading the log again
+    while True:
+        changes, next_since = await run_in_threadpool(read_changes, engine, since=since, limit=limit)
+        if changes or limit == 0 or time.monotonic() >= deadline or await request.is_disconnected():
+            return ChangeFeed(changes=changes, next_since=next_since)
+        await asyncio.sleep(min(settings.changes_poll_interval, deadline - time.monotonic()))
+
+
+async def stream_changes(
+    engine: Engine,
+    *,
+    since: int,
+    limit: int,
+    deadline: float,
+    settings: Settings,
+) -> AsyncIterator[str]:
+    # NOTE: the reconnection delay of the client, the stream ends at the deadline
+    yield f"retry: {int(settings.changes_poll_interval * 1000)}\n\n"
+    last_sent = time.monotonic()
+    while True:
+        changes, since = await run_in_threadpool(read_changes, engine, since=since, limit=limit)
+        if changes:
+            yield "".join(encode_event(change) for change in changes)
+            last_sent = time.monotonic()
+            if len(changes) == limit:
+                continue
+        now = time.monotonic()
+        if now >= deadline:
+            return
+        if now - last_sent >= HEARTBEAT_INTERVAL:
+            yield ": keep-alive\n\n"
+            last_sent = now
+        await asyncio.sleep(min(settings.changes_poll_interval, deadline - now))
@@ -0,0 +1,51 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.constants import Currencies
+from app.injections import ConditionalGet, get_exchange_rate_repository
+from app.models import ExchangeRateModel
+from app.profiling import ProfiledRoute
+from app.repositories.exchange_rate_repository import ExchangeRateRepository
+from app.schemas import ExchangeRate, SetExchangeRate
+
+
+router = APIRouter(route_class=ProfiledRoute)
+
+
+@router.get(
+    "/",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(ConditionalGet(ExchangeRateModel.__tablename__))],
+)
+def get_exchange_rates(
+    exchange_rate_repository: Annotated[ExchangeRateRepository, Depends(get_exchange_rate_repository)],
+) -> list[ExchangeRate]:
+    return exchange_rate_repository.get_exchange_rates()
+
+
+@router.put("/{currency}", status_code=status.HTTP_200_OK)
+def set_exchange_rate(
+    currency: Currencies,
+    exchange_rate_to_set: SetExchangeRate,
+    exchange_rate_repository: Annotated[ExchangeRateRepository, Depends(get_exchange_rate_repository)],
+) -> ExchangeRate:
+    '''
+    Creates or replaces the rate of a currency: the value of one of its
+    minor units in a reference unit shared by every rate.
+    '''
+    return exchange_rate_repository.set_exchange_rate(currency=currency, rate=exchange_rate_to_set.rate)
+
+
+@router.delete(
+    "/{currency}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={status.HTTP_404_NOT_FOUND: {}},
+)
+def delete_exchange_rate(
+    currency: Currencies,
+    exchange_rate_repository: Annotated[ExchangeRateRepository, Depends(get_exchange_rate_repository)],
+) -> None:
+    try:
+        exchange_rate_repository.delete_exchange_rate(currency=currency)
+    except exchange_rate_repository.ExchangeRateNotFound as exception:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND) from exception
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Request, status
+from fastapi.responses import PlainTextResponse
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", status_code=status.HTTP_200_OK, response_class=PlainTextResponse)
+async def get_metrics(request: Request) -> PlainTextResponse:
+    '''
+    Metrics of the profiled requests in the Prometheus text format, only
+    served when profiling is enabled.
+    '''
+    return PlainTextResponse(request.app.state.metrics.render(), media_type="text/plain; version=0.0.4")
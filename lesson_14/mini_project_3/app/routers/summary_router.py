@@ -1,16 +1,79 @@
-from typing import Annotated
-from fastapi import APIRouter, Depends, status
+from datetime import datetime
+from typing import Annotated, Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
-from app.injections import get_summary_repository
-from app.repositories.summary_repository import SummaryRepository
-from app.schemas import CategorySummary
+from app.constants import Currencies
+from app.injections import ConditionalGet, call_repository, get_summary_repository
+from app.models import ExchangeRateModel, TransactionModel
+from app.profiling import ProfiledRoute
+from app.repositories.summary_repository import AsyncSummaryRepository, SummaryRepository
+from app.schemas import BucketSummary, CategorySummary, ConvertedCategorySummary, TotalsDrift
 
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
-@router.get("/", status_code=status.HTTP_200_OK)
-def get_sumary(
-    sumary_repository: Annotated[SummaryRepository, Depends(get_summary_repository)],
-) -> list[CategorySummary]:
-    return sumary_repository.get_sumary_per_category()
+@router.get(
+    "/",
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_404_NOT_FOUND: {}},
+    dependencies=[Depends(ConditionalGet(TransactionModel.__tablename__, ExchangeRateModel.__tablename__))],
+)
+async def get_sumary(
+    sumary_repository: Annotated[SummaryRepository | AsyncSummaryRepository, Depends(get_summary_repository)],
+    convert_to: Currencies | None = None,
+    start: Annotated[datetime | None, Query(alias="from")] = None,
+    end: Annotated[datetime | None, Query(alias="to")] = None,
+    bucket: Literal["day", "month"] | None = None,
+) -> list[CategorySummary] | list[ConvertedCategorySummary] | list[BucketSummary]:
+    '''
+    Retrieves the totals per category and currency, or with convert_to one
+    total per category converted to that currency with the exchange rates.
+
+    With from, to (exclusive) or bucket, only the transactions created in
+    that range are summarized, per day or month (the default) bucket.
+    '''
+    if start is not None or end is not None or bucket is not None:
+        if convert_to is not None:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                detail="convert_to can not be combined with from, to or bucket",
+            )
+        return await call_repository(
+            sumary_repository.get_range_summary,
+            start=start,
+            end=end,
+            bucket=bucket or "month",
+        )
+
+    if convert_to is None:
+        return await call_repository(sumary_repository.get_sumary_per_category)
+
+    try:
+        return await call_repository(sumary_repository.get_converted_summary_per_category, currency=convert_to)
+    except sumary_repository.ExchangeRateNotFound as exception:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Missing exchange rates for {', '.join(exception.args)}",
+        ) from exception
+
+
+@router.post(
+    "/index/verify",
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_404_NOT_FOUND: {}},
+)
+async def verify_summary_index(
+    sumary_repository: Annotated[SummaryRepository | AsyncSummaryRepository, Depends(get_summary_repository)],
+) -> list[TotalsDrift]:
+    '''
+    Compares the in-process summary index against the totals table and
+    rebuilds it when they diverged, returns the buckets which differed.
+    '''
+    try:
+        return await call_repository(sumary_repository.verify_summary_index)
+    except sumary_repository.SummaryIndexDisabled as exception:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="The summary index is not enabled",
+        ) from exception
@@ -1,44 +1,294 @@
-from locale import currency
-import string
-from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+from collections.abc import AsyncIterator, Callable, Iterator
+from typing import Annotated, Literal
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
-from app.injections import get_category_repository, get_transaction_repository
-from app.repositories.category_repository import CategoryRepository
-from app.repositories.transaction_repository import TransactionRepository
-from app.schemas import Transaction, CreateTransaction, TransactionSearchParams
+from app.exporters import EXPORT_FORMATS
+from app.injections import (
+    ConditionalGet,
+    call_repository,
+    get_export_repository,
+    get_settings,
+    get_transaction_repository,
+)
+from app.models import TransactionModel
+from app.profiling import ProfiledRoute
+from app.repositories.transaction_repository import (
+    TRANSACTIONS_NOT_FOUND_MSG,
+    AsyncTransactionRepository,
+    TransactionRepository,
+)
+from app.schemas import (
+    BulkChangeResponse,
+    BulkDeleteTransactions,
+    BulkTransactionResult,
+    BulkTransactionsResponse,
+    BulkUpdateTransactions,
+    CreateTransaction,
+    Transaction,
+    TransactionChanges,
+    TransactionFilter,
+    TransactionSearchPage,
+    TransactionSearchParams,
+    TransactionSearchRequest,
+)
+from app.serializers import encode_transactions, encode_transactions_ndjson
+from app.settings import Settings
 
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
 @router.post(
     "/",
     status_code=status.HTTP_201_CREATED,
-    responses={status.HTTP_409_CONFLICT: {}},
+    responses={status.HTTP_409_CONFLICT: {}, status.HTTP_422_UNPROCESSABLE_CONTENT: {}},
 )
-def create_transaction(
+async def create_transaction(
     transaction_to_create: CreateTransaction,
-    category_repository: Annotated[CategoryRepository, Depends(get_category_repository)],
-    transaction_repository: Annotated[TransactionRepository, Depends(get_transaction_repository)],
+    response: Response,
+    transaction_repository: Annotated[
+        TransactionRepository | AsyncTransactionRepository,
+        Depends(get_transaction_repository),
+    ],
+    settings: Annotated[Settings, Depends(get_settings)],
+    idempotency_key: Annotated[str | None, Header(min_length=1, max_length=255)] = None,
 ) -> Transaction:
+    '''
+    Creates a transaction. With an Idempotency-Key header, the retries of
+    the request (same key and body) get the transaction created by the
+    first one back, with an Idempotent-Replayed header, instead of
+    creating it again. A key sent with another body is rejected.
+    '''
+    try:
+        if idempotency_key is None:
+            return await call_repository(
+                transaction_repository.create_transaction,
+                transaction_to_create=transaction_to_create,
+            )
+        transaction, replayed = await call_repository(
+            transaction_repository.create_transaction_once,
+            transaction_to_create=transaction_to_create,
+            idempotency_key=idempotency_key,
+            ttl=settings.idempotency_key_ttl,
+        )
+    except transaction_repository.CategoryNotFound as exception:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND) from exception
+    except transaction_repository.IdempotencyKeyReused as exception:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail="The Idempotency-Key was already used with another request body",
+        ) from exception
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return transaction
+
+
+async def get_bulk_transactions_payload(request: Request) -> list[CreateTransaction | str]:
+    '''
+    Parses the body of a bulk request, a JSON array or NDJSON (one transaction
+    per line). Every item is validated on its own so that one invalid row does
+    not reject the whole import, an invalid row is replaced by its error msg.
+    '''
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        items = [line for line in body.splitlines() if line.strip()]
+        validate = CreateTransaction.model_validate_json
+    else:
+        try:
+            items = json.loads(body)
+        except ValueError:
+            items = None
+        if not isinstance(items, list):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                detail="The body must be a JSON array or NDJSON",
+            )
+        validate = CreateTransaction.model_validate
+
+    payload: list[CreateTransaction | str] = []
+    for item in items:
+        try:
+            payload.append(validate(item))
+        except ValidationError as exception:
+            payload.append(
+                "; ".join(
+                    f"{'.'.join(str(loc) for loc in error['loc']) or 'transaction'}: {error['msg']}"
+                    for error in exception.errors()
+                )
+            )
+    return payload
+
+
+@router.post(
+    "/bulk",
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_404_NOT_FOUND: {}, status.HTTP_422_UNPROCESSABLE_CONTENT: {}},
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {"type": "array", "items": {"$ref": "#/components/schemas/CreateTransaction"}},
+                },
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+        },
+    },
+)
+async def create_transactions(
+    payload: Annotated[list[CreateTransaction | str], Depends(get_bulk_transactions_payload)],
+    transaction_repository: Annotated[
+        TransactionRepository | AsyncTransactionRepository,
+        Depends(get_transaction_repository),
+    ],
+    chunk_size: Annotated[int, Query(ge=1, le=5000)] = 500,
+) -> BulkTransactionsResponse:
+    '''
+    Creates many transactions in one DB transaction. The response has the new
+    id or the error of every row, in the same order as the request body.
+    '''
+    valid_rows = [item for item in payload if isinstance(item, CreateTransaction)]
+    try:
+        new_ids = iter(
+            await call_repository(
+                transaction_repository.create_transactions,
+                transactions_to_create=valid_rows,
+                chunk_size=chunk_size,
+            )
+        )
+    except transaction_repository.CategoryNotFound as exception:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND) from exception
+
+    results = []
+    for index, item in enumerate(payload):
+        if isinstance(item, str):
+            results.append(BulkTransactionResult(index=index, error=item))
+        elif (new_id := next(new_ids)) is None:
+            results.append(BulkTransactionResult(index=index, error="category_id: Category not found"))
+        else:
+            results.append(BulkTransactionResult(index=index, id=new_id))
+
+    created = sum(result.id is not None for result in results)
+    return BulkTransactionsResponse(created=created, failed=len(results) - created, results=results)
+
+
+@router.patch(
+    "/",
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_404_NOT_FOUND: {}, status.HTTP_422_UNPROCESSABLE_CONTENT: {}},
+)
+async def update_transactions(
+    bulk_update: BulkUpdateTransactions,
+    transaction_repository: Annotated[
+        TransactionRepository | AsyncTransactionRepository,
+        Depends(get_transaction_repository),
+    ],
+    dry_run: bool = False,
+) -> BulkChangeResponse:
+    '''
+    Applies the changes to every transaction matching the filter (the
+    fields of the search and/or explicit ids) in one statement. With
+    dry_run=true the matching transactions are only counted.
+    '''
+    check_bulk_change(bulk_update.filter, bulk_update.changes)
     try:
-        return transaction_repository.create_transaction(transaction_to_create=transaction_to_create)
+        affected = await call_repository(
+            transaction_repository.update_transactions,
+            params=bulk_update.filter,
+            changes=bulk_update.changes,
+            dry_run=dry_run,
+        )
     except transaction_repository.CategoryNotFound as exception:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND) from exception
+    return BulkChangeResponse(affected=affected, dry_run=dry_run)
+
+
+@router.delete(
+    "/",
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_422_UNPROCESSABLE_CONTENT: {}},
+)
+async def delete_transactions(
+    bulk_delete: BulkDeleteTransactions,
+    transaction_repository: Annotated[
+        TransactionRepository | AsyncTransactionRepository,
+        Depends(get_transaction_repository),
+    ],
+    dry_run: bool = False,
+) -> BulkChangeResponse:
+    ''' Deletes every transaction matching the filter in one statement, see update_transactions. '''
+    check_bulk_change(bulk_delete.filter)
+    affected = await call_repository(
+        transaction_repository.delete_transactions,
+        params=bulk_delete.filter,
+        dry_run=dry_run,
+    )
+    return BulkChangeResponse(affected=affected, dry_run=dry_run)
+
+
+def check_bulk_change(transaction_filter: TransactionFilter, changes: TransactionChanges | None = None) -> None:
+    # NOTE: an empty filter would match every transaction, which is most likely a mistake
+    if not transaction_filter.model_dump(exclude_none=True):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail="The filter needs at least one field",
+        )
+    if changes is not None and not changes.model_dump(exclude_none=True):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail="The changes need at least one field",
+        )
+
+
+@router.get(
+    "/export",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    dependencies=[Depends(ConditionalGet(TransactionModel.__tablename__))],
+)
+def export_transactions(
+    response: Response,
+    params: Annotated[TransactionSearchParams, Depends()],
+    transaction_repository: Annotated[TransactionRepository, Depends(get_export_repository)],
+    format: Literal["csv", "arrow", "parquet"] = "csv",
+    batch_size: Annotated[int, Query(ge=1, le=100_000)] = 10_000,
+) -> StreamingResponse:
+    '''
+    Streams the transactions matching the search filters (as query params)
+    ordered by id as CSV, Arrow IPC stream or Parquet, encoded batch by
+    batch while they are read from the DB. Every batch is a record batch
+    of the Arrow stream and a row group of the Parquet file.
+    '''
+    export_format = EXPORT_FORMATS[format]
+    rows = transaction_repository.export_transaction_rows(params=params, batch_size=batch_size)
+    return StreamingResponse(
+        export_format.export(rows),
+        media_type=export_format.media_type,
+        headers={
+            **response.headers,
+            "Content-Disposition": f'attachment; filename="transactions.{export_format.file_extension}"',
+        },
+    )
 
 
 @router.get(
     "/{transaction_id}",
     status_code=status.HTTP_200_OK,
     responses={status.HTTP_404_NOT_FOUND: {}},
+    dependencies=[Depends(ConditionalGet(TransactionModel.__tablename__))],
 )
-def get_transaction(
+async def get_transaction(
     transaction_id: int,
-    transaction_repository: Annotated[TransactionRepository, Depends(get_transaction_repository)],
+    transaction_repository: Annotated[
+        TransactionRepository | AsyncTransactionRepository,
+        Depends(get_transaction_repository),
+    ],
 ) -> Transaction:
     try:
-        return transaction_repository.get_transaction(transaction_id=transaction_id)
+        return await call_repository(transaction_repository.get_transaction, transaction_id=transaction_id)
     except transaction_repository.TransactionNotFound as exception:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND) from exception
 
@@ -47,16 +297,20 @@ def get_transaction(
     status_code=status.HTTP_200_OK,
     responses={status.HTTP_404_NOT_FOUND: {}},
 )
-def update_transaction(
+async def update_transaction(
     transaction_id: int,
     transaction_to_update: CreateTransaction,
-    transaction_repository: Annotated[TransactionRepository, Depends(get_transaction_repository)],
+    transaction_repository: Annotated[
+        TransactionRepository | AsyncTransactionRepository,
+        Depends(get_transaction_repository),
+    ],
 ) -> Transaction:
     ''' Updates an existing transaction with new data. '''
     try:
-        return transaction_repository.update_transaction(
+        return await call_repository(
+            transaction_repository.update_transaction,
             transaction_id=transaction_id,
-            transaction_to_update=transaction_to_update
+            transaction_to_update=transaction_to_update,
         )
     except transaction_repository.TransactionNotFound as exception:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND) from exception
@@ -66,27 +320,125 @@ def update_transaction(
     status_code=status.HTTP_200_OK,
     responses={status.HTTP_404_NOT_FOUND: {}},
 )
-def delete_transaction(
+async def delete_transaction(
     transaction_id: int,
-    transaction_repository: Annotated[TransactionRepository, Depends(get_transaction_repository)],
+    transaction_repository: Annotated[
+        TransactionRepository | AsyncTransactionRepository,
+        Depends(get_transaction_repository),
+    ],
 ) -> dict | None:
     ''' Deletes a transaction by its ID. '''
     try:
-        return transaction_repository.delete_transaction(transaction_id=transaction_id)
+        return await call_repository(transaction_repository.delete_transaction, transaction_id=transaction_id)
     except transaction_repository.TransactionNotFound as exception:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND) from exception
     
-@router.post("/search", status_code=status.HTTP_200_OK, responses={status.HTTP_404_NOT_FOUND: {}})
-def search_transactions(
-    params: TransactionSearchParams,
-    transaction_repository: Annotated[TransactionRepository, Depends(get_transaction_repository)],
-) -> dict | list[Transaction]:
-    ''' Searches for transactions based on given parameters. '''
-    return transaction_repository.search_transactions(params=params)
-
-@router.get("/", status_code=status.HTTP_200_OK)
-def get_all_transactions(
-    transaction_repository: Annotated[TransactionRepository, Depends(get_transaction_repository)],
-) -> list[Transaction]:
-    ''' Retrieves all transactions. '''
-    return transaction_repository.get_all_transactions()
\ No newline at end of file
+@router.post(
+    "/search",
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_404_NOT_FOUND: {}, status.HTTP_422_UNPROCESSABLE_CONTENT: {}},
+    response_model=dict | list[Transaction] | TransactionSearchPage,
+)
+async def search_transactions(
+    params: TransactionSearchRequest,
+    transaction_repository: Annotated[
+        TransactionRepository | AsyncTransactionRepository,
+        Depends(get_transaction_repository),
+    ],
+    settings: Annotated[Settings, Depends(get_settings)],
+) -> dict | list[Transaction] | TransactionSearchPage | Response:
+    '''
+    Searches for transactions based on given parameters. With any of
+    order_by, limit, offset, cursor or facets the response is a page: the
+    transactions, the total matching the filters, the cursor of the next
+    page and the count and sum per currency and category (with facets).
+    '''
+    if is_page_request(params):
+        try:
+            return await call_repository(transaction_repository.search_transaction_page, params=params)
+        except transaction_repository.InvalidCursor as exception:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                detail="Invalid cursor",
+            ) from exception
+
+    if not settings.fast_serialization:
+        return await call_repository(transaction_repository.search_transactions, params=params)
+
+    if rows := await call_repository(transaction_repository.search_transaction_rows, params=params):
+        return Response(encode_transactions(rows), media_type="application/json")
+    return {"msg": TRANSACTIONS_NOT_FOUND_MSG}
+
+@router.get(
+    "/",
+    status_code=status.HTTP_200_OK,
+    response_model=list[Transaction],
+    dependencies=[Depends(ConditionalGet(TransactionModel.__tablename__))],
+)
+async def get_all_transactions(
+    request: Request,
+    response: Response,
+    transaction_repository: Annotated[
+        TransactionRepository | AsyncTransactionRepository,
+        Depends(get_transaction_repository),
+    ],
+    settings: Annotated[Settings, Depends(get_settings)],
+    limit: Annotated[int | None, Query(ge=1)] = None,
+    after_id: Annotated[int | None, Query(ge=0)] = None,
+    stream: bool = False,
+) -> list[Transaction] | Response:
+    '''
+    Retrieves all transactions ordered by id. Use limit and after_id (the
+    id of the last transaction already received) to page through them, or
+    stream=true to receive them as NDJSON while they are read from the DB.
+    '''
+    if stream:
+        if settings.fast_serialization:
+            rows = transaction_repository.stream_transaction_rows(limit=limit, after_id=after_id)
+            chunks = encode_batches(rows, encode_transactions_ndjson)
+        else:
+            batches = transaction_repository.stream_transactions(limit=limit, after_id=after_id)
+            chunks = encode_batches(batches, encode_transaction_lines)
+        return StreamingResponse(
+            chunks,
+            media_type="application/x-ndjson",
+            # the ETag set by the ConditionalGet injection
+            headers=dict(response.headers),
+        )
+
+    if settings.fast_serialization:
+        rows = await call_repository(transaction_repository.get_all_transaction_rows, limit=limit, after_id=after_id)
+        if limit is not None and len(rows) == limit:
+            # the id is the last column of the rows
+            set_next_page_link(request, response, after_id=rows[-1][-1])
+        return Response(encode_transactions(rows), media_type="application/json", headers=dict(response.headers))
+
+    transactions = await call_repository(transaction_repository.get_all_transactions, limit=limit, after_id=after_id)
+    if limit is not None and len(transactions) == limit:
+        set_next_page_link(request, response, after_id=transactions[-1].id)
+    return transactions
+
+
+def encode_batches(
+    batches: Iterator[list] | AsyncIterator[list],
+    encode: Callable[[list], bytes],
+) -> Iterator[bytes] | AsyncIterator[bytes]:
+    # NOTE: the sync repositories stream with generators, which StreamingResponse iterates in the threadpool
+    if isinstance(batches, AsyncIterator):
+        return (encode(batch) async for batch in batches)
+    return (encode(batch) for batch in batches)
+
+
+def encode_transaction_lines(transactions: list[Transaction]) -> bytes:
+    return b"".join(transaction.model_dump_json().encode() + b"\n" for transaction in transactions)
+
+
+def is_page_request(params: TransactionSearchRequest) -> bool:
+    # NOTE: without them the search answers like before they existed
+    page_fields = {"order_by", "limit", "offset", "cursor", "facets"}
+    return bool(params.model_dump(include=page_fields, exclude_defaults=True))
+
+
+def set_next_page_link(request: Request, response: Response, *, after_id: int) -> None:
+    next_url = request.url.include_query_params(after_id=after_id)
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
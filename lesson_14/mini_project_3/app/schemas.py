@@ -1,4 +1,8 @@
-from pydantic import BaseModel, ConfigDict
+from datetime import date
+from decimal import Decimal
+from typing import Annotated, Any, Literal
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 from app.constants import Currencies
 
@@ -30,6 +34,20 @@ class Transaction(CreateTransaction):
 
     model_config = ConfigDict(from_attributes=True)
 
+# Bulk transaction schemas
+
+
+class BulkTransactionResult(BaseModel):
+    index: int
+    id: int | None = None
+    error: str | None = None
+
+
+class BulkTransactionsResponse(BaseModel):
+    created: int
+    failed: int
+    results: list[BulkTransactionResult]
+
 # Transaction search parameters schema
 
 class TransactionSearchParams(BaseModel):
@@ -38,6 +56,76 @@ class TransactionSearchParams(BaseModel):
     max_amount: float | None = None
     currency: Currencies | None = None
 
+
+class TransactionSearchRequest(TransactionSearchParams):
+    # "-" for descending, the transactions with the same value are ordered by id
+    order_by: Literal["id", "-id", "amount", "-amount", "created_at", "-created_at"] | None = None
+    # 0 for only the total and facets
+    limit: Annotated[int, Field(ge=0)] | None = None
+    offset: Annotated[int, Field(ge=0)] | None = None
+    # the next_cursor of the previous page, instead of an offset
+    cursor: str | None = None
+    facets: bool = False
+
+    @model_validator(mode="after")
+    def check_offset_or_cursor(self) -> "TransactionSearchRequest":
+        if self.offset is not None and self.cursor is not None:
+            raise ValueError("offset and cursor can not be combined")
+        return self
+
+
+class CurrencyFacet(BaseModel):
+    currency: Currencies
+    count: int
+    total: int
+
+
+class CategoryFacet(BaseModel):
+    category_id: int
+    count: int
+    total: int
+
+
+class TransactionFacets(BaseModel):
+    currencies: list[CurrencyFacet]
+    categories: list[CategoryFacet]
+
+
+class TransactionSearchPage(BaseModel):
+    transactions: list[Transaction]
+    # every transaction matching the filters, not only the ones of the page
+    total: int
+    next_cursor: str | None = None
+    facets: TransactionFacets | None = None
+
+
+class TransactionFilter(TransactionSearchParams):
+    # explicit ids, combined with the other filters
+    ids: list[int] | None = None
+
+# Bulk change schemas
+
+
+class TransactionChanges(BaseModel):
+    category_id: int | None = None
+    amount: int | None = None
+    currency: Currencies | None = None
+
+
+class BulkUpdateTransactions(BaseModel):
+    filter: TransactionFilter
+    changes: TransactionChanges
+
+
+class BulkDeleteTransactions(BaseModel):
+    filter: TransactionFilter
+
+
+class BulkChangeResponse(BaseModel):
+    # the transactions changed, or the ones that would be with dry_run
+    affected: int
+    dry_run: bool
+
 # Summary schemas
 
 
@@ -49,3 +137,64 @@ class TransactionSummary(BaseModel):
 class CategorySummary(BaseModel):
     id: int
     currencies: list[TransactionSummary]
+
+
+class BucketSummary(BaseModel):
+    # first day of the day or month bucket
+    bucket: date
+    categories: list[CategorySummary]
+
+
+class ConvertedCategorySummary(BaseModel):
+    id: int
+    currency: Currencies
+    total: int
+
+
+class TotalsDrift(BaseModel):
+    category_id: int
+    currency: Currencies
+    stored_total: int
+    expected_total: int
+    stored_transaction_count: int
+    expected_transaction_count: int
+
+# Exchange rate schemas
+
+
+class SetExchangeRate(BaseModel):
+    # value of one minor unit of the currency in a common reference unit
+    rate: Annotated[Decimal, Field(gt=0, decimal_places=6)]
+
+
+class ExchangeRate(SetExchangeRate):
+    currency: Currencies
+
+# Archive schemas
+
+
+class Archive(BaseModel):
+    file_name: str
+    start: date
+    end: date
+    transaction_count: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+# Change feed schemas
+
+
+class Change(BaseModel):
+    # sequence number, pass the last one seen as since
+    seq: int
+    table: Literal["categories", "transactions"]
+    id: int
+    operation: Literal["create", "update", "delete"]
+    # the row after the change, None when deleted
+    data: dict[str, Any] | None
+
+
+class ChangeFeed(BaseModel):
+    changes: list[Change]
+    # the since of the next request
+    next_since: int
@@ -0,0 +1,122 @@
+"""
+Production entry point: several worker processes serving the API and one
+writer process doing every write of the database (see app.writer).
+
+    python -m app.server --workers 4 --host 0.0.0.0 --port 8000
+
+The workers are uvicorn servers sharing one listening socket. They only
+read (every DB transaction begins DEFERRED) and send their writes over
+a queue to the writer, which group-commits them. The settings come from
+the environment (see Settings). Every worker has its own in-process
+cache, keyed by the table versions, so the writes sent by the others are
+not served from it.
+
+The async mode is not supported, use the default (threadpool) one.
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+
+import uvicorn
+
+from app.database import create_database_engine, migrate_database
+from app.main import create_app
+from app.settings import Settings
+from app.writer import WriteQueue, WriterClient, run_writer
+
+
+logger = logging.getLogger(__name__)
+
+
+def run_worker(
+    settings: Settings,
+    sock: socket.socket,
+    requests: WriteQueue,
+    responses: WriteQueue,
+    worker: int,
+    log_level: str,
+) -> None:
+    """Target of the worker processes."""
+
+    writer = WriterClient(requests=requests, responses=responses, worker=worker, timeout=settings.writer_timeout)
+    config = uvicorn.Config(create_app(settings, writer=writer), log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve(settings: Settings, *, workers: int, host: str, port: int, log_level: str = "info") -> None:
+    if settings.async_mode:
+        raise ValueError("The server does not support the async mode")
+
+    engine = create_database_engine(settings)
+    try:
+        migrate_database(engine)
+    finally:
+        engine.dispose()
+
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+
+    # NOTE: spawned, so no process inherits the engines (or threads) of another
+    context = multiprocessing.get_context("spawn")
+    requests = context.Queue()
+    responses = [context.Queue() for _ in range(workers)]
+    writer = context.Process(target=run_writer, args=(settings, requests, responses), name="writer")
+    writer.start()
+    processes = [
+        context.Process(
+            target=run_worker,
+            args=(settings, sock, requests, responses[worker], worker, log_level),
+            name=f"worker-{worker}",
+        )
+        for worker in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    logger.info("serving on %s:%d with %d workers and a writer", host, port, workers)
+
+    def stop_workers(signum, frame) -> None:
+        for process in processes:
+            if process.pid is not None:
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop_workers)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # NOTE: CTRL+C also reaches the workers, uvicorn shuts them down
+        for process in processes:
+            process.join()
+    finally:
+        # the writer stops once the writes sent by the workers are done
+        requests.put(None)
+        writer.join()
+        sock.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=arguments.log_level.upper())
+    serve(
+        Settings.from_environment(),
+        workers=arguments.workers,
+        host=arguments.host,
+        port=arguments.port,
+        log_level=arguments.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
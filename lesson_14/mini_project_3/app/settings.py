@@ -0,0 +1,70 @@
+import os
+from dataclasses import dataclass, fields
+
+
+@dataclass(frozen=True, kw_only=True)
+class Settings:
+    """
+    Configuration of the app. The defaults can be overridden with BUDGET_*
+    environment variables, for example BUDGET_DATABASE_URL or
+    BUDGET_JOURNAL_MODE, see from_environment.
+    """
+
+    database_url: str = "sqlite:///budget.db"
+    # "sqlalchemy" (database_url) or "memory", see app.repositories.memory_repository
+    storage_backend: str = "sqlalchemy"
+    # serve the CRUD endpoints with AsyncSession (aiosqlite) instead of the threadpool
+    async_mode: bool = False
+    # pool_size + max_overflow is also the number of requests served at the
+    # same time (see ConcurrencyLimitMiddleware), 40 like the threadpool
+    pool_size: int = 10
+    max_overflow: int = 30
+    # SQLite pragmas, applied once per pooled connection
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    mmap_size: int = 256 * 1024 * 1024
+    cache_size: int = -64 * 1024  # negative values are KiB instead of pages
+    busy_timeout: int = 5000  # milliseconds
+    # BEGIN DEFERRED for the GET requests and BEGIN IMMEDIATE for the rest,
+    # instead of the driver beginning the transactions at their first write
+    explicit_transactions: bool = True
+    # encode the list endpoints from column tuples, see app.serializers
+    fast_serialization: bool = False
+    # read-through cache of the repositories, keyed by the table versions (see
+    # BaseSqlAlchemyRepository._get_cached), so it is safe with several processes
+    cache_enabled: bool = True
+    cache_max_size: int = 1024
+    cache_ttl: float = 60.0  # seconds
+    # how long the response of a request with an Idempotency-Key is replayed,
+    # the last ones are also kept in memory
+    idempotency_key_ttl: float = 24 * 60 * 60  # seconds
+    idempotency_cache_max_size: int = 10_000
+    # change feed (GET /changes/): how often a waiting request reads the log
+    # again, the longest it waits and how long superseded entries are kept
+    changes_poll_interval: float = 0.2  # seconds
+    changes_max_wait: float = 60.0  # seconds
+    changes_retention: float = 7 * 24 * 60 * 60  # seconds
+    # serve the summary from an in-process index of the totals, see app.summary_index
+    summary_index: bool = False
+    # Server-Timing headers, /metrics and slow query logs, see app.profiling
+    profiling: bool = False
+    slow_query_threshold: float = 0.1  # seconds
+    # group commit of the writer process of app.server, see app.writer
+    writer_max_batch_size: int = 100
+    writer_max_wait: float = 0.002  # seconds
+    writer_timeout: float = 30.0  # seconds a worker waits for the result of a write
+
+    @classmethod
+    def from_environment(cls) -> "Settings":
+        values = {}
+        for field in fields(cls):
+            if (value := os.environ.get(f"BUDGET_{field.name.upper()}")) is not None:
+                if field.type is bool:
+                    values[field.name] = value.lower() in ("1", "true", "yes")
+                elif field.type is int:
+                    values[field.name] = int(value)
+                elif field.type is float:
+                    values[field.name] = float(value)
+                else:
+                    values[field.name] = value
+        return cls(**values)
@@ -0,0 +1,189 @@
+"""
+Optional in-process index of the summary totals (Settings.summary_index).
+
+The materialized totals (category_currency_totals) are kept as a snapshot
+of compact arrays: the sorted category ids and two categories x currencies
+matrices, of the totals and of the transaction counts (a bucket exists
+while its count is not 0). Every snapshot has the version of the
+transactions table it was read at, so:
+
+- it is loaded at startup, and reloaded after every commit which bumped
+  the version (see BaseSqlAlchemyRepository._bump_versions),
+- a request serves the summary from it only when the version read in its
+  own DB snapshot is the same, otherwise it reads the totals with SQL (and
+  when they are newer they replace the snapshot), which also catches the
+  writes of other processes, like the writer of app.server,
+- verify compares it against the totals table and rebuilds it when they
+  diverged.
+"""
+
+import logging
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import numpy as np
+from sqlalchemy import Engine, select
+from sqlalchemy.orm import Session
+
+from app.constants import Currencies
+from app.conversion import CURRENCIES
+from app.models import CategoryCurrencyTotalModel, TableVersionModel, TransactionModel
+from app.schemas import CategorySummary, TotalsDrift, TransactionSummary
+
+
+logger = logging.getLogger(__name__)
+
+# NOTE: the order of the summary, like ORDER BY currency
+_SORTED_CURRENCY_INDEXES = tuple(sorted(range(len(CURRENCIES)), key=lambda index: CURRENCIES[index].value))
+_CURRENCY_INDEXES = {currency: index for index, currency in enumerate(CURRENCIES)}
+
+
+@dataclass(frozen=True)
+class SummarySnapshot:
+    version: int
+    category_ids: np.ndarray = field(repr=False)
+    totals: np.ndarray = field(repr=False)
+    counts: np.ndarray = field(repr=False)
+
+    @classmethod
+    def from_rows(cls, version: int, rows: Iterable[tuple[int, Currencies, int, int]]) -> "SummarySnapshot":
+        rows = list(rows)
+        category_ids = np.unique(np.array([row[0] for row in rows], dtype=np.int64))
+        totals = np.zeros((len(category_ids), len(CURRENCIES)), dtype=np.int64)
+        counts = np.zeros_like(totals)
+        if rows:
+            category_indexes = np.searchsorted(category_ids, [row[0] for row in rows])
+            currency_indexes = [_CURRENCY_INDEXES[row[1]] for row in rows]
+            totals[category_indexes, currency_indexes] = [row[2] for row in rows]
+            counts[category_indexes, currency_indexes] = [row[3] for row in rows]
+        return cls(version=version, category_ids=category_ids, totals=totals, counts=counts)
+
+    def buckets(self) -> dict[tuple[int, Currencies], tuple[int, int]]:
+        """(total, transaction_count) per (category_id, currency)."""
+
+        category_indexes, currency_indexes = np.nonzero(self.counts)
+        return {
+            (int(self.category_ids[category_index]), CURRENCIES[currency_index]): (
+                int(self.totals[category_index, currency_index]),
+                int(self.counts[category_index, currency_index]),
+            )
+            for category_index, currency_index in zip(category_indexes, currency_indexes)
+        }
+
+    def currencies(self) -> set[Currencies]:
+        return {CURRENCIES[index] for index in np.flatnonzero(self.counts.any(axis=0))}
+
+    @cached_property
+    def summary(self) -> list[CategorySummary]:
+        # NOTE: built once per snapshot, the snapshots are never changed
+        return [
+            CategorySummary(
+                id=int(category_id),
+                currencies=[
+                    TransactionSummary(currency=CURRENCIES[index], total=int(totals[index]))
+                    for index in _SORTED_CURRENCY_INDEXES
+                    if counts[index]
+                ],
+            )
+            for category_id, totals, counts in zip(self.category_ids, self.totals, self.counts)
+        ]
+
+
+def read_version(session: Session) -> int:
+    query = select(TableVersionModel.version).filter(TableVersionModel.name == TransactionModel.__tablename__)
+    return session.execute(query).scalar() or 0
+
+
+def read_snapshot(session: Session) -> SummarySnapshot:
+    """The version and the totals, read in the DB transaction of session."""
+
+    version = read_version(session)
+    rows = session.execute(
+        select(
+            CategoryCurrencyTotalModel.category_id,
+            CategoryCurrencyTotalModel.currency,
+            CategoryCurrencyTotalModel.total,
+            CategoryCurrencyTotalModel.transaction_count,
+        )
+    ).tuples()
+    return SummarySnapshot.from_rows(version, rows)
+
+
+class SummaryIndex:
+    # the table whose version changes with the totals
+    source_table = TransactionModel.__tablename__
+
+    def __init__(self, *, engine: Engine):
+        # NOTE: a read-only engine, see app.database.read_only
+        self.engine = engine
+        self.snapshot: SummarySnapshot | None = None
+        self._lock = threading.Lock()
+
+    def install(self, snapshot: SummarySnapshot, *, force: bool = False) -> SummarySnapshot:
+        """Replaces the snapshot by a newer one (or by any one with force), returns the current one."""
+
+        with self._lock:
+            if force or self.snapshot is None or snapshot.version > self.snapshot.version:
+                self.snapshot = snapshot
+            return self.snapshot
+
+    def refresh(self) -> None:
+        """
+        Reads the totals in a transaction of its own, for after a commit. It
+        never raises, the commit is already done, and on failure the next
+        request which reads a newer version reloads the snapshot anyway.
+        """
+
+        try:
+            with Session(bind=self.engine) as session:
+                self.install(read_snapshot(session))
+        except Exception:
+            logger.exception("the summary index could not be refreshed")
+
+    def get(self, session: Session) -> SummarySnapshot:
+        """The snapshot of the totals at the version seen by the DB transaction of session."""
+
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot.version == read_version(session):
+            return snapshot
+        # NOTE: read in session, so it has the totals at its version
+        snapshot = read_snapshot(session)
+        self.install(snapshot)
+        return snapshot
+
+    def verify(self, session: Session) -> list[TotalsDrift]:
+        """
+        Compares the snapshot against the totals table (read in session) and
+        returns where they differ, after replacing the snapshot by the one
+        read from the table. A snapshot of another version is not compared,
+        it is only replaced when older.
+        """
+
+        expected = read_snapshot(session)
+        snapshot = self.snapshot
+        if snapshot is None or snapshot.version != expected.version:
+            self.install(expected)
+            return []
+
+        stored_buckets, expected_buckets = snapshot.buckets(), expected.buckets()
+        drifts = []
+        for category_id, currency in sorted(stored_buckets.keys() | expected_buckets.keys()):
+            stored_total, stored_count = stored_buckets.get((category_id, currency), (0, 0))
+            expected_total, expected_count = expected_buckets.get((category_id, currency), (0, 0))
+            if (stored_total, stored_count) != (expected_total, expected_count):
+                drifts.append(
+                    TotalsDrift(
+                        category_id=category_id,
+                        currency=currency,
+                        stored_total=stored_total,
+                        expected_total=expected_total,
+                        stored_transaction_count=stored_count,
+                        expected_transaction_count=expected_count,
+                    )
+                )
+        if drifts:
+            logger.warning("the summary index diverged in %d buckets, rebuilt", len(drifts))
+            self.install(expected, force=True)
+        return drifts
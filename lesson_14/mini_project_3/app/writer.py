@@ -0,0 +1,198 @@
+"""
+Single writer of the multi-process server (see app.server).
+
+SQLite lets only one connection write at a time, so instead of every
+worker process waiting for the write lock, the workers only read and send
+their writes (the repository methods marked with writes) to the writer
+process over a queue. The writer runs them in batches:
+
+- a batch starts with the first write waiting and takes the ones arriving
+  during the next max_wait seconds, up to max_batch_size writes,
+- every write runs in a SAVEPOINT, so a failing one is rolled back alone
+  and only its caller gets the exception,
+- the whole batch is committed at once (group commit), one fsync for all
+  of its writes, and only then every caller gets its result.
+"""
+
+import logging
+import pickle
+import threading
+import time
+from collections.abc import Sequence
+from concurrent.futures import Future
+from dataclasses import dataclass
+from itertools import count
+from queue import Empty
+from typing import Any, Protocol
+
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session
+
+from app.database import create_database_engine
+from app.settings import Settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class WriteQueue(Protocol):
+    """A multiprocessing.Queue, or a queue.Queue when everything runs in one process."""
+
+    def put(self, item: Any) -> None: ...
+
+    def get(self, block: bool = True, timeout: float | None = None) -> Any: ...
+
+
+# (worker, call id, repository class, method name, keyword arguments)
+WriteRequest = tuple[int, int, type, str, dict[str, Any]]
+# (call id, succeeded, result or exception)
+WriteResponse = tuple[int, bool, Any]
+
+
+@dataclass
+class WriterStats:
+    batches: int = 0
+    writes: int = 0
+    failed: int = 0
+
+
+class WriterClient:
+    """
+    Sends the writes of a worker to the writer and waits for their results,
+    which a thread (started and stopped by the lifespan) reads from the
+    responses queue of the worker.
+    """
+
+    def __init__(self, *, requests: WriteQueue, responses: WriteQueue, worker: int = 0, timeout: float = 30.0):
+        self.requests = requests
+        self.responses = responses
+        self.worker = worker
+        self.timeout = timeout
+        self._call_ids = count()
+        self._pending: dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._read_responses, name="writer-responses", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.responses.put(None)
+        self._thread.join()
+
+    def call(self, repository_class: type, method: str, kwargs: dict[str, Any]) -> Any:
+        future = Future()
+        with self._lock:
+            call_id = next(self._call_ids)
+            self._pending[call_id] = future
+        self.requests.put((self.worker, call_id, repository_class, method, kwargs))
+        try:
+            return future.result(timeout=self.timeout)
+        finally:
+            with self._lock:
+                self._pending.pop(call_id, None)
+
+    def _read_responses(self) -> None:
+        while (response := self.responses.get()) is not None:
+            call_id, succeeded, value = response
+            with self._lock:
+                future = self._pending.get(call_id)
+            # NOTE: None when the caller already gave up waiting
+            if future is None:
+                continue
+            if succeeded:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+class Writer:
+    def __init__(
+        self,
+        *,
+        engine: Engine,
+        requests: WriteQueue,
+        responses: Sequence[WriteQueue],
+        max_batch_size: int = 100,
+        max_wait: float = 0.002,
+    ):
+        self.engine = engine
+        self.requests = requests
+        self.responses = responses
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.stats = WriterStats()
+
+    def run(self) -> None:
+        """Writes the batches until a None is put on the requests queue."""
+
+        while (first := self.requests.get()) is not None:
+            batch, stopped = self._collect([first])
+            self.write(batch)
+            if stopped:
+                break
+
+    def _collect(self, batch: list[WriteRequest]) -> tuple[list[WriteRequest], bool]:
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                request = self.requests.get(timeout=max(deadline - time.monotonic(), 0))
+            except Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def write(self, batch: Sequence[WriteRequest]) -> None:
+        """Runs the batch in one DB transaction and sends every result to its worker."""
+
+        outcomes: list[tuple[bool, Any]] = []
+        try:
+            with Session(bind=self.engine) as session, session.begin():
+                for _, _, repository_class, method, kwargs in batch:
+                    try:
+                        with session.begin_nested():
+                            outcomes.append((True, getattr(repository_class(session=session), method)(**kwargs)))
+                    except Exception as exception:
+                        outcomes.append((False, exception))
+        except Exception as exception:
+            # NOTE: nothing of the batch was committed
+            logger.exception("the commit of a batch of %d writes failed", len(batch))
+            outcomes = [(False, exception)] * len(batch)
+
+        self.stats.batches += 1
+        self.stats.writes += len(batch)
+        for (worker, call_id, *_), (succeeded, value) in zip(batch, outcomes):
+            if not succeeded:
+                self.stats.failed += 1
+                value = _picklable(value)
+            self.responses[worker].put((call_id, succeeded, value))
+
+
+def _picklable(exception: Exception) -> Exception:
+    # NOTE: the queue pickles in a background thread, where an error would leave the caller waiting
+    try:
+        pickle.dumps(exception)
+    except Exception:
+        return RuntimeError(f"{type(exception).__name__}: {exception}")
+    return exception
+
+
+def run_writer(settings: Settings, requests: WriteQueue, responses: Sequence[WriteQueue]) -> None:
+    """Target of the writer process."""
+
+    engine = create_database_engine(settings)
+    writer = Writer(
+        engine=engine,
+        requests=requests,
+        responses=responses,
+        max_batch_size=settings.writer_max_batch_size,
+        max_wait=settings.writer_max_wait,
+    )
+    try:
+        writer.run()
+    finally:
+        engine.dispose()
+        logger.info("writer stopped: %s", writer.stats)
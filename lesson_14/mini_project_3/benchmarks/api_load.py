@@ -0,0 +1,147 @@
+"""
+Load test of every kind of request of the API, reporting the throughput and
+the latency percentiles per endpoint, against a dataset of benchmarks.data.
+
+    python -m benchmarks.api_load --clients 50 --requests 40 --currency-skew 1.5
+    python -m benchmarks.api_load --save baseline.json
+    python -m benchmarks.api_load --compare baseline.json --threshold 0.2
+
+With --compare it exits with status 1 when any endpoint regressed beyond
+the threshold. Compare runs made with the same arguments on the same
+machine, and mind the noise of short runs. The errors are the responses
+with a 5xx status.
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+import httpx
+
+from app.constants import Currencies
+from app.main import create_app
+from app.settings import Settings
+from benchmarks.data import Dataset, create_database
+from benchmarks.load import Endpoint, LoadResult, asgi_client, find_regressions, run_endpoints, save_baseline
+
+
+def api_endpoints(dataset: Dataset) -> list[Endpoint]:
+    # NOTE: the generator of the clients, the picks of run_endpoints are seeded apart
+    generator = random.Random(dataset.seed)
+    currencies = list(Currencies)
+
+    def transaction_id() -> int:
+        return generator.randint(1, dataset.transactions)
+
+    def new_transaction() -> dict:
+        return {
+            "category_id": generator.randint(1, dataset.categories),
+            "amount": generator.randint(1, dataset.max_amount),
+            "currency": generator.choice(currencies),
+        }
+
+    def search() -> dict:
+        return {"currency": generator.choice(currencies), "min_amount": generator.randint(1, dataset.max_amount)}
+
+    async def get_transaction(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get(f"/transactions/{transaction_id()}")
+
+    async def get_transactions(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get("/transactions/", params={"limit": 100, "after_id": transaction_id()})
+
+    async def search_transactions(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.post("/transactions/search", json=search())
+
+    async def search_transaction_page(client: httpx.AsyncClient) -> httpx.Response:
+        page = {"order_by": "-amount", "limit": 20, "facets": True}
+        return await client.post("/transactions/search", json={**search(), **page})
+
+    async def get_categories(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get("/categories/")
+
+    async def get_summary(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get("/summary/")
+
+    async def get_converted_summary(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get("/summary/", params={"convert_to": generator.choice(currencies)})
+
+    async def get_range_summary(client: httpx.AsyncClient) -> httpx.Response:
+        end = dataset.end.date().isoformat()
+        return await client.get("/summary/", params={"to": end, "bucket": "day"})
+
+    async def create_transaction(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.post("/transactions/", json=new_transaction())
+
+    async def update_transaction(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.put(f"/transactions/{transaction_id()}", json=new_transaction())
+
+    return [
+        Endpoint("GET /transactions/{id}", get_transaction, weight=30),
+        Endpoint("GET /transactions/", get_transactions, weight=5),
+        Endpoint("POST /transactions/search", search_transactions, weight=10),
+        Endpoint("POST /transactions/search (page)", search_transaction_page, weight=10),
+        Endpoint("GET /categories/", get_categories, weight=10),
+        Endpoint("GET /summary/", get_summary, weight=10),
+        Endpoint("GET /summary/?convert_to", get_converted_summary, weight=5),
+        Endpoint("GET /summary/?bucket", get_range_summary, weight=5),
+        Endpoint("POST /transactions/", create_transaction, weight=10),
+        Endpoint("PUT /transactions/{id}", update_transaction, weight=5),
+    ]
+
+
+async def run(dataset: Dataset, arguments: argparse.Namespace) -> dict[str, LoadResult]:
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = f"sqlite:///{directory}/budget.db"
+        create_database(database_url, dataset)
+        settings = Settings(database_url=database_url, async_mode=arguments.async_mode)
+        async with asgi_client(create_app(settings)) as client:
+            return await run_endpoints(
+                client,
+                api_endpoints(dataset),
+                clients=arguments.clients,
+                requests_per_client=arguments.requests,
+                seed=dataset.seed,
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=40, help="requests per client")
+    parser.add_argument("--async-mode", action="store_true")
+    parser.add_argument("--categories", type=int, default=Dataset.categories)
+    parser.add_argument("--transactions", type=int, default=Dataset.transactions)
+    parser.add_argument("--currency-skew", type=float, default=Dataset.currency_skew)
+    parser.add_argument("--category-skew", type=float, default=Dataset.category_skew)
+    parser.add_argument("--seed", type=int, default=Dataset.seed)
+    parser.add_argument("--save", type=Path, help="save the results as a baseline to this file")
+    parser.add_argument("--compare", type=Path, help="fail when the results regressed from this baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="the tolerated regression, 0.2 for 20%%")
+    arguments = parser.parse_args()
+
+    dataset = Dataset(
+        categories=arguments.categories,
+        transactions=arguments.transactions,
+        currency_skew=arguments.currency_skew,
+        category_skew=arguments.category_skew,
+        seed=arguments.seed,
+    )
+    results = asyncio.run(run(dataset, arguments))
+    for name, result in results.items():
+        print(f"{name:<34} {result.summary()}  p95 {result.percentile(95):>8.1f}ms  ({result.requests} requests)")
+
+    if arguments.save is not None:
+        save_baseline(arguments.save, results)
+        print(f"saved the baseline to {arguments.save}")
+    if arguments.compare is not None:
+        if regressions := find_regressions(arguments.compare, results, threshold=arguments.threshold):
+            print("\n".join(["regressions:", *regressions]))
+            sys.exit(1)
+        print(f"no regression beyond {arguments.threshold:.0%} from {arguments.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Compares requests/sec and latency percentiles of the sync (threadpool)
+and the async (AsyncSession + aiosqlite) modes with many concurrent clients.
+
+    python -m benchmarks.async_mode --clients 1000 --requests 10 --write-ratio 0.1
+"""
+
+import argparse
+import asyncio
+import random
+import tempfile
+
+import httpx
+
+from app.constants import Currencies
+from app.main import create_app
+from app.settings import Settings
+from benchmarks.load import asgi_client, run_load
+
+
+async def run(async_mode: bool, arguments: argparse.Namespace) -> str:
+    with tempfile.TemporaryDirectory() as directory:
+        settings = Settings(database_url=f"sqlite:///{directory}/budget.db", async_mode=async_mode)
+        async with asgi_client(create_app(settings)) as client:
+            category_ids = [
+                (await client.post("/categories/", json={"name": f"category {number}"})).json()["id"]
+                for number in range(arguments.categories)
+            ]
+            rows = [
+                {
+                    "category_id": random.choice(category_ids),
+                    "amount": random.randint(1, 100_000),
+                    "currency": random.choice(list(Currencies)),
+                }
+                for _ in range(arguments.transactions)
+            ]
+            (await client.post("/transactions/bulk", json=rows)).raise_for_status()
+
+            async def send_request(client: httpx.AsyncClient) -> httpx.Response:
+                if random.random() < arguments.write_ratio:
+                    return await client.post("/transactions/", json=random.choice(rows))
+                if random.random() < 0.5:
+                    return await client.get("/summary/")
+                return await client.get(f"/transactions/{random.randint(1, arguments.transactions)}")
+
+            result = await run_load(
+                client,
+                send_request,
+                clients=arguments.clients,
+                requests_per_client=arguments.requests,
+            )
+    return result.summary()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=10, help="requests per client")
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--transactions", type=int, default=10_000)
+    arguments = parser.parse_args()
+
+    for name, async_mode in (("sync", False), ("async", True)):
+        print(f"{name:<6} {asyncio.run(run(async_mode, arguments))}")
+
+
+if __name__ == "__main__":
+    main()
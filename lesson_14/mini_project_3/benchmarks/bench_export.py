@@ -0,0 +1,52 @@
+"""
+Measures GET /transactions/export of 100k rows in every format, next to
+the fast serialization path of GET /transactions/?stream=true for scale.
+
+    pytest benchmarks/bench_export.py
+
+The throughput of every format (MB of output per second, at the median)
+is reported as extra info, with the size of the export.
+"""
+
+from collections.abc import Generator
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from pytest import fixture, mark
+
+from app.main import create_app
+from app.settings import Settings
+from benchmarks.data import Dataset, create_database
+
+
+@fixture(scope="module")
+def client(tmp_path_factory) -> Generator[TestClient]:
+    database_url = f"sqlite:///{Path(tmp_path_factory.mktemp('budget')) / 'budget.db'}"
+    create_database(database_url, Dataset(transactions=100_000))
+    settings = Settings(database_url=database_url, fast_serialization=True, cache_enabled=False)
+    with TestClient(create_app(settings)) as client:
+        yield client
+
+
+@mark.parametrize(
+    "url",
+    [
+        "/transactions/export?format=csv",
+        "/transactions/export?format=arrow",
+        "/transactions/export?format=parquet",
+        "/transactions/?stream=true",
+    ],
+    ids=["csv", "arrow", "parquet", "ndjson"],
+)
+def test_export(benchmark, client: TestClient, url: str):
+    def export() -> int:
+        response = client.get(url)
+        response.raise_for_status()
+        return len(response.content)
+
+    size = benchmark(export)
+
+    benchmark.extra_info["megabytes"] = round(size / 1e6, 2)
+    # NOTE: no stats with --benchmark-disable, where export only ran once
+    if benchmark.stats:
+        benchmark.extra_info["megabytes_per_second"] = round(size / 1e6 / benchmark.stats.stats.median, 1)
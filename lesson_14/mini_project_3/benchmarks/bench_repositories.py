@@ -0,0 +1,170 @@
+"""
+Microbenchmarks of every repository method against a uniform and a skewed
+(most of the transactions in a few currencies and categories) dataset of
+benchmarks.data.
+
+    pytest benchmarks/bench_repositories.py
+    pytest benchmarks/bench_repositories.py -k "search or summary"
+
+Every call runs in its own DB transaction, rolled back afterwards, without
+a cache, so the writes do not pile up from one round to the next. The
+archives are left out, creating one writes a new SQLite file every call.
+
+Save a baseline and compare later runs against it, failing when the median
+of any benchmark regressed by more than 20%:
+
+    pytest benchmarks/bench_repositories.py --benchmark-save=baseline
+    pytest benchmarks/bench_repositories.py --benchmark-compare --benchmark-compare-fail=median:20%
+"""
+
+from collections.abc import Callable, Generator
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+from pytest import FixtureRequest, fixture, mark
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session
+
+from app.constants import Currencies
+from app.database import create_database_engine
+from app.repositories.archive_repository import ArchiveRepository
+from app.repositories.category_repository import CategoryRepository
+from app.repositories.exchange_rate_repository import ExchangeRateRepository
+from app.repositories.summary_repository import SummaryRepository
+from app.repositories.transaction_repository import TransactionRepository
+from app.repositories.version_repository import VersionRepository
+from app.schemas import (
+    CreateTransaction,
+    TransactionChanges,
+    TransactionFilter,
+    TransactionSearchParams,
+    TransactionSearchRequest,
+)
+from app.settings import Settings
+from benchmarks.bench_write_paths import run_rolled_back
+from benchmarks.data import Dataset, create_database
+
+
+DATASETS = {
+    "uniform": Dataset(transactions=10_000),
+    "skewed": Dataset(transactions=10_000, currency_skew=1.5, category_skew=1.0),
+}
+
+# the transactions of the datasets have the ids from 1 to transactions
+TRANSACTION_ID = 5_000
+NEW_TRANSACTION = CreateTransaction(category_id=1, amount=500, currency=Currencies.LIRA)
+# a selective and a wide search, in the most frequent currency of the skewed dataset
+NARROW_SEARCH = TransactionSearchParams(category_id=2, currency=Currencies.EURO, min_amount=50_000)
+WIDE_SEARCH = TransactionSearchParams(currency=Currencies.CANADIAN_DOLAR)
+
+
+def consume(batches) -> int:
+    return sum(len(batch) for batch in batches)
+
+
+CALLS: dict[str, Callable[[Session], object]] = {
+    "TransactionRepository.create_transaction": lambda session: TransactionRepository(
+        session=session
+    ).create_transaction(transaction_to_create=NEW_TRANSACTION),
+    "TransactionRepository.create_transactions": lambda session: TransactionRepository(
+        session=session
+    ).create_transactions(transactions_to_create=[NEW_TRANSACTION] * 1_000),
+    "TransactionRepository.get_transaction": lambda session: TransactionRepository(
+        session=session
+    ).get_transaction(transaction_id=TRANSACTION_ID),
+    "TransactionRepository.update_transaction": lambda session: TransactionRepository(
+        session=session
+    ).update_transaction(transaction_id=TRANSACTION_ID, transaction_to_update=NEW_TRANSACTION),
+    "TransactionRepository.delete_transaction": lambda session: TransactionRepository(
+        session=session
+    ).delete_transaction(transaction_id=TRANSACTION_ID),
+    "TransactionRepository.search_transactions[narrow]": lambda session: TransactionRepository(
+        session=session
+    ).search_transactions(params=NARROW_SEARCH),
+    "TransactionRepository.search_transactions[wide]": lambda session: TransactionRepository(
+        session=session
+    ).search_transactions(params=WIDE_SEARCH),
+    "TransactionRepository.search_transaction_page": lambda session: TransactionRepository(
+        session=session
+    ).search_transaction_page(
+        params=TransactionSearchRequest(**WIDE_SEARCH.model_dump(), order_by="-amount", limit=50, facets=True)
+    ),
+    "TransactionRepository.search_transaction_rows": lambda session: TransactionRepository(
+        session=session
+    ).search_transaction_rows(params=WIDE_SEARCH),
+    "TransactionRepository.get_all_transactions": lambda session: TransactionRepository(
+        session=session
+    ).get_all_transactions(limit=1_000, after_id=TRANSACTION_ID),
+    "TransactionRepository.get_all_transaction_rows": lambda session: TransactionRepository(
+        session=session
+    ).get_all_transaction_rows(limit=1_000, after_id=TRANSACTION_ID),
+    "TransactionRepository.stream_transactions": lambda session: consume(
+        TransactionRepository(session=session).stream_transactions()
+    ),
+    "TransactionRepository.stream_transaction_rows": lambda session: consume(
+        TransactionRepository(session=session).stream_transaction_rows()
+    ),
+    "TransactionRepository.export_transaction_rows": lambda session: consume(
+        TransactionRepository(session=session).export_transaction_rows(params=TransactionSearchParams())
+    ),
+    "TransactionRepository.update_transactions": lambda session: TransactionRepository(
+        session=session
+    ).update_transactions(
+        params=TransactionFilter(**NARROW_SEARCH.model_dump()),
+        changes=TransactionChanges(amount=1),
+    ),
+    "TransactionRepository.delete_transactions": lambda session: TransactionRepository(
+        session=session
+    ).delete_transactions(params=TransactionFilter(**NARROW_SEARCH.model_dump())),
+    "CategoryRepository.create_category": lambda session: CategoryRepository(
+        session=session
+    ).create_category(name="new category"),
+    "CategoryRepository.get_categories": lambda session: CategoryRepository(session=session).get_categories(),
+    "CategoryRepository.get_category_rows": lambda session: CategoryRepository(session=session).get_category_rows(),
+    "CategoryRepository.delete_category": lambda session: CategoryRepository(
+        session=session
+    ).delete_category(category_id=1),
+    "SummaryRepository.get_sumary_per_category": lambda session: SummaryRepository(
+        session=session
+    ).get_sumary_per_category(),
+    "SummaryRepository.get_converted_summary_per_category": lambda session: SummaryRepository(
+        session=session
+    ).get_converted_summary_per_category(currency=Currencies.EURO),
+    "SummaryRepository.get_range_summary[month]": lambda session: SummaryRepository(
+        session=session
+    ).get_range_summary(start=datetime(2024, 3, 15, 12), end=datetime(2024, 9, 15, 12), bucket="month"),
+    "SummaryRepository.get_range_summary[day]": lambda session: SummaryRepository(
+        session=session
+    ).get_range_summary(start=datetime(2024, 3, 15, 12), end=datetime(2024, 9, 15, 12), bucket="day"),
+    "SummaryRepository.verify_totals": lambda session: SummaryRepository(session=session).verify_totals(),
+    "SummaryRepository.rebuild_totals": lambda session: SummaryRepository(session=session).rebuild_totals(),
+    "ExchangeRateRepository.get_exchange_rates": lambda session: ExchangeRateRepository(
+        session=session
+    ).get_exchange_rates(),
+    "ExchangeRateRepository.set_exchange_rate": lambda session: ExchangeRateRepository(
+        session=session
+    ).set_exchange_rate(currency=Currencies.EURO, rate=Decimal("1.5")),
+    "ExchangeRateRepository.delete_exchange_rate": lambda session: ExchangeRateRepository(
+        session=session
+    ).delete_exchange_rate(currency=Currencies.EURO),
+    "VersionRepository.get_versions": lambda session: VersionRepository(
+        session=session
+    ).get_versions(tables=("categories", "transactions")),
+    "ArchiveRepository.get_archives": lambda session: ArchiveRepository(session=session).get_archives(),
+}
+
+
+@fixture(scope="module", params=list(DATASETS))
+def engine(request: FixtureRequest, tmp_path_factory) -> Generator[Engine]:
+    database_url = f"sqlite:///{Path(tmp_path_factory.mktemp('budget')) / 'budget.db'}"
+    create_database(database_url, DATASETS[request.param])
+    engine = create_database_engine(Settings(database_url=database_url))
+    yield engine
+    engine.dispose()
+
+
+@mark.parametrize("name", list(CALLS))
+def test_repository_method(benchmark, engine: Engine, name: str):
+    benchmark.group = name
+    run_rolled_back(benchmark, engine, CALLS[name])
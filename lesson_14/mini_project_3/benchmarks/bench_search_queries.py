@@ -0,0 +1,65 @@
+"""
+Per-call overhead of a selective transaction search: the statement built
+(and its cache key computed) on every call, as before, against the one
+prepared for its filter shape (see app.prepared_queries).
+
+    pytest benchmarks/bench_search_queries.py
+
+The statement benchmarks only get the statement, the search ones also run
+it through the session against a budget.db of 10k transactions, where the
+search finds a handful of rows, so most of the time is the overhead.
+"""
+
+from collections.abc import Generator
+from pathlib import Path
+
+from pytest import fixture, mark
+from sqlalchemy.orm import Session
+
+from app.constants import Currencies
+from app.database import create_database_engine
+from app.repositories.transaction_repository import SEARCH_QUERIES, TransactionRepository
+from app.schemas import TransactionSearchParams
+from app.settings import Settings
+from benchmarks.data import Dataset, create_database
+
+
+SEARCH = TransactionSearchParams(category_id=2, currency=Currencies.EURO, min_amount=99_000)
+
+
+@fixture(scope="module")
+def session(tmp_path_factory) -> Generator[Session]:
+    database_url = f"sqlite:///{Path(tmp_path_factory.mktemp('budget')) / 'budget.db'}"
+    create_database(database_url, Dataset(transactions=10_000))
+    engine = create_database_engine(Settings(database_url=database_url))
+    with Session(bind=engine) as session:
+        yield session
+    engine.dispose()
+
+
+def built_search(session: Session) -> list:
+    query = TransactionRepository(session=session)._search_transactions_query(params=SEARCH)
+    return session.execute(query).scalars().all()
+
+
+def prepared_search(session: Session) -> list:
+    query, parameters = SEARCH_QUERIES.get(SEARCH)
+    return session.execute(query, parameters).scalars().all()
+
+
+@mark.parametrize("path", ["built", "prepared"])
+def test_statement(benchmark, session: Session, path: str):
+    transaction_repository = TransactionRepository(session=session)
+    if path == "built":
+        benchmark(lambda: transaction_repository._search_transactions_query(params=SEARCH)._generate_cache_key())
+    else:
+        benchmark(lambda: SEARCH_QUERIES.get(SEARCH)[0]._generate_cache_key())
+
+
+@mark.parametrize("search", [built_search, prepared_search], ids=["built", "prepared"])
+def test_search(benchmark, session: Session, search):
+    expected = built_search(session)
+
+    assert [transaction.id for transaction in benchmark(search, session)] == [
+        transaction.id for transaction in expected
+    ]
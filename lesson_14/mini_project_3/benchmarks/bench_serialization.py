@@ -0,0 +1,43 @@
+"""
+Compares GET /transactions/ served through the pydantic models against the
+fast serialization path (Settings.fast_serialization) for 1k and 100k rows.
+
+    pytest benchmarks/bench_serialization.py
+
+The apps (with their lifespan) run in-process against a budget.db created
+inside a temporary directory, seeded once per number of rows (see benchmarks.data).
+"""
+
+from collections.abc import Generator
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from pytest import FixtureRequest, fixture, mark
+
+from app.main import create_app
+from app.settings import Settings
+from benchmarks.data import Dataset, create_database
+
+
+@fixture(scope="module", params=[1_000, 100_000], ids=lambda rows: f"{rows}-rows")
+def database_url(request: FixtureRequest, tmp_path_factory) -> str:
+    database_url = f"sqlite:///{Path(tmp_path_factory.mktemp('budget')) / 'budget.db'}"
+    create_database(database_url, Dataset(transactions=request.param))
+    return database_url
+
+
+@fixture(params=[False, True], ids=["pydantic", "fast"])
+def client(request: FixtureRequest, database_url: str) -> Generator[TestClient]:
+    settings = Settings(database_url=database_url, fast_serialization=request.param, cache_enabled=False)
+    with TestClient(create_app(settings)) as client:
+        yield client
+
+
+@mark.parametrize("stream", [False, True], ids=["list", "ndjson"])
+def test_get_all_transactions(benchmark, client: TestClient, stream: bool):
+    def get_all_transactions() -> int:
+        response = client.get("/transactions/", params={"stream": stream})
+        response.raise_for_status()
+        return len(response.content)
+
+    assert benchmark(get_all_transactions) > 0
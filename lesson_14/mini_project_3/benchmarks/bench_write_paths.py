@@ -0,0 +1,150 @@
+"""
+Compares the single statement write paths of the repositories (UPDATE ...
+RETURNING and DELETE ... WHERE NOT EXISTS ... RETURNING) against the ones
+they replaced, which loaded the row with SELECT ... FOR UPDATE (and checked
+the transactions of a category with an exists() query) before changing it
+through the ORM.
+
+    pytest benchmarks/bench_write_paths.py
+
+Every call runs in its own DB transaction, rolled back afterwards, against
+a budget.db created inside a temporary directory. The SQL statements per
+call are reported as extra info.
+"""
+
+from collections.abc import Callable, Generator
+from pathlib import Path
+
+from pytest import FixtureRequest, fixture, mark
+from sqlalchemy import Engine, event, exists, insert, select
+from sqlalchemy.orm import Session
+
+from app.constants import Currencies
+from app.database import create_database_engine, migrate_database
+from app.models import CategoryCurrencyTotalModel, CategoryModel, TransactionModel
+from app.repositories.category_repository import CategoryRepository
+from app.repositories.transaction_repository import TransactionRepository
+from app.schemas import CreateTransaction, Transaction
+from app.settings import Settings
+
+
+class LoadingTransactionRepository(TransactionRepository):
+    """The update and delete of the transactions before they became single statements."""
+
+    def update_transaction(self, *, transaction_id: int, transaction_to_update: CreateTransaction) -> Transaction:
+        query = select(TransactionModel).filter(TransactionModel.id == transaction_id).with_for_update()
+        transaction_model = self.session.execute(query).scalar_one()
+        transaction_model.category_id = transaction_to_update.category_id
+        transaction_model.amount = transaction_to_update.amount
+        transaction_model.currency = transaction_to_update.currency
+        self.session.flush()
+        self._bump_versions(TransactionModel.__tablename__)
+        return Transaction.model_validate(transaction_model)
+
+    def delete_transaction(self, *, transaction_id: int) -> None:
+        query = select(TransactionModel).filter(TransactionModel.id == transaction_id).with_for_update()
+        self.session.delete(self.session.execute(query).scalar_one())
+        self.session.flush()
+        self._bump_versions(TransactionModel.__tablename__)
+
+
+class LoadingCategoryRepository(CategoryRepository):
+    """The delete of the categories before it became a single statement."""
+
+    def delete_category(self, *, category_id: int) -> dict | None:
+        if self.session.execute(select(exists().where(CategoryCurrencyTotalModel.category_id == category_id))).scalar():
+            return {"msg": "Cannot delete category associated with transactions. So delete the transactions first."}
+        category = self.session.execute(
+            select(CategoryModel).filter(CategoryModel.id == category_id).with_for_update()
+        ).scalar_one()
+        self.session.delete(category)
+        self.session.flush()
+        self._bump_versions(CategoryModel.__tablename__)
+        return {"msg": "Category deleted successfully"}
+
+
+@fixture(scope="module")
+def engine(tmp_path_factory) -> Generator[Engine]:
+    database_url = f"sqlite:///{Path(tmp_path_factory.mktemp('budget')) / 'budget.db'}"
+    engine = create_database_engine(Settings(database_url=database_url))
+    migrate_database(engine)
+    with engine.begin() as connection:
+        category_ids = connection.execute(
+            insert(CategoryModel).returning(CategoryModel.id),
+            [{"name": f"category {number}"} for number in range(2)],
+        ).scalars().all()
+        connection.execute(
+            insert(TransactionModel),
+            [
+                {"category_id": category_ids[0], "amount": amount, "currency": Currencies.EURO}
+                for amount in range(1, 10_001)
+            ],
+        )
+    yield engine
+    engine.dispose()
+
+
+def run_rolled_back(
+    benchmark,
+    engine: Engine,
+    call: Callable[[Session], object],
+) -> None:
+    statements = []
+
+    def count_statement(*args) -> None:
+        statements.append(args[2])
+
+    def run() -> None:
+        with Session(bind=engine) as session, session.begin():
+            call(session)
+            session.rollback()
+
+    event.listen(engine, "before_cursor_execute", count_statement)
+    try:
+        benchmark(run)
+    finally:
+        event.remove(engine, "before_cursor_execute", count_statement)
+    # NOTE: minus the BEGIN of every run
+    runs = sum(statement.startswith("BEGIN") for statement in statements)
+    benchmark.extra_info["statements_per_call"] = (len(statements) - runs) / runs
+
+
+@fixture(params=["loading", "single_statement"])
+def repositories(request: FixtureRequest) -> tuple[type[TransactionRepository], type[CategoryRepository]]:
+    if request.param == "loading":
+        return LoadingTransactionRepository, LoadingCategoryRepository
+    return TransactionRepository, CategoryRepository
+
+
+def test_update_transaction(benchmark, engine: Engine, repositories):
+    transaction_repository_class, _ = repositories
+    transaction_to_update = CreateTransaction(category_id=1, amount=500, currency=Currencies.LIRA)
+
+    run_rolled_back(
+        benchmark,
+        engine,
+        lambda session: transaction_repository_class(session=session).update_transaction(
+            transaction_id=5_000, transaction_to_update=transaction_to_update
+        ),
+    )
+
+
+def test_delete_transaction(benchmark, engine: Engine, repositories):
+    transaction_repository_class, _ = repositories
+
+    run_rolled_back(
+        benchmark,
+        engine,
+        lambda session: transaction_repository_class(session=session).delete_transaction(transaction_id=5_000),
+    )
+
+
+@mark.parametrize("category_id", [1, 2], ids=["with-transactions", "empty"])
+def test_delete_category(benchmark, engine: Engine, repositories, category_id: int):
+    _, category_repository_class = repositories
+
+    run_rolled_back(
+        benchmark,
+        engine,
+        lambda session: category_repository_class(session=session).delete_category(category_id=category_id),
+    )
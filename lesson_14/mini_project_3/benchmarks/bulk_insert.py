@@ -0,0 +1,75 @@
+"""
+Compares the rows/sec of importing transactions one request at a time
+(POST /transactions/) against POST /transactions/bulk.
+
+    python -m benchmarks.bulk_insert --rows 5000 --chunk-size 500
+
+The app (with its lifespan) runs in-process against a fresh budget.db
+created inside a temporary directory.
+"""
+
+import argparse
+import random
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+from app.constants import Currencies
+from app.main import create_app
+from app.settings import Settings
+
+
+def make_rows(category_ids: list[int], count: int) -> list[dict]:
+    currencies = list(Currencies)
+    return [
+        {
+            "category_id": random.choice(category_ids),
+            "amount": random.randint(1, 100_000),
+            "currency": random.choice(currencies),
+        }
+        for _ in range(count)
+    ]
+
+
+def single_row_import(client: TestClient, rows: list[dict]) -> float:
+    start = time.perf_counter()
+    for row in rows:
+        client.post("/transactions/", json=row).raise_for_status()
+    return time.perf_counter() - start
+
+
+def bulk_import(client: TestClient, rows: list[dict], chunk_size: int) -> float:
+    start = time.perf_counter()
+    response = client.post("/transactions/bulk", json=rows, params={"chunk_size": chunk_size})
+    response.raise_for_status()
+    assert response.json()["created"] == len(rows)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    arguments = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings = Settings(database_url=f"sqlite:///{directory}/budget.db")
+        with TestClient(create_app(settings)) as client:
+            category_ids = [
+                client.post("/categories/", json={"name": f"category {number}"}).json()["id"]
+                for number in range(arguments.categories)
+            ]
+            rows = make_rows(category_ids, arguments.rows)
+
+            single_seconds = single_row_import(client, rows)
+            bulk_seconds = bulk_import(client, rows, arguments.chunk_size)
+
+    print(f"single-row: {arguments.rows / single_seconds:>12,.0f} rows/sec ({single_seconds:.2f}s)")
+    print(f"bulk:       {arguments.rows / bulk_seconds:>12,.0f} rows/sec ({bulk_seconds:.2f}s)")
+    print(f"speedup:    {single_seconds / bulk_seconds:>12,.1f}x")
+
+
+if __name__ == "__main__":
+    main()
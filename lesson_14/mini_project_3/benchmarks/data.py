@@ -0,0 +1,123 @@
+"""
+Synthetic data for the benchmarks: categories, exchange rates and
+transactions, generated from a seed so every run reads the same rows.
+
+    python -m benchmarks.data budget.db --transactions 100000 --currency-skew 1.5
+
+The currencies and the categories follow a Zipf-like distribution, the
+n-th one (from 0) is picked with a weight of 1 / (n + 1) ** skew, so a
+skew of 0 is uniform and the bigger the skew the more the rows pile up
+on the first currencies (or categories), like real budgets do.
+"""
+
+import argparse
+import random
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+from pathlib import Path
+
+from sqlalchemy import Connection, insert
+
+from app.constants import RATE_SCALE, Currencies
+from app.database import create_database_engine, migrate_database
+from app.models import CategoryModel, ExchangeRateModel, TransactionModel
+from app.settings import Settings
+
+
+@dataclass(frozen=True)
+class Dataset:
+    categories: int = 10
+    transactions: int = 10_000
+    currency_skew: float = 0.0
+    category_skew: float = 0.0
+    # the transactions are created during the days before end
+    days: int = 365
+    end: datetime = datetime(2025, 1, 1)
+    max_amount: int = 100_000
+    seed: int = 0
+
+    def transaction_rows(self, category_ids: list[int]) -> Iterator[dict]:
+        generator = random.Random(self.seed)
+        currencies = list(Currencies)
+        currency_weights = _cumulative_weights(len(currencies), self.currency_skew)
+        category_weights = _cumulative_weights(len(category_ids), self.category_skew)
+        seconds = self.days * 24 * 60 * 60
+        start = self.end - timedelta(seconds=seconds)
+        for _ in range(self.transactions):
+            yield {
+                "category_id": generator.choices(category_ids, cum_weights=category_weights)[0],
+                "amount": generator.randint(1, self.max_amount),
+                "currency": generator.choices(currencies, cum_weights=currency_weights)[0],
+                "created_at": start + timedelta(seconds=generator.randrange(seconds)),
+            }
+
+
+def _cumulative_weights(count: int, skew: float) -> list[float]:
+    return list(accumulate(1 / (rank + 1) ** skew for rank in range(count)))
+
+
+def generate(connection: Connection, dataset: Dataset, *, chunk_size: int = 10_000) -> list[int]:
+    """
+    Inserts the dataset, through the triggers which keep the totals and the
+    rollups, inside the transaction of connection. Returns the category ids.
+    """
+
+    category_ids = connection.execute(
+        insert(CategoryModel).returning(CategoryModel.id),
+        [{"name": f"category {number}"} for number in range(dataset.categories)],
+    ).scalars().all()
+    # NOTE: 1 / (n + 1) of the reference unit per minor unit, any rate works for the conversions
+    connection.execute(
+        insert(ExchangeRateModel),
+        [
+            {"currency": currency, "rate": RATE_SCALE // (number + 1)}
+            for number, currency in enumerate(Currencies)
+        ],
+    )
+    rows = dataset.transaction_rows(category_ids)
+    while chunk := list(islice(rows, chunk_size)):
+        connection.execute(insert(TransactionModel), chunk)
+    return category_ids
+
+
+def create_database(database_url: str, dataset: Dataset) -> None:
+    """Creates the schema at database_url and fills it with the dataset."""
+
+    engine = create_database_engine(Settings(database_url=database_url))
+    try:
+        migrate_database(engine)
+        with engine.begin() as connection:
+            generate(connection, dataset)
+    finally:
+        engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("database", type=Path, help="the SQLite file to create")
+    parser.add_argument("--categories", type=int, default=Dataset.categories)
+    parser.add_argument("--transactions", type=int, default=Dataset.transactions)
+    parser.add_argument("--currency-skew", type=float, default=Dataset.currency_skew)
+    parser.add_argument("--category-skew", type=float, default=Dataset.category_skew)
+    parser.add_argument("--days", type=int, default=Dataset.days)
+    parser.add_argument("--seed", type=int, default=Dataset.seed)
+    arguments = parser.parse_args()
+
+    if arguments.database.exists():
+        parser.error(f"{arguments.database} already exists")
+    dataset = Dataset(
+        categories=arguments.categories,
+        transactions=arguments.transactions,
+        currency_skew=arguments.currency_skew,
+        category_skew=arguments.category_skew,
+        days=arguments.days,
+        seed=arguments.seed,
+    )
+    create_database(f"sqlite:///{arguments.database}", dataset)
+    print(f"created {arguments.database} with {dataset}")
+
+
+if __name__ == "__main__":
+    main()
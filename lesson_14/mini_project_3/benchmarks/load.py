@@ -0,0 +1,168 @@
+"""
+In-process ASGI load driver used by the benchmarks: many concurrent
+clients send requests to the app through httpx, without any network or
+server in between, and the latency of every request is recorded.
+
+The results of run_endpoints can be saved as a baseline (save_baseline)
+and later runs compared against it (find_regressions).
+"""
+
+import asyncio
+import json
+import random
+import statistics
+import time
+from collections import defaultdict
+from collections.abc import AsyncGenerator, Awaitable, Callable, Sequence
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI
+
+
+@dataclass
+class LoadResult:
+    seconds: float = 0.0
+    errors: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.requests / self.seconds if self.seconds else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """Latency percentile in milliseconds."""
+
+        if len(self.latencies) < 2:
+            return self.latencies[0] * 1000 if self.latencies else 0.0
+        return statistics.quantiles(self.latencies, n=1000, method="inclusive")[round(percent * 10) - 1] * 1000
+
+    def summary(self) -> str:
+        return (
+            f"{self.requests_per_second:>9,.0f} req/s  "
+            f"p50 {self.percentile(50):>8.1f}ms  p99 {self.percentile(99):>8.1f}ms  "
+            f"errors {self.errors}"
+        )
+
+    def statistics(self) -> dict[str, float]:
+        return {
+            "requests_per_second": self.requests_per_second,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+@asynccontextmanager
+async def asgi_client(app: FastAPI) -> AsyncGenerator[httpx.AsyncClient]:
+    """Runs the lifespan of the app and yields a client that calls it in-process."""
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            yield client
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    send_request: Callable[[httpx.AsyncClient], Awaitable[httpx.Response]],
+    *,
+    clients: int,
+    requests_per_client: int,
+) -> LoadResult:
+    """
+    Starts `clients` concurrent clients, every one of them sends
+    `requests_per_client` requests one after the other.
+    """
+
+    result = LoadResult()
+
+    async def run_client() -> None:
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            response = await send_request(client)
+            result.latencies.append(time.perf_counter() - start)
+            result.errors += response.status_code >= 500
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client() for _ in range(clients)))
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    name: str
+    send_request: Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+    # how often it is picked, relative to the other endpoints
+    weight: float = 1.0
+
+
+async def run_endpoints(
+    client: httpx.AsyncClient,
+    endpoints: Sequence[Endpoint],
+    *,
+    clients: int,
+    requests_per_client: int,
+    seed: int = 0,
+) -> dict[str, LoadResult]:
+    """
+    Like run_load, but every request goes to one of the endpoints, picked
+    by weight. Returns the result of every endpoint, all of them measured
+    over the seconds of the whole run, so their throughputs add up.
+    """
+
+    generator = random.Random(seed)
+    results = defaultdict(LoadResult)
+    weights = [endpoint.weight for endpoint in endpoints]
+    picked = iter(generator.choices(endpoints, weights=weights, k=clients * requests_per_client))
+
+    async def run_client() -> None:
+        for _ in range(requests_per_client):
+            endpoint = next(picked)
+            start = time.perf_counter()
+            response = await endpoint.send_request(client)
+            results[endpoint.name].latencies.append(time.perf_counter() - start)
+            results[endpoint.name].errors += response.status_code >= 500
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client() for _ in range(clients)))
+    seconds = time.perf_counter() - start
+    for result in results.values():
+        result.seconds = seconds
+    return dict(sorted(results.items()))
+
+
+def save_baseline(path: Path, results: dict[str, LoadResult]) -> None:
+    baseline = {name: result.statistics() for name, result in results.items()}
+    path.write_text(json.dumps(baseline, indent=2) + "\n")
+
+
+def find_regressions(path: Path, results: dict[str, LoadResult], *, threshold: float) -> list[str]:
+    """
+    The endpoints of the baseline at path whose throughput dropped, or whose
+    latency percentiles grew, by more than threshold (0.2 for 20%).
+    """
+
+    regressions = []
+    for name, baseline in json.loads(path.read_text()).items():
+        if name not in results:
+            regressions.append(f"{name}: not measured")
+            continue
+        current = results[name].statistics()
+        for statistic, baseline_value in baseline.items():
+            # NOTE: more requests per second is better, a lower latency too
+            change = current[statistic] / baseline_value - 1 if baseline_value else 0.0
+            if statistic == "requests_per_second":
+                change = -change
+            if change > threshold:
+                regressions.append(
+                    f"{name}: {statistic} {baseline_value:,.1f} -> {current[statistic]:,.1f} ({change:+.0%} worse)"
+                )
+    return regressions
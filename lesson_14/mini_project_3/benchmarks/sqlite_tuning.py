@@ -0,0 +1,105 @@
+"""
+Load test of a mixed read/write workload with the SQLite defaults used
+before the engine was configurable (rollback journal, synchronous=FULL)
+against the tuned defaults of app.settings.Settings (WAL, synchronous=NORMAL,
+mmap and a bigger page cache).
+
+    python -m benchmarks.sqlite_tuning --workers 4 --seconds 10 --write-ratio 0.2
+
+Every worker is a separate process running its own app instance (like
+uvicorn workers do) against the same database file.
+"""
+
+import argparse
+import multiprocessing
+import random
+import tempfile
+import time
+from dataclasses import replace
+
+from fastapi.testclient import TestClient
+
+from app.constants import Currencies
+from app.main import create_app
+from app.settings import Settings
+
+
+SQLITE_DEFAULTS = Settings(
+    journal_mode="DELETE",
+    synchronous="FULL",
+    mmap_size=0,
+    cache_size=-2000,
+    busy_timeout=5000,
+)
+
+
+def seed(settings: Settings, categories: int, transactions: int) -> list[int]:
+    with TestClient(create_app(settings)) as client:
+        category_ids = [
+            client.post("/categories/", json={"name": f"category {number}"}).json()["id"]
+            for number in range(categories)
+        ]
+        rows = [
+            {
+                "category_id": random.choice(category_ids),
+                "amount": random.randint(1, 100_000),
+                "currency": random.choice(list(Currencies)),
+            }
+            for _ in range(transactions)
+        ]
+        client.post("/transactions/bulk", json=rows).raise_for_status()
+    return category_ids
+
+
+def worker(settings: Settings, category_ids: list[int], transactions: int, seconds: float, write_ratio: float):
+    operations = errors = 0
+    with TestClient(create_app(settings), raise_server_exceptions=False) as client:
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            if random.random() < write_ratio:
+                response = client.post(
+                    "/transactions/",
+                    json={
+                        "category_id": random.choice(category_ids),
+                        "amount": random.randint(1, 100_000),
+                        "currency": random.choice(list(Currencies)),
+                    },
+                )
+            elif random.random() < 0.5:
+                response = client.get(f"/transactions/{random.randint(1, transactions)}")
+            else:
+                response = client.get("/summary/")
+            operations += 1
+            errors += response.status_code >= 500
+    return operations, errors
+
+
+def run(settings: Settings, arguments: argparse.Namespace) -> tuple[int, int]:
+    with tempfile.TemporaryDirectory() as directory:
+        settings = replace(settings, database_url=f"sqlite:///{directory}/budget.db")
+        category_ids = seed(settings, arguments.categories, arguments.transactions)
+        worker_arguments = (settings, category_ids, arguments.transactions, arguments.seconds, arguments.write_ratio)
+        with multiprocessing.Pool(arguments.workers) as pool:
+            results = pool.starmap(worker, [worker_arguments] * arguments.workers)
+    return sum(result[0] for result in results), sum(result[1] for result in results)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--transactions", type=int, default=10_000)
+    arguments = parser.parse_args()
+
+    for name, settings in (("sqlite defaults", SQLITE_DEFAULTS), ("tuned", Settings())):
+        operations, errors = run(settings, arguments)
+        print(
+            f"{name:<16} {operations / arguments.seconds:>10,.0f} ops/sec "
+            f"({operations} operations, {errors} errors)"
+        )
+
+
+if __name__ == "__main__":
+    main()
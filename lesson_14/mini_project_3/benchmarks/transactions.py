@@ -0,0 +1,40 @@
+"""
+Load test of the mixed read/write workload of benchmarks.sqlite_tuning with
+the transactions begun by the sqlite3 driver at their first write against
+the explicit ones (BEGIN DEFERRED for the GET requests and BEGIN IMMEDIATE
+for the rest, see Settings.explicit_transactions), in WAL and in rollback
+journal mode, where the readers and the writer lock each other out.
+
+    python -m benchmarks.transactions --workers 4 --seconds 10 --write-ratio 0.2
+
+The errors are the requests which failed with "database is locked".
+"""
+
+import argparse
+from dataclasses import replace
+
+from app.settings import Settings
+from benchmarks.sqlite_tuning import run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--transactions", type=int, default=10_000)
+    arguments = parser.parse_args()
+
+    for journal_mode in ("WAL", "DELETE"):
+        for name, explicit_transactions in (("driver", False), ("explicit", True)):
+            settings = replace(Settings(), journal_mode=journal_mode, explicit_transactions=explicit_transactions)
+            operations, errors = run(settings, arguments)
+            print(
+                f"{journal_mode:<6} {name:<9} {operations / arguments.seconds:>10,.0f} ops/sec "
+                f"({operations} operations, {errors} errors)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Load test of the multi-process server (app.server): worker processes
+writing to the database themselves against worker processes sending
+their writes to the writer process, which group-commits them.
+
+    python -m benchmarks.writer_queue --workers 4 --clients 20 --requests 50 --write-ratio 0.5
+
+Every worker runs its own app with many concurrent clients (see
+benchmarks.load), so the writer gets the writes of every worker at the
+same time. The errors are the responses with a 5xx status, like the
+writes which waited longer than the busy timeout for the write lock.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import random
+import tempfile
+from dataclasses import replace
+
+import httpx
+
+from app.constants import Currencies
+from app.database import create_database_engine
+from app.main import create_app
+from app.settings import Settings
+from app.writer import WriteQueue, Writer, WriterClient
+from benchmarks.data import Dataset, create_database
+from benchmarks.load import Endpoint, LoadResult, asgi_client, run_endpoints
+
+
+def endpoints(dataset: Dataset, write_ratio: float) -> list[Endpoint]:
+    async def get_transaction(client: httpx.AsyncClient) -> httpx.Response:
+        return await client.get(f"/transactions/{random.randint(1, dataset.transactions)}")
+
+    async def create_transaction(client: httpx.AsyncClient) -> httpx.Response:
+        transaction = {
+            "category_id": random.randint(1, dataset.categories),
+            "amount": random.randint(1, dataset.max_amount),
+            "currency": random.choice(list(Currencies)),
+        }
+        return await client.post("/transactions/", json=transaction)
+
+    return [
+        Endpoint("read", get_transaction, weight=1 - write_ratio),
+        Endpoint("write", create_transaction, weight=write_ratio),
+    ]
+
+
+def run_worker(
+    settings: Settings,
+    arguments: argparse.Namespace,
+    worker: int,
+    results: WriteQueue,
+    requests: WriteQueue | None,
+    responses: WriteQueue | None,
+) -> None:
+    writer = None
+    if requests is not None:
+        writer = WriterClient(requests=requests, responses=responses, worker=worker, timeout=settings.writer_timeout)
+
+    async def run() -> dict[str, LoadResult]:
+        async with asgi_client(create_app(settings, writer=writer)) as client:
+            return await run_endpoints(
+                client,
+                endpoints(Dataset(transactions=arguments.transactions), arguments.write_ratio),
+                clients=arguments.clients,
+                requests_per_client=arguments.requests,
+                seed=worker,
+            )
+
+    results.put(asyncio.run(run()))
+
+
+def run_writer(settings: Settings, requests: WriteQueue, responses: list[WriteQueue], stats: WriteQueue) -> None:
+    engine = create_database_engine(settings)
+    writer = Writer(
+        engine=engine,
+        requests=requests,
+        responses=responses,
+        max_batch_size=settings.writer_max_batch_size,
+        max_wait=settings.writer_max_wait,
+    )
+    writer.run()
+    engine.dispose()
+    stats.put(writer.stats)
+
+
+def run(settings: Settings, arguments: argparse.Namespace, *, with_writer: bool) -> str:
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        settings = replace(settings, database_url=f"sqlite:///{directory}/budget.db", cache_enabled=False)
+        create_database(settings.database_url, Dataset(transactions=arguments.transactions))
+
+        results = context.Queue()
+        requests = context.Queue() if with_writer else None
+        responses = [context.Queue() if with_writer else None for _ in range(arguments.workers)]
+        stats = context.Queue()
+        if with_writer:
+            writer = context.Process(target=run_writer, args=(settings, requests, responses, stats))
+            writer.start()
+        workers = [
+            context.Process(target=run_worker, args=(settings, arguments, worker, results, requests, responses[worker]))
+            for worker in range(arguments.workers)
+        ]
+        for process in workers:
+            process.start()
+        worker_results = [results.get() for _ in workers]
+        for process in workers:
+            process.join()
+
+        lines = []
+        for name in ("read", "write"):
+            # NOTE: the workers ran at the same time, their throughputs add up
+            merged = LoadResult(seconds=max(result[name].seconds for result in worker_results))
+            for result in worker_results:
+                merged.latencies += result[name].latencies
+                merged.errors += result[name].errors
+            lines.append(f"  {name:<6} {merged.summary()}")
+        if with_writer:
+            requests.put(None)
+            writer_stats = stats.get()
+            writer.join()
+            lines.append(f"  {writer_stats.writes / writer_stats.batches:.1f} writes per batch ({writer_stats})")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=20, help="concurrent clients per worker")
+    parser.add_argument("--requests", type=int, default=50, help="requests per client")
+    parser.add_argument("--write-ratio", type=float, default=0.5)
+    parser.add_argument("--transactions", type=int, default=10_000)
+    parser.add_argument("--max-batch-size", type=int, default=Settings.writer_max_batch_size)
+    parser.add_argument("--max-wait", type=float, default=Settings.writer_max_wait, help="seconds")
+    arguments = parser.parse_args()
+
+    settings = Settings(writer_max_batch_size=arguments.max_batch_size, writer_max_wait=arguments.max_wait)
+    print(f"workers writing\n{run(settings, arguments, with_writer=False)}")
+    print(f"writer process\n{run(settings, arguments, with_writer=True)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,22 @@
-from collections.abc import Generator
+import os
+import sqlite3
+from collections.abc import Callable, Generator
+from contextlib import ExitStack, closing
+from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from pytest import fixture
-from sqlalchemy import create_engine, text
+from pytest import TempPathFactory, fixture
+from sqlalchemy import Engine, event
 from sqlalchemy.orm import Session
 
 from app.constants import Currencies
+from app.database import create_database_engine
 from app.injections import get_session
 from app.main import create_app
 from app.models import CategoryModel, DbModel, TransactionModel
+from app.settings import Settings
+from app.writer import WriterClient
 
 
 @fixture(scope="function")
@@ -17,31 +24,72 @@ def app() -> FastAPI:
     return create_app()
 
 
+def build_template_database(tmp_path_factory: TempPathFactory) -> Path:
+    """
+    The DB file with the schema, created once per test run. The pytest-xdist
+    workers share it from the parent of their base temporary directories,
+    whichever builds it first renames it into place, so the others never
+    copy a half-built file.
+    """
+
+    root = tmp_path_factory.getbasetemp()
+    if os.environ.get("PYTEST_XDIST_WORKER"):
+        root = root.parent
+    template = root / "budget.template.db"
+    if not template.exists():
+        building = root / f"budget.template.{os.getpid()}.db"
+        engine = create_database_engine(Settings(database_url=f"sqlite:///{building}", journal_mode="DELETE"))
+        DbModel.metadata.create_all(bind=engine)
+        engine.dispose()
+        os.replace(building, template)
+    return template
+
+
+@fixture(scope="session")
+def database_engine(tmp_path_factory: TempPathFactory) -> Generator[Engine]:
+    """
+    The engine of the test DB of this process (of this worker, with
+    pytest-xdist), a copy of the template made with the SQLite backup API,
+    so no test pays for creating and dropping the tables.
+    """
+
+    database = tmp_path_factory.mktemp("database") / "budget.test.db"
+    with closing(sqlite3.connect(build_template_database(tmp_path_factory))) as template:
+        with closing(sqlite3.connect(database)) as copy:
+            template.backup(copy)
+    engine = create_database_engine(Settings(database_url=f"sqlite:///{database}"))
+    yield engine
+    engine.dispose()
+
+
 @fixture(scope="function")
-def session(app: FastAPI) -> Generator[Session]:
+def session(app: FastAPI, database_engine: Engine) -> Generator[Session]:
     """
     Given that the FastAPI lifespan is not executed at the tests with
-    the TestClient, in here a new engine is configured with another
-    database file only for the tests, and then a new session is made
-    per test in order to achieve isolation between tests.
+    the TestClient, in here the session is bound to the test DB (see
+    database_engine), and then a new session is made per test in order
+    to achieve isolation between tests.
+
+    The session runs inside a DB transaction which is rolled back after
+    the test, and its own transactions are SAVEPOINTs, so even the tests
+    which commit leave the DB as they found it.
 
     But this is not enough, we also need to tell to FastAPI that instead
     of using the already defined injection at injections.get_session, an
     override is manually made and we used the isolated session per test.
     """
 
-    engine = create_engine("sqlite:///budget.test.db")
-    DbModel.metadata.create_all(bind=engine)
-    try:
-        with (session := Session(bind=engine)).begin():
-            app.dependency_overrides[get_session] = lambda: session
-            # SQLite should raise exceptions when wrong foreign keys are used
-            session.execute(text("PRAGMA foreign_keys = ON;"))
-            yield session
-            session.rollback()
-    finally:
-        DbModel.metadata.drop_all(engine)
-        engine.dispose()
+    with database_engine.connect() as connection:
+        transaction = connection.begin()
+        session = Session(bind=connection, join_transaction_mode="create_savepoint")
+        app.dependency_overrides[get_session] = lambda: session
+        try:
+            with session.begin():
+                yield session
+                session.rollback()
+        finally:
+            session.close()
+            transaction.rollback()
 
 
 @fixture(scope="function")
@@ -55,6 +103,63 @@ def test_client(app: FastAPI, session: Session) -> TestClient:
     return TestClient(app=app)
 
 
+@fixture(scope="function")
+def database_url(tmp_path) -> str:
+    """A database file of its own, for the tests which run the lifespan or commit."""
+
+    return f"sqlite:///{tmp_path / 'budget.db'}"
+
+
+@fixture(scope="function")
+def app_client(database_url: str) -> Generator[Callable[..., TestClient]]:
+    """
+    Factory of test clients which, unlike test_client, run the lifespan of
+    their app, on the database_url file. The keyword arguments override
+    the Settings, except writer which is passed to create_app. The clients
+    (and their lifespans) are closed after the test.
+    """
+
+    with ExitStack() as stack:
+
+        def make_client(*, writer: WriterClient | None = None, **overrides) -> TestClient:
+            settings = Settings(**{"database_url": database_url, **overrides})
+            return stack.enter_context(TestClient(app=create_app(settings, writer=writer)))
+
+        yield make_client
+
+
+@fixture(scope="function", params=["sqlite", "memory"])
+def backend_client(request) -> Generator[TestClient]:
+    """
+    For the endpoint tests which do not depend on SQLite: the test client
+    of the test DB (see test_client), then the one of an app with the
+    memory backend, whose lifespan runs to create its store.
+    """
+
+    if request.param == "sqlite":
+        yield request.getfixturevalue("test_client")
+        return
+    with TestClient(app=create_app(Settings(storage_backend="memory"))) as client:
+        yield client
+
+
+@fixture(scope="function")
+def statements(session: Session) -> Generator[list[str]]:
+    """
+    The SQL statements executed through the session engine since this
+    fixture was set up, so it should be requested after the data fixtures.
+    """
+
+    executed = []
+
+    def listener(connection, cursor, statement, *args) -> None:
+        executed.append(statement)
+
+    event.listen(session.get_bind(), "before_cursor_execute", listener)
+    yield executed
+    event.remove(session.get_bind(), "before_cursor_execute", listener)
+
+
 # Groceries fixtures
 
 
@@ -0,0 +1,137 @@
+import json
+from collections.abc import Callable
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from pytest import fixture
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.constants import Currencies
+from app.models import TransactionModel
+
+
+@fixture(scope="function")
+def async_client(app_client: Callable[..., TestClient]) -> TestClient:
+    """The async mode needs the async engine configured by the lifespan (see app_client)."""
+
+    return app_client(async_mode=True)
+
+
+def test_endpoints_run_on_the_async_engine(async_client: TestClient):
+    statements = []
+    sync_engine = async_client.app.state.async_database_engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    category = async_client.post("/categories/", json={"name": "groceries"}).json()
+    payload = {"category_id": category["id"], "amount": 100, "currency": Currencies.EURO}
+
+    created = async_client.post("/transactions/bulk", json=[payload, payload])
+    assert created.status_code == status.HTTP_200_OK, created.text
+    assert len(async_client.get("/transactions/").json()) == 2
+
+    assert any(statement.startswith("INSERT INTO categories") for statement in statements)
+    assert any(statement.startswith("INSERT INTO transactions") for statement in statements)
+    assert any("FROM transactions" in statement for statement in statements)
+
+
+def test_crud(async_client: TestClient):
+    category = async_client.post("/categories/", json={"name": "groceries"}).json()
+    payload = {"category_id": category["id"], "amount": 100, "currency": Currencies.EURO}
+
+    created = async_client.post("/transactions/", json=payload)
+    assert created.status_code == status.HTTP_201_CREATED, created.text
+    transaction_id = created.json()["id"]
+
+    assert async_client.get(f"/transactions/{transaction_id}").json() == {"id": transaction_id, **payload}
+
+    updated = async_client.put(f"/transactions/{transaction_id}", json={**payload, "amount": 300})
+    assert updated.status_code == status.HTTP_200_OK, updated.text
+    assert async_client.get("/summary/").json() == [
+        {"id": category["id"], "currencies": [{"currency": Currencies.EURO.value, "total": 300}]}
+    ]
+
+    deleted = async_client.delete(f"/transactions/{transaction_id}")
+    assert deleted.status_code == status.HTTP_200_OK, deleted.text
+    assert async_client.get(f"/transactions/{transaction_id}").status_code == status.HTTP_404_NOT_FOUND
+    assert async_client.get("/categories/").json() == [category]
+
+
+def test_category_not_found(async_client: TestClient):
+    payload = {"category_id": 123, "amount": 100, "currency": Currencies.EURO}
+
+    response = async_client.post("/transactions/", json=payload)
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND, response.text
+
+
+def test_list_and_stream(async_client: TestClient):
+    category = async_client.post("/categories/", json={"name": "groceries"}).json()
+    rows = [{"category_id": category["id"], "amount": amount, "currency": Currencies.EURO} for amount in (1, 2, 3)]
+    ids = [result["id"] for result in async_client.post("/transactions/bulk", json=rows).json()["results"]]
+
+    page = async_client.get("/transactions/", params={"limit": 2})
+    streamed = async_client.get("/transactions/", params={"stream": True, "after_id": ids[0]})
+
+    assert [transaction["id"] for transaction in page.json()] == ids[:2]
+    assert "link" in page.headers
+    assert [json.loads(line)["id"] for line in streamed.text.splitlines()] == ids[1:]
+
+
+def test_converted_summary(async_client: TestClient):
+    category = async_client.post("/categories/", json={"name": "groceries"}).json()
+    async_client.post("/transactions/", json={"category_id": category["id"], "amount": 100, "currency": Currencies.EURO})
+    async_client.put(f"/rates/{Currencies.EURO}", json={"rate": 1})
+    async_client.put(f"/rates/{Currencies.US_DOLAR}", json={"rate": "0.8"})
+
+    response = async_client.get("/summary/", params={"convert_to": Currencies.US_DOLAR})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == [{"id": category["id"], "currency": Currencies.US_DOLAR.value, "total": 125}]
+
+
+def test_range_summary(async_client: TestClient):
+    category = async_client.post("/categories/", json={"name": "groceries"}).json()
+    created = async_client.post(
+        "/transactions/",
+        json={"category_id": category["id"], "amount": 100, "currency": Currencies.EURO},
+    ).json()
+    with Session(bind=async_client.app.state.database_engine) as session:
+        created_at = session.get(TransactionModel, created["id"]).created_at
+
+    response = async_client.get("/summary/", params={"bucket": "day"})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == [
+        {
+            "bucket": created_at.date().isoformat(),
+            "categories": [{"id": category["id"], "currencies": [{"currency": Currencies.EURO.value, "total": 100}]}],
+        }
+    ]
+
+
+def test_bulk_change(async_client: TestClient):
+    category = async_client.post("/categories/", json={"name": "groceries"}).json()
+    rows = [{"category_id": category["id"], "amount": amount, "currency": Currencies.EURO} for amount in (1, 2, 3)]
+    async_client.post("/transactions/bulk", json=rows)
+
+    updated = async_client.patch("/transactions/", json={"filter": {"min_amount": 2}, "changes": {"amount": 10}})
+    deleted = async_client.request("DELETE", "/transactions/", json={"filter": {"max_amount": 1}})
+
+    assert updated.json() == {"affected": 2, "dry_run": False}
+    assert deleted.json() == {"affected": 1, "dry_run": False}
+    assert [transaction["amount"] for transaction in async_client.get("/transactions/").json()] == [10, 10]
+
+
+def test_search_page(async_client: TestClient):
+    category = async_client.post("/categories/", json={"name": "groceries"}).json()
+    rows = [{"category_id": category["id"], "amount": amount, "currency": Currencies.EURO} for amount in (1, 2, 3)]
+    async_client.post("/transactions/bulk", json=rows)
+
+    first = async_client.post("/transactions/search", json={"order_by": "-amount", "limit": 2, "facets": True}).json()
+    second = async_client.post("/transactions/search", json={"order_by": "-amount", "cursor": first["next_cursor"]})
+
+    assert [transaction["amount"] for transaction in first["transactions"]] == [3, 2]
+    assert first["total"] == 3
+    assert first["facets"]["currencies"] == [{"currency": Currencies.EURO, "count": 3, "total": 6}]
+    assert [transaction["amount"] for transaction in second.json()["transactions"]] == [1]
+    assert second.json()["next_cursor"] is None
@@ -0,0 +1,133 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.constants import Currencies
+from app.models import CategoryModel, TransactionModel
+from app.repositories.summary_repository import SummaryRepository
+
+
+def transactions_by_id(session: Session) -> dict[int, tuple]:
+    query = select(TransactionModel.id, TransactionModel.category_id, TransactionModel.amount, TransactionModel.currency)
+    return {row.id: tuple(row)[1:] for row in session.execute(query)}
+
+
+def test_update_by_filter(
+    test_client: TestClient,
+    session: Session,
+    groceries_first_euro_transaction: TransactionModel,
+    groceries_second_euro_transaction: TransactionModel,
+    entertainment_first_lira_transaction: TransactionModel,
+    entertainment_category: CategoryModel,
+    statements: list[str],
+):
+    payload = {
+        "filter": {"currency": Currencies.EURO, "min_amount": 150},
+        "changes": {"category_id": entertainment_category.id},
+    }
+
+    response = test_client.patch("/transactions/", json=payload)
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == {"affected": 1, "dry_run": False}
+    # the UPDATE, the version bump and the change log
+    assert len(statements) == 3
+    assert transactions_by_id(session) == {
+        groceries_first_euro_transaction.id: (groceries_first_euro_transaction.category_id, 100, Currencies.EURO),
+        groceries_second_euro_transaction.id: (entertainment_category.id, 200, Currencies.EURO),
+        entertainment_first_lira_transaction.id: (entertainment_category.id, 2500, Currencies.LIRA),
+    }
+    assert SummaryRepository(session=session).verify_totals() == []
+
+
+def test_update_by_ids(
+    test_client: TestClient,
+    session: Session,
+    groceries_first_euro_transaction: TransactionModel,
+    groceries_second_euro_transaction: TransactionModel,
+    entertainment_first_lira_transaction: TransactionModel,
+):
+    ids = [groceries_first_euro_transaction.id, entertainment_first_lira_transaction.id]
+    payload = {"filter": {"ids": ids}, "changes": {"amount": 1, "currency": Currencies.ROUBLE}}
+
+    response = test_client.patch("/transactions/", json=payload)
+
+    assert response.json() == {"affected": 2, "dry_run": False}
+    updated = transactions_by_id(session)
+    assert [updated[transaction_id][1:] for transaction_id in ids] == [(1, Currencies.ROUBLE)] * 2
+    assert updated[groceries_second_euro_transaction.id][1] == 200
+
+
+def test_update_dry_run(
+    test_client: TestClient,
+    session: Session,
+    groceries_first_euro_transaction: TransactionModel,
+    groceries_second_euro_transaction: TransactionModel,
+):
+    before = transactions_by_id(session)
+    payload = {"filter": {"currency": Currencies.EURO}, "changes": {"amount": 1}}
+
+    response = test_client.patch("/transactions/", params={"dry_run": True}, json=payload)
+
+    assert response.json() == {"affected": 2, "dry_run": True}
+    assert transactions_by_id(session) == before
+
+
+def test_update_unknown_category(test_client: TestClient, groceries_first_euro_transaction: TransactionModel):
+    payload = {"filter": {"ids": [groceries_first_euro_transaction.id]}, "changes": {"category_id": 123}}
+
+    response = test_client.patch("/transactions/", json=payload)
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND, response.text
+
+
+def test_update_invalidates_the_cache(test_client: TestClient, groceries_first_euro_transaction: TransactionModel):
+    url = f"/transactions/{groceries_first_euro_transaction.id}"
+    test_client.get(url)
+
+    payload = {"filter": {"ids": [groceries_first_euro_transaction.id]}, "changes": {"amount": 7}}
+    test_client.patch("/transactions/", json=payload)
+
+    assert test_client.get(url).json()["amount"] == 7
+
+
+def test_empty_filter_or_changes(test_client: TestClient):
+    no_filter = test_client.patch("/transactions/", json={"filter": {}, "changes": {"amount": 1}})
+    no_changes = test_client.patch("/transactions/", json={"filter": {"ids": [1]}, "changes": {}})
+    delete_all = test_client.request("DELETE", "/transactions/", json={"filter": {}})
+
+    assert no_filter.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT, no_filter.text
+    assert no_changes.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT, no_changes.text
+    assert delete_all.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT, delete_all.text
+
+
+def test_delete_by_filter(
+    test_client: TestClient,
+    session: Session,
+    groceries_first_euro_transaction: TransactionModel,
+    groceries_second_euro_transaction: TransactionModel,
+    entertainment_first_lira_transaction: TransactionModel,
+):
+    payload = {"filter": {"category_id": groceries_first_euro_transaction.category_id}}
+
+    dry_run = test_client.request("DELETE", "/transactions/", params={"dry_run": True}, json=payload)
+    response = test_client.request("DELETE", "/transactions/", json=payload)
+
+    assert dry_run.json() == {"affected": 2, "dry_run": True}
+    assert response.json() == {"affected": 2, "dry_run": False}
+    assert list(transactions_by_id(session)) == [entertainment_first_lira_transaction.id]
+    assert SummaryRepository(session=session).verify_totals() == []
+
+
+def test_delete_many_ids(test_client: TestClient, session: Session, groceries_category: CategoryModel):
+    session.execute(
+        TransactionModel.__table__.insert(),
+        [{"category_id": groceries_category.id, "amount": 1, "currency": Currencies.EURO} for _ in range(40_000)],
+    )
+    ids = session.execute(select(TransactionModel.id)).scalars().all()
+
+    response = test_client.request("DELETE", "/transactions/", json={"filter": {"ids": ids}})
+
+    assert response.json() == {"affected": 40_000, "dry_run": False}
+    assert session.execute(select(func.count()).select_from(TransactionModel)).scalar() == 0
@@ -0,0 +1,110 @@
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.cache import LRUCache
+from app.models import TransactionModel
+from app.repositories.transaction_repository import TransactionRepository
+from app.schemas import CreateTransaction
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_hits_and_misses():
+    cache = LRUCache()
+
+    assert cache.get("key") is None
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_least_recently_used_is_evicted():
+    cache = LRUCache(max_size=2)
+    cache.set("first", 1)
+    cache.set("second", 2)
+    cache.get("first")
+
+    cache.set("third", 3)
+
+    assert cache.get("second") is None
+    assert cache.get("first") == 1
+    assert cache.get("third") == 3
+    assert cache.stats.evictions == 1
+
+
+def test_entries_expire():
+    clock = FakeClock()
+    cache = LRUCache(ttl=10, clock=clock)
+    cache.set("key", "value")
+
+    clock.now = 9.9
+    assert cache.get("key") == "value"
+    clock.now = 10
+    assert cache.get("key") is None
+    assert cache.stats.expirations == 1
+    assert len(cache) == 0
+
+
+def test_categories_are_cached_and_invalidated(app: FastAPI, test_client: TestClient):
+    stats = app.state.cache.stats
+
+    assert test_client.get("/categories/").json() == []
+    assert test_client.get("/categories/").json() == []
+    assert (stats.hits, stats.misses) == (1, 1)
+
+    category = test_client.post("/categories/", json={"name": "groceries"}).json()
+
+    assert test_client.get("/categories/").json() == [category]
+    assert (stats.hits, stats.misses) == (1, 2)
+
+    test_client.delete(f"/categories/{category['id']}").raise_for_status()
+
+    assert test_client.get("/categories/").json() == []
+
+
+def test_transactions_are_cached_and_invalidated(
+    app: FastAPI,
+    test_client: TestClient,
+    groceries_first_euro_transaction: TransactionModel,
+):
+    url = f"/transactions/{groceries_first_euro_transaction.id}"
+    stats = app.state.cache.stats
+    original = test_client.get(url).json()
+
+    assert test_client.get(url).json() == original
+    assert (stats.hits, stats.misses) == (1, 1)
+
+    test_client.put(url, json={**original, "amount": 1}).raise_for_status()
+
+    assert test_client.get(url).json()["amount"] == 1
+
+    test_client.delete(url).raise_for_status()
+
+    assert test_client.get(url).status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_writes_of_other_processes_are_not_served_from_the_cache(
+    session: Session,
+    groceries_first_euro_transaction: TransactionModel,
+):
+    transaction_id = groceries_first_euro_transaction.id
+    cached_repository = TransactionRepository(session=session, cache=LRUCache())
+    # another process, which does not share the cache
+    other_repository = TransactionRepository(session=session)
+    original = cached_repository.get_transaction(transaction_id=transaction_id)
+
+    other_repository.update_transaction(
+        transaction_id=transaction_id,
+        transaction_to_update=CreateTransaction(category_id=original.category_id, amount=1, currency=original.currency),
+    )
+
+    assert cached_repository.get_transaction(transaction_id=transaction_id).amount == 1
+    assert cached_repository.cache.stats.hits == 0
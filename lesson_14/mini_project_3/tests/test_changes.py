@@ -0,0 +1,187 @@
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+from threading import Timer
+
+import anyio
+from fastapi.testclient import TestClient
+from pytest import fixture
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.commands import main
+from app.middlewares import ConcurrencyLimitMiddleware
+from app.models import ChangeModel
+from app.repositories.category_repository import CategoryRepository
+from app.repositories.change_repository import ChangeRepository
+
+
+@fixture(scope="function")
+def client(app_client: Callable[..., TestClient]) -> TestClient:
+    return app_client(changes_poll_interval=0.01)
+
+
+def create_category_later(client: TestClient, name: str, delay: float) -> Timer:
+    """Creates a category from another thread (and session) after delay seconds."""
+
+    def create() -> None:
+        with Session(bind=client.app.state.database_engine) as session, session.begin():
+            CategoryRepository(session=session).create_category(name=name)
+
+    timer = Timer(delay, create)
+    timer.start()
+    return timer
+
+
+def apply(copy: dict[tuple[str, int], dict], changes: list[dict]) -> None:
+    for change in changes:
+        if change["operation"] == "delete":
+            copy.pop((change["table"], change["id"]), None)
+        else:
+            copy[change["table"], change["id"]] = change["data"]
+
+
+def current_rows(client: TestClient) -> dict[tuple[str, int], dict]:
+    rows = {("categories", category["id"]): category for category in client.get("/categories/").json()}
+    rows |= {("transactions", transaction["id"]): transaction for transaction in client.get("/transactions/").json()}
+    return rows
+
+
+def make_changes(client: TestClient) -> None:
+    category = client.post("/categories/", json={"name": "groceries"}).json()
+    other = client.post("/categories/", json={"name": "other"}).json()
+    first = client.post("/transactions/", json={"category_id": category["id"], "amount": 1, "currency": "EURO"}).json()
+    client.post(
+        "/transactions/bulk",
+        json=[{"category_id": category["id"], "amount": amount, "currency": "LIRA"} for amount in (2, 3)],
+    )
+    client.put(
+        f"/transactions/{first['id']}",
+        json={"category_id": category["id"], "amount": 4, "currency": "EURO"},
+    )
+    client.patch("/transactions/", json={"filter": {"currency": "LIRA"}, "changes": {"amount": 5}})
+    client.delete(f"/transactions/{first['id']}")
+    client.request("DELETE", "/transactions/", json={"filter": {"min_amount": 5, "ids": [2]}})
+    client.delete(f"/categories/{other['id']}")
+
+
+def test_every_write_is_logged(client: TestClient):
+    make_changes(client)
+
+    feed = client.get("/changes/").json()
+
+    assert [(change["table"], change["operation"]) for change in feed["changes"]] == [
+        ("categories", "create"),
+        ("categories", "create"),
+        ("transactions", "create"),
+        ("transactions", "create"),
+        ("transactions", "create"),
+        ("transactions", "update"),
+        ("transactions", "update"),
+        ("transactions", "update"),
+        ("transactions", "delete"),
+        ("transactions", "delete"),
+        ("categories", "delete"),
+    ]
+    assert feed["changes"][3]["data"] == {"category_id": 1, "amount": 2, "currency": "LIRA", "id": 2}
+    assert feed["next_since"] == feed["changes"][-1]["seq"]
+
+
+def test_deltas_keep_a_copy_in_sync(client: TestClient):
+    since = client.get("/changes/", params={"limit": 0}).json()["next_since"]
+    copy = current_rows(client)
+    make_changes(client)
+
+    while changes := (feed := client.get("/changes/", params={"since": since, "limit": 2}).json())["changes"]:
+        apply(copy, changes)
+        since = feed["next_since"]
+
+    assert copy == current_rows(client)
+    assert since == client.get("/changes/", params={"limit": 0}).json()["next_since"]
+
+
+def test_only_the_change_feed_is_not_limited():
+    borrowed = {}
+
+    async def app(scope, receive, send) -> None:
+        borrowed[scope["path"]] = middleware.limiter.borrowed_tokens
+
+    middleware = ConcurrencyLimitMiddleware(app, limit=1, exclude=("/changes/",))
+    for path in ("/changes/", "/changes/other", "/changesets"):
+        anyio.run(middleware, {"type": "http", "path": path}, None, None)
+
+    assert borrowed == {"/changes/": 0, "/changes/other": 1, "/changesets": 1}
+
+
+def test_long_poll_waits_for_a_change(client: TestClient):
+    since = client.get("/changes/", params={"limit": 0}).json()["next_since"]
+    create_category_later(client, "groceries", delay=0.1)
+
+    started = time.monotonic()
+    feed = client.get("/changes/", params={"since": since, "wait": 5}).json()
+
+    assert time.monotonic() - started < 5
+    assert [change["data"]["name"] for change in feed["changes"]] == ["groceries"]
+
+
+def test_long_poll_times_out(client: TestClient):
+    started = time.monotonic()
+    feed = client.get("/changes/", params={"wait": 0.1}).json()
+
+    assert time.monotonic() - started >= 0.1
+    assert feed == {"changes": [], "next_since": 0}
+
+
+def test_event_stream(client: TestClient):
+    client.post("/categories/", json={"name": "groceries"})
+    client.post("/categories/", json={"name": "other"})
+    create_category_later(client, "later", delay=0.1)
+
+    response = client.get(
+        "/changes/",
+        params={"wait": 1},
+        headers={"Accept": "text/event-stream", "Last-Event-ID": "1"},
+    )
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [event for event in response.text.split("\n\n") if event.startswith("id: ")]
+    assert [event.splitlines()[0] for event in events] == ["id: 2", "id: 3"]
+    assert '"name":"later"' in events[1]
+
+
+def test_compaction_keeps_the_last_change_of_every_row(client: TestClient):
+    make_changes(client)
+    engine = client.app.state.database_engine
+    with Session(bind=engine) as session:
+        logged = len(session.execute(select(ChangeModel.id)).all())
+
+    with Session(bind=engine) as session, session.begin():
+        future = datetime.now(UTC).replace(tzinfo=None) + timedelta(days=1)
+        deleted = ChangeRepository(session=session).compact_changes(before=future)
+
+    copy = {}
+    apply(copy, client.get("/changes/").json()["changes"])
+    assert deleted == 6
+    assert len(client.get("/changes/").json()["changes"]) == logged - deleted
+    assert copy == current_rows(client)
+
+
+def test_compaction_keeps_the_retention(database_url: str, client: TestClient, capsys):
+    make_changes(client)
+
+    assert main(["compact-changes", "--database-url", database_url]) == 0
+    assert "0 superseded changes deleted" in capsys.readouterr().out
+    assert main(["compact-changes", "--database-url", database_url, "--retention", "-60"]) == 0
+    assert "6 superseded changes deleted" in capsys.readouterr().out
+
+
+def test_changes_are_in_the_transaction_of_the_write(session: Session):
+    savepoint = session.begin_nested()
+    category = CategoryRepository(session=session).create_category(name="groceries")
+    change_repository = ChangeRepository(session=session)
+
+    (change,) = change_repository.get_changes(since=0, limit=10)
+    savepoint.rollback()
+
+    assert (change.table, change.id, change.operation) == ("categories", category.id, "create")
+    assert change_repository.get_changes(since=0, limit=10) == []
@@ -0,0 +1,62 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+from pytest import mark
+
+from app.constants import Currencies
+from app.models import CategoryModel
+
+
+@mark.parametrize("url", ["/categories/", "/summary/", "/transactions/", "/transactions/?stream=true"])
+def test_not_modified(test_client: TestClient, url: str):
+    response = test_client.get(url)
+    etag = response.headers["etag"]
+
+    not_modified = test_client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED, not_modified.text
+    assert not_modified.headers["etag"] == etag
+    assert not_modified.content == b""
+
+
+def test_etag_changes_after_a_write(test_client: TestClient):
+    etag = test_client.get("/categories/").headers["etag"]
+
+    test_client.post("/categories/", json={"name": "groceries"}).raise_for_status()
+    response = test_client.get("/categories/", headers={"If-None-Match": etag})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.headers["etag"] != etag
+    assert len(response.json()) == 1
+
+
+def test_transaction_writes_change_the_summary_etag(
+    test_client: TestClient,
+    groceries_category: CategoryModel,
+):
+    payload = {"category_id": groceries_category.id, "amount": 100, "currency": Currencies.EURO}
+    summary_etag = test_client.get("/summary/").headers["etag"]
+    categories_etag = test_client.get("/categories/").headers["etag"]
+
+    transaction = test_client.post("/transactions/", json=payload).json()
+
+    assert test_client.get("/summary/", headers={"If-None-Match": summary_etag}).status_code == status.HTTP_200_OK
+    assert (
+        test_client.get("/categories/", headers={"If-None-Match": categories_etag}).status_code
+        == status.HTTP_304_NOT_MODIFIED
+    )
+
+    transaction_etag = test_client.get(f"/transactions/{transaction['id']}").headers["etag"]
+    test_client.put(f"/transactions/{transaction['id']}", json={**payload, "amount": 1}).raise_for_status()
+    response = test_client.get(f"/transactions/{transaction['id']}", headers={"If-None-Match": transaction_etag})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()["amount"] == 1
+
+
+def test_weak_and_multiple_etags(test_client: TestClient):
+    etag = test_client.get("/categories/").headers["etag"]
+
+    response = test_client.get("/categories/", headers={"If-None-Match": f'"other", W/{etag}'})
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED, response.text
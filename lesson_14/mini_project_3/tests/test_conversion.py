@@ -0,0 +1,54 @@
+from app.constants import RATE_SCALE, Currencies
+from app.conversion import convert_totals
+
+
+RATES = {
+    Currencies.EURO: 1 * RATE_SCALE,
+    Currencies.US_DOLAR: 900_000,
+    Currencies.LIRA: 30_000,
+}
+
+
+def test_empty():
+    assert convert_totals([], rates=RATES, to=Currencies.EURO) == []
+
+
+def test_sums_every_currency_per_category():
+    rows = [
+        (2, Currencies.EURO, 100),
+        (1, Currencies.LIRA, 1000),
+        (2, Currencies.US_DOLAR, 1000),
+        (1, Currencies.EURO, 5),
+    ]
+
+    # 1: 5 + 1000 * 0.03 = 35, 2: 100 + 1000 * 0.9 = 1000
+    assert convert_totals(rows, rates=RATES, to=Currencies.EURO) == [(1, 35), (2, 1000)]
+
+
+def test_rounds_half_to_even():
+    rates = {Currencies.EURO: 1, Currencies.LIRA: 2}
+    rows = [
+        (1, Currencies.EURO, 1),
+        (2, Currencies.EURO, 3),
+        (3, Currencies.EURO, 5),
+        (4, Currencies.EURO, -3),
+        (5, Currencies.EURO, 7),
+    ]
+
+    assert convert_totals(rows, rates=rates, to=Currencies.LIRA) == [(1, 0), (2, 2), (3, 2), (4, -2), (5, 4)]
+
+
+def test_rounds_the_category_total_once():
+    rates = {Currencies.EURO: 1, Currencies.US_DOLAR: 1, Currencies.LIRA: 3}
+    rows = [(1, Currencies.EURO, 1), (1, Currencies.US_DOLAR, 1)]
+
+    # 2 / 3 rounds to 1, rounding every currency first would give 0
+    assert convert_totals(rows, rates=rates, to=Currencies.LIRA) == [(1, 1)]
+
+
+def test_large_totals_do_not_overflow():
+    rows = [(1, Currencies.LIRA, 10**18), (1, Currencies.EURO, 10**18)]
+
+    assert convert_totals(rows, rates=RATES, to=Currencies.US_DOLAR) == [
+        (1, (10**18 * 30_000 + 10**18 * RATE_SCALE + 450_000) // 900_000)
+    ]
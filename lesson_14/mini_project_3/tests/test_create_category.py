@@ -7,8 +7,8 @@ from sqlalchemy.orm import Session
 from app.models import CategoryModel
 
 
-def test_missing_spending_category_name(test_client: TestClient):
-    response = test_client.post("/categories/")
+def test_missing_spending_category_name(backend_client: TestClient):
+    response = backend_client.post("/categories/")
 
     assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT, response.text
 
@@ -36,3 +36,14 @@ def test_create_category(test_client: TestClient, session: Session):
         category := session.execute(select(CategoryModel).filter(CategoryModel.id == data["id"])).scalar()
     ) is not None
     assert category.name == payload["name"]
+
+
+def test_created_category_is_listed(backend_client: TestClient):
+    category = backend_client.post("/categories/", json={"name": "new-category"}).json()
+
+    response = backend_client.get("/categories/")
+    conflict = backend_client.post("/categories/", json={"name": "new-category"})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == [category]
+    assert conflict.status_code == status.HTTP_409_CONFLICT, conflict.text
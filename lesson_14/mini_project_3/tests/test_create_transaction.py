@@ -8,20 +8,20 @@ from app.constants import Currencies
 from app.models import CategoryModel, TransactionModel
 
 
-def test_missing_spending_category_name(test_client: TestClient):
-    response = test_client.post("/transactions/")
+def test_missing_spending_category_name(backend_client: TestClient):
+    response = backend_client.post("/transactions/")
 
     assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT, response.text
 
 
-def test_category_not_found(test_client: TestClient):
+def test_category_not_found(backend_client: TestClient):
     payload = {
         "category_id": 123,
         "amount": 100,
         "currency": Currencies.EURO,
     }
 
-    response = test_client.post("/transactions/", json=payload)
+    response = backend_client.post("/transactions/", json=payload)
 
     assert response.status_code == status.HTTP_404_NOT_FOUND, response.text
 
@@ -0,0 +1,99 @@
+import json
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.constants import Currencies
+from app.models import CategoryModel, TransactionModel
+
+
+def test_invalid_body(test_client: TestClient):
+    response = test_client.post("/transactions/bulk", json={"category_id": 1})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT, response.text
+
+
+def test_empty_body(test_client: TestClient):
+    expected_response = {"created": 0, "failed": 0, "results": []}
+
+    response = test_client.post("/transactions/bulk", json=[])
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == expected_response
+
+
+def test_create_transactions(
+    session: Session,
+    test_client: TestClient,
+    groceries_category: CategoryModel,
+    entertainment_category: CategoryModel,
+):
+    payload = [
+        {"category_id": groceries_category.id, "amount": 100, "currency": Currencies.EURO},
+        {"category_id": entertainment_category.id, "amount": 200, "currency": Currencies.LIRA},
+        {"category_id": groceries_category.id, "amount": 300, "currency": Currencies.RUPEE},
+    ]
+
+    response = test_client.post("/transactions/bulk", json=payload, params={"chunk_size": 2})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert (data := response.json())["created"] == len(payload)
+    assert data["failed"] == 0
+    assert [result["index"] for result in data["results"]] == [0, 1, 2]
+    for result, row in zip(data["results"], payload):
+        assert result["error"] is None
+        transaction = session.execute(select(TransactionModel).filter(TransactionModel.id == result["id"])).scalar()
+        assert transaction is not None
+        assert transaction.category_id == row["category_id"]
+        assert transaction.amount == row["amount"]
+        assert transaction.currency.value == row["currency"]
+
+
+def test_create_transactions_with_errors(
+    session: Session,
+    test_client: TestClient,
+    groceries_category: CategoryModel,
+):
+    payload = [
+        {"category_id": groceries_category.id, "amount": 100, "currency": Currencies.EURO},
+        {"category_id": 123, "amount": 100, "currency": Currencies.EURO},
+        {"category_id": groceries_category.id, "amount": 100, "currency": "DOGECOIN"},
+        {"category_id": groceries_category.id, "amount": 200, "currency": Currencies.EURO},
+    ]
+
+    response = test_client.post("/transactions/bulk", json=payload)
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert (data := response.json())["created"] == 2
+    assert data["failed"] == 2
+    assert data["results"][0]["id"] is not None
+    assert data["results"][1]["id"] is None
+    assert "category_id" in data["results"][1]["error"]
+    assert data["results"][2]["id"] is None
+    assert "currency" in data["results"][2]["error"]
+    assert data["results"][3]["id"] is not None
+    assert session.execute(select(func.count()).select_from(TransactionModel)).scalar() == 2
+
+
+def test_create_transactions_from_ndjson(
+    session: Session,
+    test_client: TestClient,
+    groceries_category: CategoryModel,
+):
+    payload = [
+        {"category_id": groceries_category.id, "amount": 100, "currency": Currencies.EURO},
+        {"category_id": groceries_category.id, "amount": 200, "currency": Currencies.EURO},
+    ]
+    body = "\n".join(json.dumps(row) for row in payload) + "\n"
+
+    response = test_client.post(
+        "/transactions/bulk",
+        content=body,
+        headers={"content-type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()["created"] == len(payload)
+    assert session.execute(select(func.count()).select_from(TransactionModel)).scalar() == len(payload)
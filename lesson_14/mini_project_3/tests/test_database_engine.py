@@ -0,0 +1,133 @@
+from threading import Event, Thread
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from pytest import MonkeyPatch, raises
+from sqlalchemy import event, func, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.database import create_database_engine, read_only
+from app.main import create_app
+from app.models import CategoryModel, DbModel
+from app.settings import Settings
+
+
+def test_pragmas_are_set_per_connection(tmp_path):
+    settings = Settings(
+        database_url=f"sqlite:///{tmp_path / 'budget.db'}",
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        busy_timeout=1234,
+    )
+    engine = create_database_engine(settings)
+    try:
+        with engine.connect() as connection:
+            assert connection.execute(text("PRAGMA foreign_keys")).scalar() == 1
+            assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert connection.execute(text("PRAGMA synchronous")).scalar() == 1
+            assert connection.execute(text("PRAGMA busy_timeout")).scalar() == settings.busy_timeout
+    finally:
+        engine.dispose()
+
+
+def test_settings_from_environment(monkeypatch: MonkeyPatch):
+    monkeypatch.setenv("BUDGET_DATABASE_URL", "sqlite:///other.db")
+    monkeypatch.setenv("BUDGET_POOL_SIZE", "20")
+
+    settings = Settings.from_environment()
+
+    assert settings.database_url == "sqlite:///other.db"
+    assert settings.pool_size == 20
+    assert settings.journal_mode == Settings().journal_mode
+
+
+def test_transactions_take_the_write_lock_unless_read_only(tmp_path):
+    engine = create_database_engine(Settings(database_url=f"sqlite:///{tmp_path / 'budget.db'}", busy_timeout=0))
+    DbModel.metadata.create_all(bind=engine)
+    try:
+        with read_only(engine).connect() as reader, engine.connect() as writer, engine.connect() as other_writer:
+            with reader.begin(), writer.begin():
+                reader.execute(select(CategoryModel)).all()
+                # the reader does not hold the write lock
+                writer.execute(select(CategoryModel)).all()
+                # but the writer does since its first statement, even if it only read
+                with raises(OperationalError, match="locked"), other_writer.begin():
+                    other_writer.execute(select(CategoryModel))
+    finally:
+        engine.dispose()
+
+
+def test_read_only_transactions_see_one_snapshot(tmp_path):
+    engine = create_database_engine(Settings(database_url=f"sqlite:///{tmp_path / 'budget.db'}"))
+    DbModel.metadata.create_all(bind=engine)
+    try:
+        with Session(bind=read_only(engine)) as reader, reader.begin():
+            assert reader.execute(select(func.count()).select_from(CategoryModel)).scalar() == 0
+            with Session(bind=engine) as writer, writer.begin():
+                writer.add(CategoryModel(name="groceries"))
+
+            assert reader.execute(select(func.count()).select_from(CategoryModel)).scalar() == 0
+    finally:
+        engine.dispose()
+
+
+def test_sessions_are_lazy(tmp_path):
+    settings = Settings(database_url=f"sqlite:///{tmp_path / 'budget.db'}")
+    with TestClient(app=create_app(settings)) as client:
+        checkouts = []
+        event.listen(client.app.state.database_engine, "checkout", lambda *args: checkouts.append(args))
+
+        response = client.post("/transactions/", json={"amount": "not a number"})
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT, response.text
+        assert checkouts == []
+
+
+def test_a_search_does_not_block_a_write(tmp_path):
+    settings = Settings(database_url=f"sqlite:///{tmp_path / 'budget.db'}", busy_timeout=100)
+    with TestClient(app=create_app(settings)) as client:
+        category = client.post("/categories/", json={"name": "groceries"}).json()
+        payload = {"category_id": category["id"], "amount": 100, "currency": "EURO"}
+        searching, written = Event(), Event()
+
+        def pause_search(connection, cursor, statement, *args) -> None:
+            # the search waits inside its DB transaction until the write is done
+            if statement.startswith("SELECT") and "FROM transactions" in statement and not searching.is_set():
+                searching.set()
+                written.wait(timeout=5)
+
+        event.listen(client.app.state.database_engine, "before_cursor_execute", pause_search)
+        searches = []
+        search = Thread(target=lambda: searches.append(client.post("/transactions/search", json={"min_amount": 1})))
+        search.start()
+        assert searching.wait(timeout=5)
+
+        created = client.post("/transactions/", json=payload)
+        written.set()
+        search.join()
+
+    assert created.status_code == status.HTTP_201_CREATED, created.text
+    assert searches[0].status_code == status.HTTP_200_OK, searches[0].text
+
+
+def test_only_the_writes_take_the_write_lock(tmp_path):
+    settings = Settings(database_url=f"sqlite:///{tmp_path / 'budget.db'}")
+    with TestClient(app=create_app(settings)) as client:
+        begins = []
+        event.listen(
+            client.app.state.database_engine,
+            "before_cursor_execute",
+            lambda connection, cursor, statement, *args: statement.startswith("BEGIN") and begins.append(statement),
+        )
+
+        bulk_filter = {"min_amount": 1}
+        responses = [
+            client.post("/categories/", json={"name": "groceries"}),
+            client.post("/transactions/search", json=bulk_filter),
+            client.patch("/transactions/?dry_run=true", json={"filter": bulk_filter, "changes": {"amount": 1}}),
+            client.request("DELETE", "/transactions/?dry_run=true", json={"filter": bulk_filter}),
+        ]
+
+    assert [response.status_code for response in responses] == [status.HTTP_201_CREATED] + [status.HTTP_200_OK] * 3
+    assert begins == ["BEGIN IMMEDIATE"] + ["BEGIN DEFERRED"] * 3
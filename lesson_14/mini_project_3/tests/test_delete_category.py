@@ -0,0 +1,54 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import CategoryModel, TransactionModel
+
+
+def test_not_found(test_client: TestClient):
+    response = test_client.delete("/categories/123")
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == {"msg": "Category not found"}
+
+
+def test_category_with_transactions(
+    test_client: TestClient,
+    session: Session,
+    groceries_first_euro_transaction: TransactionModel,
+):
+    response = test_client.delete(f"/categories/{groceries_first_euro_transaction.category_id}")
+
+    assert response.json() == {
+        "msg": "Cannot delete category associated with transactions. So delete the transactions first."
+    }
+    assert session.get(CategoryModel, groceries_first_euro_transaction.category_id) is not None
+
+
+def test_delete_category(
+    test_client: TestClient,
+    session: Session,
+    groceries_category: CategoryModel,
+    statements: list[str],
+):
+    category_id = groceries_category.id
+
+    response = test_client.delete(f"/categories/{category_id}")
+
+    assert response.json() == {"msg": "Category deleted successfully"}
+    # the conditional delete, the version bump and the change log
+    assert len(statements) == 3
+    assert session.execute(select(CategoryModel).filter(CategoryModel.id == category_id)).scalar() is None
+
+
+def test_delete_category_after_its_transactions(
+    test_client: TestClient,
+    session: Session,
+    groceries_first_euro_transaction: TransactionModel,
+):
+    test_client.delete(f"/transactions/{groceries_first_euro_transaction.id}").raise_for_status()
+
+    response = test_client.delete(f"/categories/{groceries_first_euro_transaction.category_id}")
+
+    assert response.json() == {"msg": "Category deleted successfully"}
@@ -0,0 +1,43 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.constants import Currencies
+
+
+def test_empty(test_client: TestClient):
+    response = test_client.get("/rates/")
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == []
+
+
+def test_set_exchange_rate(test_client: TestClient):
+    response = test_client.put(f"/rates/{Currencies.US_DOLAR}", json={"rate": "0.9"})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == {"currency": Currencies.US_DOLAR.value, "rate": "0.9"}
+
+    test_client.put(f"/rates/{Currencies.US_DOLAR}", json={"rate": "0.95"})
+    test_client.put(f"/rates/{Currencies.EURO}", json={"rate": 1})
+
+    assert test_client.get("/rates/").json() == [
+        {"currency": Currencies.EURO.value, "rate": "1"},
+        {"currency": Currencies.US_DOLAR.value, "rate": "0.95"},
+    ]
+
+
+def test_invalid_rate(test_client: TestClient):
+    for rate in (0, -1, "0.0000001"):
+        response = test_client.put(f"/rates/{Currencies.EURO}", json={"rate": rate})
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT, response.text
+
+
+def test_delete_exchange_rate(test_client: TestClient):
+    test_client.put(f"/rates/{Currencies.EURO}", json={"rate": 1})
+
+    response = test_client.delete(f"/rates/{Currencies.EURO}")
+
+    assert response.status_code == status.HTTP_204_NO_CONTENT, response.text
+    assert test_client.get("/rates/").json() == []
+    assert test_client.delete(f"/rates/{Currencies.EURO}").status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,107 @@
+import csv
+import io
+from datetime import UTC
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi import status
+from fastapi.testclient import TestClient
+from pytest import mark
+from sqlalchemy.orm import Session
+
+from app.constants import Currencies
+from app.models import TransactionModel
+
+
+def expected_rows(*transactions: TransactionModel) -> list[dict]:
+    return [
+        {
+            "id": transaction.id,
+            "category_id": transaction.category_id,
+            "amount": transaction.amount,
+            "currency": transaction.currency.value,
+            "created_at": transaction.created_at.replace(tzinfo=UTC),
+        }
+        for transaction in transactions
+    ]
+
+
+def read_table(response, format: str) -> pa.Table:
+    if format == "arrow":
+        return pa.ipc.open_stream(response.content).read_all()
+    return pq.read_table(io.BytesIO(response.content))
+
+
+@mark.parametrize("format", ["arrow", "parquet"])
+def test_export_columnar(
+    test_client: TestClient,
+    groceries_first_euro_transaction: TransactionModel,
+    groceries_second_euro_transaction: TransactionModel,
+    entertainment_first_lira_transaction: TransactionModel,
+    format: str,
+):
+    response = test_client.get("/transactions/export", params={"format": format, "batch_size": 2})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    table = read_table(response, format)
+    assert table.to_pylist() == expected_rows(
+        groceries_first_euro_transaction,
+        groceries_second_euro_transaction,
+        entertainment_first_lira_transaction,
+    )
+    # one record batch / row group per batch of rows
+    assert len(table.to_batches()) == 2
+
+
+def test_export_csv(
+    test_client: TestClient,
+    groceries_first_euro_transaction: TransactionModel,
+    entertainment_first_lira_transaction: TransactionModel,
+):
+    response = test_client.get("/transactions/export", params={"format": "csv"})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="transactions.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["id"], row["amount"], row["currency"]) for row in rows] == [
+        (str(groceries_first_euro_transaction.id), "100", Currencies.EURO.value),
+        (str(entertainment_first_lira_transaction.id), "2500", Currencies.LIRA.value),
+    ]
+
+
+@mark.parametrize("format", ["csv", "arrow", "parquet"])
+def test_export_with_filters(
+    test_client: TestClient,
+    groceries_first_euro_transaction: TransactionModel,
+    groceries_second_euro_transaction: TransactionModel,
+    entertainment_first_lira_transaction: TransactionModel,
+    format: str,
+):
+    params = {"format": format, "currency": Currencies.EURO.value, "min_amount": 150}
+
+    response = test_client.get("/transactions/export", params=params)
+
+    if format == "csv":
+        assert [row["id"] for row in csv.DictReader(io.StringIO(response.text))] == [
+            str(groceries_second_euro_transaction.id)
+        ]
+    else:
+        assert read_table(response, format).to_pylist() == expected_rows(groceries_second_euro_transaction)
+
+
+@mark.parametrize("format", ["csv", "arrow", "parquet"])
+def test_export_nothing(test_client: TestClient, session: Session, format: str):
+    response = test_client.get("/transactions/export", params={"format": format})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    if format == "csv":
+        assert response.text == "id,category_id,amount,currency,created_at\n"
+    else:
+        assert read_table(response, format).num_rows == 0
+
+
+def test_unknown_format(test_client: TestClient):
+    response = test_client.get("/transactions/export", params={"format": "xlsx"})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT, response.text
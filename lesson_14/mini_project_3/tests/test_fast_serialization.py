@@ -0,0 +1,111 @@
+import json
+
+from fastapi import FastAPI, status
+from fastapi.testclient import TestClient
+from pytest import fixture
+from sqlalchemy.orm import Session
+
+from app.constants import Currencies
+from app.main import create_app
+from app.models import CategoryModel, TransactionModel
+from app.settings import Settings
+
+
+@fixture(scope="function")
+def app() -> FastAPI:
+    """ Overrides the conftest app, the fixtures and clients are the same but with the fast path enabled. """
+
+    return create_app(Settings(fast_serialization=True))
+
+
+def as_dict(transaction: TransactionModel) -> dict:
+    return {
+        "category_id": transaction.category_id,
+        "amount": transaction.amount,
+        "currency": transaction.currency.value,
+        "id": transaction.id,
+    }
+
+
+def test_categories(session: Session, test_client: TestClient, groceries_category: CategoryModel):
+    # the names are the only free text, they must be escaped as the pydantic path does
+    escaped_category = CategoryModel(name='quotes " and \\ and ünïcödé\n')
+    session.add(escaped_category)
+    session.flush()
+    expected_response = [
+        {"name": groceries_category.name, "id": groceries_category.id},
+        {"name": escaped_category.name, "id": escaped_category.id},
+    ]
+
+    response = test_client.get("/categories/")
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.headers["content-type"] == "application/json"
+    assert "etag" in response.headers
+    assert response.json() == expected_response
+
+
+def test_all_transactions(
+    test_client: TestClient,
+    groceries_first_euro_transaction: TransactionModel,
+    groceries_second_euro_transaction: TransactionModel,
+    entertainment_first_lira_transaction: TransactionModel,
+):
+    first_page = test_client.get("/transactions/", params={"limit": 2})
+
+    assert first_page.status_code == status.HTTP_200_OK, first_page.text
+    assert first_page.json() == [as_dict(groceries_first_euro_transaction), as_dict(groceries_second_euro_transaction)]
+    assert f"after_id={groceries_second_euro_transaction.id}" in first_page.headers["link"]
+    assert "etag" in first_page.headers
+
+    second_page = test_client.get("/transactions/", params={"limit": 2, "after_id": groceries_second_euro_transaction.id})
+
+    assert second_page.json() == [as_dict(entertainment_first_lira_transaction)]
+    assert "link" not in second_page.headers
+
+
+def test_stream_transactions(
+    test_client: TestClient,
+    groceries_first_euro_transaction: TransactionModel,
+    entertainment_first_lira_transaction: TransactionModel,
+):
+    expected_response = [as_dict(groceries_first_euro_transaction), as_dict(entertainment_first_lira_transaction)]
+
+    response = test_client.get("/transactions/", params={"stream": True})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == expected_response
+
+
+def test_search_transactions(
+    test_client: TestClient,
+    groceries_first_euro_transaction: TransactionModel,
+    groceries_second_euro_transaction: TransactionModel,
+    entertainment_first_lira_transaction: TransactionModel,
+):
+    response = test_client.post("/transactions/search", json={"currency": Currencies.EURO, "min_amount": 150})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == [as_dict(groceries_second_euro_transaction)]
+
+
+def test_search_transactions_not_found(test_client: TestClient, groceries_first_euro_transaction: TransactionModel):
+    response = test_client.post("/transactions/search", json={"currency": Currencies.LIRA})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == {"msg": "Transaction not found for the provided details"}
+
+
+def test_async_mode(tmp_path):
+    settings = Settings(database_url=f"sqlite:///{tmp_path / 'budget.db'}", async_mode=True, fast_serialization=True)
+    with TestClient(app=create_app(settings)) as client:
+        category = client.post("/categories/", json={"name": 'a "quoted" name'}).json()
+        payload = {"category_id": category["id"], "amount": 100, "currency": Currencies.EURO}
+        transaction = client.post("/transactions/", json=payload).json()
+
+        assert client.get("/categories/").json() == [category]
+        assert client.get("/transactions/").json() == [transaction]
+        assert client.post("/transactions/search", json={"currency": Currencies.EURO}).json() == [transaction]
+        streamed = client.get("/transactions/", params={"stream": True}).text
+        assert [json.loads(line) for line in streamed.splitlines()] == [transaction]
@@ -4,10 +4,10 @@ from fastapi.testclient import TestClient
 from app.models import CategoryModel
 
 
-def test_empty(test_client: TestClient):
+def test_empty(backend_client: TestClient):
     expected_response = []
 
-    response = test_client.get("/categories/")
+    response = backend_client.get("/categories/")
 
     assert response.status_code == status.HTTP_200_OK, response.text
     assert response.json() == expected_response
@@ -1,6 +1,7 @@
 from fastapi import status
 from fastapi.testclient import TestClient
 
+from app.constants import Currencies
 from app.models import CategoryModel, TransactionModel
 
 
@@ -87,3 +88,109 @@ def test_multiple_categories_multiple_transactions(
 
     assert response.status_code == status.HTTP_200_OK, response.text
     assert response.json() == expected_response
+
+
+def test_updated_transaction_moves_between_buckets(
+    test_client: TestClient,
+    groceries_category: CategoryModel,
+    groceries_first_euro_transaction: TransactionModel,
+    groceries_second_euro_transaction: TransactionModel,
+    entertainment_category: CategoryModel,
+):
+    payload = {
+        "category_id": entertainment_category.id,
+        "amount": 50,
+        "currency": Currencies.LIRA,
+    }
+    expected_response = [
+        {
+            "id": groceries_category.id,
+            "currencies": [
+                {
+                    "currency": groceries_first_euro_transaction.currency.value,
+                    "total": groceries_first_euro_transaction.amount,
+                }
+            ],
+        },
+        {
+            "id": entertainment_category.id,
+            "currencies": [{"currency": Currencies.LIRA.value, "total": payload["amount"]}],
+        },
+    ]
+
+    test_client.put(f"/transactions/{groceries_second_euro_transaction.id}", json=payload).raise_for_status()
+    response = test_client.get("/summary/")
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == expected_response
+
+
+def test_deleted_transactions_are_removed(
+    test_client: TestClient,
+    groceries_first_euro_transaction: TransactionModel,
+    groceries_second_euro_transaction: TransactionModel,
+):
+    expected_response = []
+
+    test_client.delete(f"/transactions/{groceries_first_euro_transaction.id}").raise_for_status()
+    test_client.delete(f"/transactions/{groceries_second_euro_transaction.id}").raise_for_status()
+    response = test_client.get("/summary/")
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == expected_response
+
+
+def test_converted_summary(
+    test_client: TestClient,
+    groceries_category: CategoryModel,
+    groceries_first_euro_transaction: TransactionModel,
+    entertainment_category: CategoryModel,
+    entertainment_first_lira_transaction: TransactionModel,
+    entertainment_first_rouble_transaction: TransactionModel,
+):
+    test_client.put(f"/rates/{Currencies.EURO}", json={"rate": 1})
+    test_client.put(f"/rates/{Currencies.LIRA}", json={"rate": "0.02"})
+    test_client.put(f"/rates/{Currencies.ROUBLE}", json={"rate": "0.01"})
+    expected_response = [
+        {"id": groceries_category.id, "currency": Currencies.EURO.value, "total": 100},
+        # 2500 * 0.02 + 4500 * 0.01
+        {"id": entertainment_category.id, "currency": Currencies.EURO.value, "total": 95},
+    ]
+
+    response = test_client.get("/summary/", params={"convert_to": Currencies.EURO})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == expected_response
+
+
+def test_converted_summary_reloads_the_rates(
+    test_client: TestClient,
+    groceries_first_euro_transaction: TransactionModel,
+):
+    test_client.put(f"/rates/{Currencies.EURO}", json={"rate": 1})
+    test_client.put(f"/rates/{Currencies.US_DOLAR}", json={"rate": "0.5"})
+    first = test_client.get("/summary/", params={"convert_to": Currencies.US_DOLAR})
+
+    test_client.put(f"/rates/{Currencies.US_DOLAR}", json={"rate": "0.25"})
+    second = test_client.get(
+        "/summary/",
+        params={"convert_to": Currencies.US_DOLAR},
+        headers={"If-None-Match": first.headers["etag"]},
+    )
+
+    assert first.json()[0]["total"] == 200
+    assert second.status_code == status.HTTP_200_OK, second.text
+    assert second.json()[0]["total"] == 400
+
+
+def test_converted_summary_missing_rates(
+    test_client: TestClient,
+    groceries_first_euro_transaction: TransactionModel,
+    entertainment_first_lira_transaction: TransactionModel,
+):
+    test_client.put(f"/rates/{Currencies.EURO}", json={"rate": 1})
+
+    response = test_client.get("/summary/", params={"convert_to": Currencies.EURO})
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND, response.text
+    assert Currencies.LIRA.value in response.json()["detail"]
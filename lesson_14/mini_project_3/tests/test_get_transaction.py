@@ -1,11 +1,14 @@
+from unittest.mock import ANY
+
 from fastapi import status
 from fastapi.testclient import TestClient
 
+from app.constants import Currencies
 from app.models import TransactionModel
 
 
-def test_not_found(test_client: TestClient):
-    response = test_client.get("/transactions/123")
+def test_not_found(backend_client: TestClient):
+    response = backend_client.get("/transactions/123")
 
     assert response.status_code == status.HTTP_404_NOT_FOUND, response.text
 
@@ -19,3 +22,14 @@ def test_get_transaction(
     response = test_client.get(url)
 
     assert response.status_code == status.HTTP_200_OK, response.text
+
+
+def test_get_created_transaction(backend_client: TestClient):
+    category = backend_client.post("/categories/", json={"name": "groceries"}).json()
+    payload = {"category_id": category["id"], "amount": 100, "currency": Currencies.EURO}
+    transaction = backend_client.post("/transactions/", json=payload).json()
+
+    response = backend_client.get(f"/transactions/{transaction['id']}")
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == transaction == {"id": ANY, **payload}
@@ -0,0 +1,96 @@
+import json
+
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from app.models import TransactionModel
+
+
+def test_empty(test_client: TestClient):
+    expected_response = []
+
+    response = test_client.get("/transactions/")
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == expected_response
+
+
+def test_get_all_transactions(
+    test_client: TestClient,
+    groceries_first_euro_transaction: TransactionModel,
+    groceries_second_euro_transaction: TransactionModel,
+):
+    expected_ids = [groceries_first_euro_transaction.id, groceries_second_euro_transaction.id]
+
+    response = test_client.get("/transactions/")
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert [transaction["id"] for transaction in response.json()] == expected_ids
+    assert "link" not in response.headers
+
+
+def test_paginated_transactions(
+    test_client: TestClient,
+    groceries_first_euro_transaction: TransactionModel,
+    groceries_second_euro_transaction: TransactionModel,
+    entertainment_first_lira_transaction: TransactionModel,
+):
+    first_page = test_client.get("/transactions/", params={"limit": 2})
+
+    assert first_page.status_code == status.HTTP_200_OK, first_page.text
+    assert [transaction["id"] for transaction in first_page.json()] == [
+        groceries_first_euro_transaction.id,
+        groceries_second_euro_transaction.id,
+    ]
+    assert f"after_id={groceries_second_euro_transaction.id}" in first_page.headers["link"]
+
+    second_page = test_client.get(
+        "/transactions/",
+        params={"limit": 2, "after_id": groceries_second_euro_transaction.id},
+    )
+
+    assert second_page.status_code == status.HTTP_200_OK, second_page.text
+    assert [transaction["id"] for transaction in second_page.json()] == [entertainment_first_lira_transaction.id]
+    assert "link" not in second_page.headers
+
+
+def test_invalid_limit(test_client: TestClient):
+    response = test_client.get("/transactions/", params={"limit": 0})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT, response.text
+
+
+def test_stream_transactions(
+    test_client: TestClient,
+    groceries_first_euro_transaction: TransactionModel,
+    groceries_second_euro_transaction: TransactionModel,
+):
+    expected_response = [
+        {
+            "id": transaction.id,
+            "category_id": transaction.category_id,
+            "amount": transaction.amount,
+            "currency": transaction.currency.value,
+        }
+        for transaction in (groceries_first_euro_transaction, groceries_second_euro_transaction)
+    ]
+
+    response = test_client.get("/transactions/", params={"stream": True})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in response.text.splitlines()] == expected_response
+
+
+def test_stream_transactions_after_id(
+    test_client: TestClient,
+    groceries_first_euro_transaction: TransactionModel,
+    groceries_second_euro_transaction: TransactionModel,
+):
+    response = test_client.get(
+        "/transactions/",
+        params={"stream": True, "after_id": groceries_first_euro_transaction.id},
+    )
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == [groceries_second_euro_transaction.id]
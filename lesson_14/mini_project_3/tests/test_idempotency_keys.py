@@ -0,0 +1,182 @@
+from collections.abc import Callable, Generator
+from threading import Barrier, Thread
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from pytest import fixture, raises
+from sqlalchemy import Engine, event, func, select
+from sqlalchemy.orm import Session
+
+from app.commands import main
+from app.constants import Currencies
+from app.database import create_database_engine, migrate_database
+from app.models import CategoryModel, IdempotencyKeyModel, TransactionModel
+from app.repositories.transaction_repository import TransactionRepository
+from app.schemas import CreateTransaction
+from app.settings import Settings
+
+
+@fixture(scope="function")
+def settings(database_url: str) -> Settings:
+    return Settings(database_url=database_url)
+
+
+@fixture(scope="function")
+def engine(settings: Settings) -> Generator[Engine]:
+    engine = create_database_engine(settings)
+    migrate_database(engine)
+    with Session(bind=engine) as session, session.begin():
+        session.add(CategoryModel(id=1, name="groceries"))
+    yield engine
+    engine.dispose()
+
+
+def count_transactions(session: Session) -> int:
+    return session.execute(select(func.count()).select_from(TransactionModel)).scalar_one()
+
+
+def test_retry_is_replayed(session: Session, test_client: TestClient, groceries_category: CategoryModel):
+    payload = {"category_id": groceries_category.id, "amount": 100, "currency": Currencies.EURO}
+
+    created = test_client.post("/transactions/", json=payload, headers={"Idempotency-Key": "retried"})
+    replayed = test_client.post("/transactions/", json=payload, headers={"Idempotency-Key": "retried"})
+    other = test_client.post("/transactions/", json=payload, headers={"Idempotency-Key": "other"})
+
+    assert created.status_code == replayed.status_code == status.HTTP_201_CREATED
+    assert "Idempotent-Replayed" not in created.headers
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert replayed.json() == created.json()
+    assert other.json()["id"] != created.json()["id"]
+    assert count_transactions(session) == 2
+
+
+def test_key_reused_with_another_body(session: Session, test_client: TestClient, groceries_category: CategoryModel):
+    payload = {"category_id": groceries_category.id, "amount": 100, "currency": Currencies.EURO}
+    test_client.post("/transactions/", json=payload, headers={"Idempotency-Key": "reused"})
+
+    response = test_client.post(
+        "/transactions/",
+        json={**payload, "amount": 200},
+        headers={"Idempotency-Key": "reused"},
+    )
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT, response.text
+    assert count_transactions(session) == 1
+
+
+def test_failed_request_does_not_keep_the_key(session: Session, test_client: TestClient):
+    payload = {"category_id": 123, "amount": 100, "currency": Currencies.EURO}
+
+    response = test_client.post("/transactions/", json=payload, headers={"Idempotency-Key": "failed"})
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert session.execute(select(IdempotencyKeyModel)).first() is None
+
+
+def test_expired_key_is_reused(session: Session, groceries_category: CategoryModel):
+    transaction_repository = TransactionRepository(session=session)
+    transaction = CreateTransaction(category_id=groceries_category.id, amount=100, currency=Currencies.EURO)
+
+    first, _ = transaction_repository.create_transaction_once(
+        transaction_to_create=transaction, idempotency_key="expired", ttl=0
+    )
+    second, replayed = transaction_repository.create_transaction_once(
+        transaction_to_create=transaction.model_copy(update={"amount": 200}), idempotency_key="expired", ttl=60
+    )
+
+    assert not replayed
+    assert second.id != first.id
+    assert transaction_repository.delete_expired_idempotency_keys() == 0
+
+
+def test_replays_are_served_from_memory(app_client: Callable[..., TestClient], engine: Engine):
+    payload = {"category_id": 1, "amount": 100, "currency": Currencies.EURO}
+    statements = []
+
+    client = app_client()
+    created = client.post("/transactions/", json=payload, headers={"Idempotency-Key": "cached"})
+    event.listen(
+        client.app.state.database_engine,
+        "before_cursor_execute",
+        lambda connection, cursor, statement, *args: statements.append(statement),
+    )
+    replayed = client.post("/transactions/", json=payload, headers={"Idempotency-Key": "cached"})
+    reused = client.post("/transactions/", json={**payload, "amount": 1}, headers={"Idempotency-Key": "cached"})
+
+    assert replayed.json() == created.json()
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert reused.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+    assert not any("idempotency_keys" in statement for statement in statements)
+
+
+def test_concurrent_duplicates_create_once(engine: Engine):
+    transaction = CreateTransaction(category_id=1, amount=100, currency=Currencies.EURO)
+    barrier = Barrier(2)
+    results = []
+
+    def create() -> None:
+        barrier.wait()
+        with Session(bind=engine) as session, session.begin():
+            results.append(
+                TransactionRepository(session=session).create_transaction_once(
+                    transaction_to_create=transaction, idempotency_key="concurrent", ttl=60
+                )
+            )
+
+    threads = [Thread(target=create) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(replayed for _, replayed in results) == [False, True]
+    assert results[0][0] == results[1][0]
+    with Session(bind=engine) as session:
+        assert count_transactions(session) == 1
+
+
+def test_idempotency_key_in_async_mode(app_client: Callable[..., TestClient], engine: Engine):
+    payload = {"category_id": 1, "amount": 100, "currency": Currencies.EURO}
+
+    client = app_client(async_mode=True)
+    created = client.post("/transactions/", json=payload, headers={"Idempotency-Key": "async"})
+    client.app.state.idempotency_cache.clear()
+    replayed = client.post("/transactions/", json=payload, headers={"Idempotency-Key": "async"})
+
+    assert replayed.json() == created.json()
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+
+
+def test_purge_command(settings: Settings, engine: Engine, capsys):
+    transaction = CreateTransaction(category_id=1, amount=100, currency=Currencies.EURO)
+    with Session(bind=engine) as session, session.begin():
+        transaction_repository = TransactionRepository(session=session)
+        transaction_repository.create_transaction_once(transaction_to_create=transaction, idempotency_key="a", ttl=0)
+        transaction_repository.create_transaction_once(transaction_to_create=transaction, idempotency_key="b", ttl=60)
+
+    assert main(["purge-idempotency-keys", "--database-url", settings.database_url]) == 0
+    assert "1 expired idempotency keys deleted" in capsys.readouterr().out
+    with Session(bind=engine) as session:
+        assert session.execute(select(IdempotencyKeyModel.key)).scalars().all() == ["b"]
+
+
+def test_replayed_response_is_the_stored_one(session: Session, groceries_category: CategoryModel):
+    transaction_repository = TransactionRepository(session=session)
+    transaction = CreateTransaction(category_id=groceries_category.id, amount=100, currency=Currencies.EURO)
+    created, _ = transaction_repository.create_transaction_once(
+        transaction_to_create=transaction, idempotency_key="stored", ttl=60
+    )
+    transaction_repository.update_transaction(
+        transaction_id=created.id, transaction_to_update=transaction.model_copy(update={"amount": 1})
+    )
+
+    replayed, was_replayed = transaction_repository.create_transaction_once(
+        transaction_to_create=transaction, idempotency_key="stored", ttl=60
+    )
+
+    assert was_replayed
+    assert replayed == created
+    with raises(TransactionRepository.IdempotencyKeyReused):
+        transaction_repository.create_transaction_once(
+            transaction_to_create=transaction.model_copy(update={"amount": 1}), idempotency_key="stored", ttl=60
+        )
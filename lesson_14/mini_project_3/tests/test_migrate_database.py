@@ -0,0 +1,104 @@
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.orm import Session
+
+from app.database import migrate_database
+from app.models import ARCHIVE_SKIPPED_TRIGGERS, DbModel, MonthlyTotalModel, TransactionModel
+from app.repositories.summary_repository import SummaryRepository
+
+
+def test_missing_indexes_are_created(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'budget.db'}")
+    try:
+        DbModel.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            for index in TransactionModel.__table__.indexes:
+                index.drop(bind=connection)
+
+        migrate_database(engine)
+
+        assert {index["name"] for index in inspect(engine).get_indexes(TransactionModel.__tablename__)} == {
+            index.name for index in TransactionModel.__table__.indexes
+        }
+    finally:
+        engine.dispose()
+
+
+def test_missing_columns_are_added(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'budget.db'}")
+    try:
+        with engine.begin() as connection:
+            # the transactions table from before created_at existed
+            connection.execute(text("CREATE TABLE categories (id INTEGER PRIMARY KEY, name VARCHAR(25) NOT NULL UNIQUE)"))
+            connection.execute(
+                text(
+                    "CREATE TABLE transactions (id INTEGER PRIMARY KEY, category_id INTEGER NOT NULL, "
+                    "amount INTEGER NOT NULL, currency VARCHAR(14) NOT NULL)"
+                )
+            )
+            connection.execute(text("INSERT INTO categories (id, name) VALUES (1, 'groceries')"))
+            connection.execute(
+                text("INSERT INTO transactions (category_id, amount, currency) VALUES (1, 100, 'EURO'), (1, 50, 'EURO')")
+            )
+
+        migrate_database(engine)
+
+        with Session(bind=engine) as session:
+            created_at = session.execute(select(TransactionModel.created_at)).scalars().all()
+            monthly_total = session.execute(select(MonthlyTotalModel)).scalar_one()
+
+            assert len(created_at) == 2 and None not in created_at
+            assert monthly_total.month == created_at[0].date().replace(day=1)
+            assert (monthly_total.total, monthly_total.transaction_count) == (150, 2)
+            assert SummaryRepository(session=session).verify_totals() == []
+    finally:
+        engine.dispose()
+
+
+def test_autoincrement_is_added(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'budget.db'}")
+    try:
+        DbModel.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            # the transactions table from before it used AUTOINCREMENT
+            connection.execute(text("DROP TABLE transactions"))
+            connection.execute(
+                text(
+                    "CREATE TABLE transactions (id INTEGER PRIMARY KEY, category_id INTEGER NOT NULL, "
+                    "amount INTEGER NOT NULL, currency VARCHAR(14) NOT NULL, created_at DATETIME NOT NULL)"
+                )
+            )
+            connection.execute(text("INSERT INTO categories (id, name) VALUES (1, 'groceries')"))
+            connection.execute(
+                text(
+                    "INSERT INTO transactions (category_id, amount, currency, created_at) "
+                    "VALUES (1, 100, 'EURO', '2025-01-01 00:00:00'), (1, 50, 'EURO', '2025-01-02 00:00:00')"
+                )
+            )
+            # the newest transaction was archived before the migration
+            connection.execute(
+                text(
+                    "INSERT INTO changes (table_name, row_id, operation, created_at) "
+                    "VALUES ('transactions', 3, 'create', '2025-01-03 00:00:00')"
+                )
+            )
+
+        migrate_database(engine)
+
+        with Session(bind=engine) as session:
+            transaction = TransactionModel(category_id=1, amount=10, currency="EURO")
+            session.add(transaction)
+            session.commit()
+
+            ids = session.execute(select(TransactionModel.id).order_by(TransactionModel.id)).scalars().all()
+
+            assert ids == [1, 2, 4]
+            assert {index["name"] for index in inspect(engine).get_indexes(TransactionModel.__tablename__)} == {
+                index.name for index in TransactionModel.__table__.indexes
+            }
+            # the triggers were dropped with the old table
+            triggers = session.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'transactions'")
+            ).scalars()
+            assert set(ARCHIVE_SKIPPED_TRIGGERS) <= set(triggers)
+    finally:
+        engine.dispose()
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+from pytest import mark
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.models import TransactionModel
+from app.prepared_queries import PreparedQueries
+from app.repositories.transaction_repository import (
+    SEARCH_QUERIES,
+    TRANSACTIONS_NOT_FOUND_MSG,
+    TransactionRepository,
+)
+from app.schemas import TransactionSearchParams
+from tests.test_search_query_plans import FILTER_SHAPES
+
+
+def test_one_statement_per_shape():
+    built = []
+
+    def build(filters: frozenset[str]):
+        built.append(filters)
+        return select(TransactionModel)
+
+    prepared_queries = PreparedQueries(("a", "b"), build)
+
+    first, first_parameters = prepared_queries.get(SimpleNamespace(a=1, b=None))
+    second, second_parameters = prepared_queries.get(SimpleNamespace(a=2, b=None))
+    prepared_queries.get(SimpleNamespace(a=None, b=None))
+    prepared_queries.get(SimpleNamespace(a=1, b=0))
+
+    assert first is second
+    assert (first_parameters, second_parameters) == ({"a": 1}, {"a": 2})
+    assert built == [frozenset({"a"}), frozenset(), frozenset({"a", "b"})]
+    assert (prepared_queries.stats.hits, prepared_queries.stats.misses, len(prepared_queries)) == (1, 3, 3)
+
+
+@mark.parametrize("filters", [{}, *FILTER_SHAPES], ids=lambda filters: "+".join(filters) or "none")
+def test_prepared_search_matches_the_built_one(
+    session: Session,
+    filters: dict,
+    groceries_first_euro_transaction,
+    groceries_second_euro_transaction,
+    entertainment_first_lira_transaction,
+):
+    transaction_repository = TransactionRepository(session=session)
+    params = TransactionSearchParams(**filters)
+    expected = session.execute(transaction_repository._search_transactions_query(params=params)).scalars().all()
+
+    found = transaction_repository.search_transactions(params=params)
+    rows = transaction_repository.search_transaction_rows(params=params)
+
+    if expected:
+        assert [transaction.id for transaction in found] == [transaction.id for transaction in expected]
+    else:
+        assert found == {"msg": TRANSACTIONS_NOT_FOUND_MSG}
+    assert [row[-1] for row in rows] == [transaction.id for transaction in expected]
+
+
+@mark.parametrize("filters", FILTER_SHAPES, ids=lambda filters: "+".join(filters))
+def test_prepared_search_uses_an_index(session: Session, filters: dict):
+    query, parameters = SEARCH_QUERIES.get(TransactionSearchParams(**filters))
+    sql = query.params(**parameters).compile(
+        dialect=session.get_bind().dialect,
+        compile_kwargs={"literal_binds": True},
+    )
+
+    plan = [row.detail for row in session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+    assert not [detail for detail in plan if detail.startswith("SCAN")], plan
@@ -0,0 +1,98 @@
+import logging
+from collections.abc import Callable
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from pytest import fixture
+
+
+@fixture(scope="function", params=[False, True], ids=["sync", "async"])
+def profiled_client(request, app_client: Callable[..., TestClient]) -> TestClient:
+    """The engines are instrumented by the lifespan (see app_client). Every query is slow."""
+
+    return app_client(async_mode=request.param, profiling=True, slow_query_threshold=0)
+
+
+def test_server_timing(profiled_client: TestClient):
+    profiled_client.post("/categories/", json={"name": "groceries"})
+
+    response = profiled_client.get("/categories/")
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    timings = {timing.split(";")[0]: timing for timing in response.headers["server-timing"].split(", ")}
+    assert set(timings) == {"deps", "endpoint", "serialize", "sql", "total"}
+    assert 'desc="0 statements"' not in timings["sql"]
+
+
+def test_metrics(profiled_client: TestClient):
+    profiled_client.post("/categories/", json={"name": "groceries"})
+    profiled_client.get("/categories/")
+    profiled_client.get("/categories/")
+    profiled_client.get("/transactions/123")
+
+    metrics = profiled_client.get("/metrics")
+
+    assert metrics.status_code == status.HTTP_200_OK, metrics.text
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = metrics.text.splitlines()
+    assert 'budget_request_duration_seconds_count{method="GET",route="/categories/",status="200"} 2' in lines
+    assert 'budget_request_duration_seconds_bucket{method="GET",route="/categories/",status="200",le="+Inf"} 2' in lines
+    assert (
+        'budget_request_duration_seconds_count{method="GET",route="/transactions/{transaction_id}",status="404"} 1'
+        in lines
+    )
+    assert any(line.startswith('budget_sql_statements_total{method="POST",route="/categories/"}') for line in lines)
+    assert any(
+        line.startswith('budget_request_phase_seconds_total{method="GET",route="/categories/",phase="sql"}')
+        for line in lines
+    )
+
+
+def test_slow_queries_are_logged(profiled_client: TestClient, caplog):
+    with caplog.at_level(logging.WARNING, logger="app.profiling"):
+        profiled_client.get("/categories/")
+
+    assert any("slow query" in record.message and "categories" in record.message for record in caplog.records)
+
+
+def test_no_profiling_by_default(test_client: TestClient):
+    response = test_client.get("/categories/")
+
+    assert "server-timing" not in response.headers
+    assert test_client.get("/metrics").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_cache_metrics(profiled_client: TestClient):
+    category = profiled_client.post("/categories/", json={"name": "groceries"}).json()
+    for _ in range(3):
+        profiled_client.post("/transactions/search", json={"category_id": category["id"], "currency": "EURO"})
+
+    lines = profiled_client.get("/metrics").text.splitlines()
+
+    counters = {
+        line.split("{")[1].split("}")[0]: int(line.split()[-1])
+        for line in lines
+        if line.startswith("budget_cache_lookups_total{")
+    }
+    # NOTE: the prepared queries are shared by the apps of the process, other tests may have prepared them
+    assert counters['cache="search_queries",result="hit"'] >= 2
+    assert counters['cache="sql_compiled",result="hit"'] >= 2
+    assert counters['cache="sql_compiled",result="miss"'] >= 1
+
+
+def test_cache_evictions_and_expirations(app_client: Callable[..., TestClient]):
+    client = app_client(profiling=True, cache_max_size=1, cache_ttl=0)
+    category = client.post("/categories/", json={"name": "groceries"}).json()
+    transaction = {"category_id": category["id"], "amount": 10, "currency": "EURO"}
+    first = client.post("/transactions/", json=transaction).json()
+    second = client.post("/transactions/", json=transaction).json()
+    client.get(f"/transactions/{first['id']}")
+    # expired right away
+    client.get(f"/transactions/{first['id']}")
+    # evicts the first one
+    client.get(f"/transactions/{second['id']}")
+
+    lines = client.get("/metrics").text.splitlines()
+
+    assert 'budget_cache_expirations_total{cache="repositories"} 1' in lines
+    assert 'budget_cache_evictions_total{cache="repositories"} 1' in lines
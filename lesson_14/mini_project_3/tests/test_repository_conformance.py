@@ -0,0 +1,450 @@
+"""
+The behaviour both storage backends must have, every test runs against the
+SQLAlchemy repositories (on the test DB) and the memory ones.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from pytest import FixtureRequest, fixture, mark, raises
+
+from app.constants import Currencies
+from app.main import create_app
+from app.models import CategoryModel, TransactionModel
+from app.repositories.category_repository import CategoryRepository
+from app.repositories.exchange_rate_repository import ExchangeRateRepository
+from app.repositories.memory_repository import (
+    MemoryCategoryRepository,
+    MemoryExchangeRateRepository,
+    MemoryStore,
+    MemorySummaryRepository,
+    MemoryTransactionRepository,
+    MemoryVersionRepository,
+)
+from app.repositories.summary_repository import SummaryRepository
+from app.repositories.transaction_repository import TRANSACTIONS_NOT_FOUND_MSG, TransactionRepository
+from app.repositories.version_repository import VersionRepository
+from app.schemas import (
+    CreateTransaction,
+    TransactionChanges,
+    TransactionFilter,
+    TransactionSearchParams,
+    TransactionSearchRequest,
+)
+from app.settings import Settings
+from tests.test_search_query_plans import FILTER_SHAPES
+
+
+@dataclass
+class Repositories:
+    category: Any
+    transaction: Any
+    summary: Any
+    exchange_rate: Any
+    version: Any
+
+
+@fixture(scope="function", params=["sqlalchemy", "memory"])
+def repositories(request: FixtureRequest) -> Repositories:
+    if request.param == "memory":
+        store = MemoryStore()
+        return Repositories(
+            category=MemoryCategoryRepository(store=store),
+            transaction=MemoryTransactionRepository(store=store),
+            summary=MemorySummaryRepository(store=store),
+            exchange_rate=MemoryExchangeRateRepository(store=store),
+            version=MemoryVersionRepository(store=store),
+        )
+    session = request.getfixturevalue("session")
+    return Repositories(
+        category=CategoryRepository(session=session),
+        transaction=TransactionRepository(session=session),
+        summary=SummaryRepository(session=session),
+        exchange_rate=ExchangeRateRepository(session=session),
+        version=VersionRepository(session=session),
+    )
+
+
+def create_transactions(repositories: Repositories) -> list[int]:
+    """Two categories with transactions of different amounts and currencies."""
+
+    groceries = repositories.category.create_category(name="groceries")
+    entertainment = repositories.category.create_category(name="entertainment")
+    return repositories.transaction.create_transactions(
+        transactions_to_create=[
+            CreateTransaction(category_id=category.id, amount=amount, currency=currency)
+            for category, amount, currency in [
+                (groceries, 100, Currencies.EURO),
+                (groceries, 200, Currencies.EURO),
+                (groceries, 300, Currencies.LIRA),
+                (entertainment, 2500, Currencies.LIRA),
+                (entertainment, 4500, Currencies.ROUBLE),
+            ]
+        ]
+    )
+
+
+def ids(transactions: list) -> list[int]:
+    return sorted(transaction.id for transaction in transactions)
+
+
+def test_categories(repositories: Repositories):
+    groceries = repositories.category.create_category(name="groceries")
+    entertainment = repositories.category.create_category(name="entertainment")
+
+    assert repositories.category.get_categories() == [groceries, entertainment]
+    assert repositories.category.get_category_rows() == [
+        ("groceries", groceries.id),
+        ("entertainment", entertainment.id),
+    ]
+    with raises(repositories.category.CategoryAlreadyExists):
+        repositories.category.create_category(name="groceries")
+
+
+def test_delete_category(repositories: Repositories):
+    create_transactions(repositories)
+    empty = repositories.category.create_category(name="empty")
+    groceries = repositories.category.get_categories()[0]
+
+    assert repositories.category.delete_category(category_id=empty.id) == {"msg": "Category deleted successfully"}
+    assert repositories.category.delete_category(category_id=empty.id) == {"msg": "Category not found"}
+    assert repositories.category.delete_category(category_id=groceries.id)["msg"].startswith("Cannot delete")
+    assert [category.name for category in repositories.category.get_categories()] == ["groceries", "entertainment"]
+
+
+def test_create_and_get_transaction(repositories: Repositories):
+    category = repositories.category.create_category(name="groceries")
+    transaction_to_create = CreateTransaction(category_id=category.id, amount=100, currency=Currencies.EURO)
+
+    transaction = repositories.transaction.create_transaction(transaction_to_create=transaction_to_create)
+
+    assert transaction.model_dump(exclude={"id"}) == transaction_to_create.model_dump()
+    assert repositories.transaction.get_transaction(transaction_id=transaction.id) == transaction
+    with raises(repositories.transaction.TransactionNotFound):
+        repositories.transaction.get_transaction(transaction_id=transaction.id + 1)
+    with raises(repositories.transaction.CategoryNotFound):
+        repositories.transaction.create_transaction(
+            transaction_to_create=transaction_to_create.model_copy(update={"category_id": category.id + 1})
+        )
+
+
+def test_create_transactions_skips_unknown_categories(repositories: Repositories):
+    category = repositories.category.create_category(name="groceries")
+
+    created_ids = repositories.transaction.create_transactions(
+        transactions_to_create=[
+            CreateTransaction(category_id=category_id, amount=100, currency=Currencies.EURO)
+            for category_id in (category.id, category.id + 1, category.id)
+        ]
+    )
+
+    assert created_ids[1] is None
+    assert ids(repositories.transaction.get_all_transactions()) == [created_ids[0], created_ids[2]]
+
+
+def test_update_and_delete_transaction(repositories: Repositories):
+    first_id, *_ = create_transactions(repositories)
+    entertainment = repositories.category.get_categories()[1]
+    update = CreateTransaction(category_id=entertainment.id, amount=1, currency=Currencies.RUPEE)
+
+    updated = repositories.transaction.update_transaction(transaction_id=first_id, transaction_to_update=update)
+    deleted = repositories.transaction.delete_transaction(transaction_id=first_id)
+
+    assert updated.model_dump() == {**update.model_dump(), "id": first_id}
+    assert deleted == {"msg": "Transaction deleted successfully."}
+    with raises(repositories.transaction.TransactionNotFound):
+        repositories.transaction.update_transaction(transaction_id=first_id, transaction_to_update=update)
+    with raises(repositories.transaction.TransactionNotFound):
+        repositories.transaction.delete_transaction(transaction_id=first_id)
+
+
+@mark.parametrize("filters", FILTER_SHAPES, ids=["-".join(filters) or "none" for filters in FILTER_SHAPES])
+def test_search_transactions(repositories: Repositories, filters: tuple[str, ...]):
+    create_transactions(repositories)
+    groceries = repositories.category.get_categories()[0]
+    values = {"category_id": groceries.id, "min_amount": 150, "max_amount": 2500, "currency": Currencies.LIRA}
+    params = TransactionSearchParams(**{name: values[name] for name in filters})
+    expected = [
+        transaction
+        for transaction in repositories.transaction.get_all_transactions()
+        if all(
+            {
+                "category_id": transaction.category_id == params.category_id,
+                "min_amount": transaction.amount >= values["min_amount"],
+                "max_amount": transaction.amount <= values["max_amount"],
+                "currency": transaction.currency == params.currency,
+            }[name]
+            for name in filters
+        )
+    ]
+
+    result = repositories.transaction.search_transactions(params=params)
+    rows = repositories.transaction.search_transaction_rows(params=params)
+
+    if expected:
+        assert ids(result) == ids(expected)
+    else:
+        assert result == {"msg": TRANSACTIONS_NOT_FOUND_MSG}
+    assert sorted(rows, key=lambda row: row[-1]) == [
+        (transaction.category_id, transaction.amount, transaction.currency.value, transaction.id)
+        for transaction in expected
+    ]
+
+
+def test_get_all_transactions_pages(repositories: Repositories):
+    created_ids = create_transactions(repositories)
+
+    page = repositories.transaction.get_all_transactions(limit=2, after_id=created_ids[1])
+    rows = repositories.transaction.get_all_transaction_rows(limit=2, after_id=created_ids[1])
+    batches = list(repositories.transaction.stream_transactions(after_id=created_ids[0], batch_size=3))
+    row_batches = list(repositories.transaction.stream_transaction_rows(limit=4, batch_size=3))
+
+    assert [transaction.id for transaction in page] == created_ids[2:4]
+    assert [row[-1] for row in rows] == created_ids[2:4]
+    assert [[transaction.id for transaction in batch] for batch in batches] == [created_ids[1:4], created_ids[4:]]
+    assert [[row[-1] for row in batch] for batch in row_batches] == [created_ids[:3], created_ids[3:4]]
+
+
+def test_bulk_changes(repositories: Repositories):
+    created_ids = create_transactions(repositories)
+    euros = TransactionFilter(currency=Currencies.EURO)
+    selected = TransactionFilter(ids=[created_ids[0], created_ids[3], 1000], min_amount=200)
+
+    changes = TransactionChanges(amount=1)
+
+    assert repositories.transaction.update_transactions(params=euros, changes=changes, dry_run=True) == 2
+    assert repositories.transaction.update_transactions(params=euros, changes=changes) == 2
+    assert repositories.transaction.delete_transactions(params=selected, dry_run=True) == 1
+    assert repositories.transaction.delete_transactions(params=selected) == 1
+
+    transactions = repositories.transaction.get_all_transactions()
+    assert [(transaction.id, transaction.amount) for transaction in transactions] == [
+        (created_ids[0], 1),
+        (created_ids[1], 1),
+        (created_ids[2], 300),
+        (created_ids[4], 4500),
+    ]
+    with raises(repositories.transaction.CategoryNotFound):
+        repositories.transaction.update_transactions(params=euros, changes=TransactionChanges(category_id=1000))
+
+
+def test_search_transaction_page(repositories: Repositories):
+    create_transactions(repositories)
+    groceries, entertainment = repositories.category.get_categories()
+    expected = sorted(
+        repositories.transaction.get_all_transactions(),
+        key=lambda transaction: (transaction.amount, transaction.id),
+        reverse=True,
+    )
+
+    first = repositories.transaction.search_transaction_page(
+        params=TransactionSearchRequest(order_by="-amount", limit=2, facets=True)
+    )
+    pages = [first]
+    while pages[-1].next_cursor is not None:
+        pages.append(
+            repositories.transaction.search_transaction_page(
+                params=TransactionSearchRequest(order_by="-amount", limit=2, cursor=pages[-1].next_cursor)
+            )
+        )
+    offset = repositories.transaction.search_transaction_page(
+        params=TransactionSearchRequest(order_by="created_at", offset=3, currency=Currencies.LIRA)
+    )
+
+    assert [transaction for page in pages for transaction in page.transactions] == expected
+    assert [len(page.transactions) for page in pages] == [2, 2, 1]
+    assert {page.total for page in pages} == {5}
+    assert first.facets.model_dump(mode="json") == {
+        "currencies": [
+            {"currency": "EURO", "count": 2, "total": 300},
+            {"currency": "LIRA", "count": 2, "total": 2800},
+            {"currency": "ROUBLE", "count": 1, "total": 4500},
+        ],
+        "categories": [
+            {"category_id": groceries.id, "count": 3, "total": 600},
+            {"category_id": entertainment.id, "count": 2, "total": 7000},
+        ],
+    }
+    assert (offset.transactions, offset.total, offset.next_cursor, offset.facets) == ([], 2, None, None)
+    with raises(repositories.transaction.InvalidCursor):
+        repositories.transaction.search_transaction_page(
+            params=TransactionSearchRequest(order_by="amount", limit=2, cursor=first.next_cursor)
+        )
+
+
+def test_export_transaction_rows(repositories: Repositories):
+    create_transactions(repositories)
+    liras = [
+        transaction
+        for transaction in repositories.transaction.get_all_transactions()
+        if transaction.currency == Currencies.LIRA
+    ]
+
+    batches = list(
+        repositories.transaction.export_transaction_rows(
+            params=TransactionSearchParams(currency=Currencies.LIRA),
+            batch_size=1,
+        )
+    )
+
+    assert [len(batch) for batch in batches] == [1, 1]
+    rows = [tuple(row) for batch in batches for row in batch]
+    assert [row[:4] for row in rows] == [
+        (transaction.id, transaction.category_id, transaction.amount, "LIRA") for transaction in liras
+    ]
+    # the text of created_at as SQLite stores it, parsed by the exporters
+    assert all(len(row[4]) == len("2025-01-01 00:00:00.000000") and datetime.fromisoformat(row[4]) for row in rows)
+
+
+def test_converted_summary(repositories: Repositories):
+    create_transactions(repositories)
+    groceries, entertainment = repositories.category.get_categories()
+    repositories.exchange_rate.set_exchange_rate(currency=Currencies.EURO, rate=Decimal("1"))
+    repositories.exchange_rate.set_exchange_rate(currency=Currencies.LIRA, rate=Decimal("0.5"))
+
+    with raises(repositories.summary.ExchangeRateNotFound):
+        repositories.summary.get_converted_summary_per_category(currency=Currencies.EURO)
+
+    repositories.exchange_rate.set_exchange_rate(currency=Currencies.ROUBLE, rate=Decimal("0.25"))
+    summary = repositories.summary.get_converted_summary_per_category(currency=Currencies.EURO)
+
+    assert [rate.model_dump(mode="json") for rate in repositories.exchange_rate.get_exchange_rates()] == [
+        {"currency": "EURO", "rate": "1"},
+        {"currency": "LIRA", "rate": "0.5"},
+        {"currency": "ROUBLE", "rate": "0.25"},
+    ]
+    assert [category.model_dump(mode="json") for category in summary] == [
+        {"id": groceries.id, "currency": "EURO", "total": 450},
+        {"id": entertainment.id, "currency": "EURO", "total": 2375},
+    ]
+    repositories.exchange_rate.delete_exchange_rate(currency=Currencies.ROUBLE)
+    with raises(repositories.exchange_rate.ExchangeRateNotFound):
+        repositories.exchange_rate.delete_exchange_rate(currency=Currencies.ROUBLE)
+
+
+@mark.parametrize("bucket", ["day", "month"])
+def test_range_summary(repositories: Repositories, bucket: str):
+    create_transactions(repositories)
+    batches = repositories.transaction.export_transaction_rows(params=TransactionSearchParams())
+    rows = [row for batch in batches for row in batch]
+    # the buckets come from the stored created_at, so the test does not depend on the current date
+    aggregates = defaultdict(lambda: defaultdict(int))
+    for _, category_id, amount, currency, created_at in rows:
+        day = datetime.fromisoformat(created_at).date()
+        aggregates[day if bucket == "day" else day.replace(day=1)][(category_id, currency)] += amount
+    last_created_at = max(datetime.fromisoformat(row[4]) for row in rows)
+
+    summary = repositories.summary.get_range_summary(bucket=bucket)
+    after = repositories.summary.get_range_summary(start=last_created_at + timedelta(seconds=1), bucket=bucket)
+
+    assert [
+        (
+            bucket_summary.bucket,
+            {
+                (category.id, currency.currency.value): currency.total
+                for category in bucket_summary.categories
+                for currency in category.currencies
+            },
+        )
+        for bucket_summary in summary
+    ] == [(bucket_start, dict(totals)) for bucket_start, totals in sorted(aggregates.items())]
+    assert after == []
+
+
+def test_summary_follows_the_writes(repositories: Repositories):
+    created_ids = create_transactions(repositories)
+    groceries, entertainment = repositories.category.get_categories()
+    repositories.transaction.delete_transaction(transaction_id=created_ids[2])
+    repositories.transaction.update_transactions(
+        params=TransactionFilter(ids=[created_ids[3]]),
+        changes=TransactionChanges(category_id=groceries.id),
+    )
+
+    summary = repositories.summary.get_sumary_per_category()
+
+    assert [category.model_dump(mode="json") for category in summary] == [
+        {
+            "id": groceries.id,
+            "currencies": [{"currency": "EURO", "total": 300}, {"currency": "LIRA", "total": 2500}],
+        },
+        {"id": entertainment.id, "currencies": [{"currency": "ROUBLE", "total": 4500}]},
+    ]
+
+
+def test_versions_change_with_the_writes(repositories: Repositories):
+    tables = (CategoryModel.__tablename__, TransactionModel.__tablename__)
+    before = repositories.version.get_versions(tables=tables)
+
+    category = repositories.category.create_category(name="groceries")
+    after_category = repositories.version.get_versions(tables=tables)
+    repositories.transaction.create_transaction(
+        transaction_to_create=CreateTransaction(category_id=category.id, amount=1, currency=Currencies.EURO)
+    )
+    after_transaction = repositories.version.get_versions(tables=tables)
+
+    assert after_category["categories"] != before["categories"]
+    assert after_category["transactions"] == before["transactions"]
+    assert after_transaction["transactions"] != after_category["transactions"]
+
+
+def test_idempotency_key(repositories: Repositories):
+    category = repositories.category.create_category(name="groceries")
+    transaction = CreateTransaction(category_id=category.id, amount=100, currency=Currencies.EURO)
+
+    created, created_replayed = repositories.transaction.create_transaction_once(
+        transaction_to_create=transaction, idempotency_key="key", ttl=60
+    )
+    replayed, was_replayed = repositories.transaction.create_transaction_once(
+        transaction_to_create=transaction, idempotency_key="key", ttl=60
+    )
+
+    assert (created_replayed, was_replayed) == (False, True)
+    assert replayed == created
+    assert len(repositories.transaction.get_all_transactions()) == 1
+    with raises(repositories.transaction.IdempotencyKeyReused):
+        repositories.transaction.create_transaction_once(
+            transaction_to_create=transaction.model_copy(update={"amount": 1}), idempotency_key="key", ttl=60
+        )
+
+
+# The app with the memory backend
+
+
+def test_memory_app():
+    with TestClient(app=create_app(Settings(storage_backend="memory"))) as client:
+        category = client.post("/categories/", json={"name": "groceries"}).json()
+        duplicate = client.post("/categories/", json={"name": "groceries"})
+        transaction = client.post(
+            "/transactions/",
+            json={"category_id": category["id"], "amount": 100, "currency": "EURO"},
+        ).json()
+        listed = client.get("/transactions/")
+        not_modified = client.get("/transactions/", headers={"If-None-Match": listed.headers["ETag"]})
+        summary = client.get("/summary/").json()
+        page = client.post("/transactions/search", json={"limit": 10, "facets": True})
+        client.put("/rates/EURO", json={"rate": "1"})
+        converted = client.get("/summary/", params={"convert_to": "EURO"})
+        exported = client.get("/transactions/export", params={"format": "csv"})
+        changes = client.get("/changes/")
+
+    assert duplicate.status_code == status.HTTP_409_CONFLICT
+    assert listed.json() == [transaction]
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert summary == [{"id": category["id"], "currencies": [{"currency": "EURO", "total": 100}]}]
+    assert page.json()["transactions"] == [transaction]
+    assert converted.json() == [{"id": category["id"], "currency": "EURO", "total": 100}]
+    assert exported.text.splitlines()[1].startswith(f"{transaction['id']},{category['id']},100,EURO,")
+    assert changes.status_code == status.HTTP_404_NOT_FOUND
+    assert not hasattr(client.app.state, "database_engine")
+
+
+def test_memory_backend_rejects_async_mode_and_unknown_backends():
+    with raises(ValueError):
+        create_app(Settings(storage_backend="memory", async_mode=True))
+    with raises(ValueError):
+        create_app(Settings(storage_backend="redis"))
@@ -0,0 +1,38 @@
+from itertools import product
+
+from pytest import mark
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.constants import Currencies
+from app.prepared_queries import PreparedQueries
+from app.repositories.transaction_repository import SEARCH_QUERIES, SEARCH_ROW_QUERIES
+from app.schemas import TransactionSearchParams
+
+
+FILTER_VALUES = {
+    "category_id": 1,
+    "min_amount": 10,
+    "max_amount": 1000,
+    "currency": Currencies.EURO,
+}
+
+# every combination of present/absent filters, except the one without any filter
+FILTER_SHAPES = [
+    {name: value for name, value, present in zip(FILTER_VALUES, FILTER_VALUES.values(), presence) if present}
+    for presence in product((False, True), repeat=len(FILTER_VALUES))
+    if any(presence)
+]
+
+
+@mark.parametrize("prepared_queries", [SEARCH_QUERIES, SEARCH_ROW_QUERIES], ids=["models", "rows"])
+@mark.parametrize("filters", FILTER_SHAPES, ids=lambda filters: "+".join(filters))
+def test_search_uses_an_index(session: Session, prepared_queries: PreparedQueries, filters: dict):
+    # the prepared statement of the shape (bitmask) of these filters, as the searches run it
+    query, parameters = prepared_queries.get(TransactionSearchParams(**filters))
+    sql = query.params(parameters).compile(dialect=session.get_bind().dialect, compile_kwargs={"literal_binds": True})
+
+    plan = [row.detail for row in session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+    assert any(" INDEX ix_transactions_" in detail for detail in plan), plan
+    assert not [detail for detail in plan if detail.startswith("SCAN transactions")], plan
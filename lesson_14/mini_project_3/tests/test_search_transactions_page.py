@@ -0,0 +1,136 @@
+from datetime import datetime
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from pytest import fixture, mark
+from sqlalchemy.orm import Session
+
+from app.constants import Currencies
+from app.models import CategoryModel, TransactionModel
+
+
+@fixture(scope="function")
+def transactions(
+    session: Session,
+    groceries_category: CategoryModel,
+    entertainment_category: CategoryModel,
+) -> list[TransactionModel]:
+    transactions = [
+        TransactionModel(
+            category_id=[groceries_category, entertainment_category][index % 2].id,
+            amount=(index * 37) % 100,
+            currency=[Currencies.EURO, Currencies.LIRA, Currencies.ROUBLE][index % 3],
+            created_at=datetime(2025, 1, 1 + (index * 7) % 28, index % 24),
+        )
+        for index in range(30)
+    ]
+    session.add_all(transactions)
+    session.flush()
+    return transactions
+
+
+def as_dict(transaction: TransactionModel) -> dict:
+    return {
+        "id": transaction.id,
+        "category_id": transaction.category_id,
+        "amount": transaction.amount,
+        "currency": transaction.currency.value,
+    }
+
+
+def sort_key(order_by: str):
+    name = order_by.removeprefix("-")
+    sign = -1 if order_by.startswith("-") else 1
+    if name == "created_at":
+        return lambda transaction: (sign * transaction.created_at.timestamp(), sign * transaction.id)
+    return lambda transaction: (sign * getattr(transaction, name), sign * transaction.id)
+
+
+@mark.parametrize("order_by", ["id", "-id", "amount", "-amount", "created_at", "-created_at"])
+def test_pages_with_cursor(test_client: TestClient, transactions: list[TransactionModel], order_by: str):
+    pages = []
+    payload = {"order_by": order_by, "limit": 7, "currency": Currencies.EURO}
+    while True:
+        page = test_client.post("/transactions/search", json=payload)
+        assert page.status_code == status.HTTP_200_OK, page.text
+        pages.append(page.json())
+        if pages[-1]["next_cursor"] is None:
+            break
+        payload["cursor"] = pages[-1]["next_cursor"]
+
+    expected = sorted(
+        (transaction for transaction in transactions if transaction.currency == Currencies.EURO),
+        key=sort_key(order_by),
+    )
+    assert [transaction for page in pages for transaction in page["transactions"]] == [
+        as_dict(transaction) for transaction in expected
+    ]
+    assert [len(page["transactions"]) for page in pages] == [7, 3]
+    assert {page["total"] for page in pages} == {10}
+
+
+def test_page_with_offset(test_client: TestClient, transactions: list[TransactionModel]):
+    response = test_client.post("/transactions/search", json={"order_by": "-amount", "limit": 5, "offset": 10})
+
+    expected = sorted(transactions, key=sort_key("-amount"))[10:15]
+    assert response.json()["transactions"] == [as_dict(transaction) for transaction in expected]
+    assert response.json()["total"] == 30
+
+
+def test_facets(test_client: TestClient, transactions: list[TransactionModel], statements: list[str]):
+    response = test_client.post("/transactions/search", json={"min_amount": 20, "facets": True, "limit": 0})
+
+    matching = [transaction for transaction in transactions if transaction.amount >= 20]
+    assert response.json() == {
+        "transactions": [],
+        "total": len(matching),
+        "next_cursor": None,
+        "facets": {
+            "currencies": [
+                {
+                    "currency": currency.value,
+                    "count": sum(transaction.currency == currency for transaction in matching),
+                    "total": sum(transaction.amount for transaction in matching if transaction.currency == currency),
+                }
+                for currency in sorted({transaction.currency for transaction in matching}, key=lambda c: c.value)
+            ],
+            "categories": [
+                {
+                    "category_id": category_id,
+                    "count": sum(transaction.category_id == category_id for transaction in matching),
+                    "total": sum(transaction.amount for transaction in matching if transaction.category_id == category_id),
+                }
+                for category_id in sorted({transaction.category_id for transaction in matching})
+            ],
+        },
+    }
+    # page, total and facets in one statement
+    assert len(statements) == 1
+
+
+def test_nothing_found(test_client: TestClient, transactions: list[TransactionModel]):
+    response = test_client.post("/transactions/search", json={"min_amount": 1000, "facets": True})
+
+    assert response.json() == {
+        "transactions": [],
+        "total": 0,
+        "next_cursor": None,
+        "facets": {"currencies": [], "categories": []},
+    }
+
+
+@mark.parametrize(
+    "payload",
+    [
+        {"limit": 1, "offset": 1, "cursor": "WyJpZCIsIDEsIDFd"},
+        {"limit": 1, "cursor": "not a cursor"},
+        # a cursor of another order
+        {"order_by": "amount", "cursor": "WyJpZCIsIDEsIDFd"},
+        {"order_by": "name"},
+        {"limit": -1},
+    ],
+)
+def test_invalid_page(test_client: TestClient, payload: dict):
+    response = test_client.post("/transactions/search", json=payload)
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT, response.text
@@ -0,0 +1,146 @@
+from collections.abc import Callable, Generator
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from pytest import fixture
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+from app.constants import Currencies
+from app.models import CategoryCurrencyTotalModel
+from app.repositories.summary_repository import SummaryRepository
+from app.repositories.transaction_repository import TransactionRepository
+from app.schemas import TransactionFilter
+from app.summary_index import SummaryIndex
+
+
+@fixture(scope="function")
+def client(app_client: Callable[..., TestClient]) -> TestClient:
+    """A client running the lifespan, which loads the index."""
+
+    return app_client(cache_enabled=False, summary_index=True)
+
+
+@fixture(scope="function")
+def statements(client: TestClient) -> Generator[list[str]]:
+    executed = []
+
+    def listener(connection, cursor, statement, *args) -> None:
+        executed.append(statement)
+
+    engine = client.app.state.database_engine
+    event.listen(engine, "before_cursor_execute", listener)
+    yield executed
+    event.remove(engine, "before_cursor_execute", listener)
+
+
+def create_transaction(client: TestClient, category_id: int, amount: int, currency: str) -> dict:
+    response = client.post("/transactions/", json={"category_id": category_id, "amount": amount, "currency": currency})
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()
+
+
+def sql_summary(client: TestClient) -> list[dict]:
+    with Session(bind=client.app.state.database_engine) as session:
+        summary = SummaryRepository(session=session).get_sumary_per_category()
+    return [category.model_dump(mode="json") for category in summary]
+
+
+def test_summary_follows_the_writes(client: TestClient):
+    groceries = client.post("/categories/", json={"name": "groceries"}).json()
+    entertainment = client.post("/categories/", json={"name": "entertainment"}).json()
+    first = create_transaction(client, groceries["id"], 100, "EURO")
+    create_transaction(client, groceries["id"], 50, "LIRA")
+    create_transaction(client, entertainment["id"], 30, "EURO")
+
+    assert client.get("/summary/").json() == sql_summary(client)
+    assert client.get("/summary/").json()[0] == {
+        "id": groceries["id"],
+        "currencies": [{"currency": "EURO", "total": 100}, {"currency": "LIRA", "total": 50}],
+    }
+
+    client.put(
+        f"/transactions/{first['id']}",
+        json={"category_id": entertainment["id"], "amount": 10, "currency": "EURO"},
+    )
+    assert client.get("/summary/").json() == sql_summary(client)
+
+    client.delete(f"/transactions/{first['id']}")
+    client.patch(
+        "/transactions/",
+        json={"filter": {"category_id": groceries["id"]}, "changes": {"amount": 7}},
+    )
+    summary = client.get("/summary/").json()
+
+    assert summary == sql_summary(client)
+    assert summary[0]["currencies"] == [{"currency": "LIRA", "total": 7}]
+
+
+def test_summary_is_read_from_the_index(client: TestClient, statements: list[str]):
+    category = client.post("/categories/", json={"name": "groceries"}).json()
+    create_transaction(client, category["id"], 100, "EURO")
+    statements.clear()
+
+    response = client.get("/summary/")
+
+    assert response.json() == [{"id": category["id"], "currencies": [{"currency": "EURO", "total": 100}]}]
+    assert not any("category_currency_totals" in statement for statement in statements)
+
+
+def test_writes_of_other_connections_are_read(client: TestClient):
+    """Like the ones of the writer process, which does not refresh the index of the workers."""
+
+    category = client.post("/categories/", json={"name": "groceries"}).json()
+    create_transaction(client, category["id"], 100, "EURO")
+    index: SummaryIndex = client.app.state.summary_index
+    stale = index.snapshot
+    # NOTE: without the index, as another process would
+    with Session(bind=client.app.state.database_engine) as session, session.begin():
+        TransactionRepository(session=session).delete_transactions(params=TransactionFilter(category_id=category["id"]))
+
+    assert client.get("/summary/").json() == []
+    assert index.snapshot.version > stale.version
+
+
+def test_converted_summary_from_the_index(client: TestClient):
+    category = client.post("/categories/", json={"name": "groceries"}).json()
+    create_transaction(client, category["id"], 100, "EURO")
+    create_transaction(client, category["id"], 3, "LIRA")
+    client.put("/rates/EURO", json={"rate": "1"})
+    client.put("/rates/LIRA", json={"rate": "0.5"})
+
+    indexed = client.get("/summary/", params={"convert_to": "EURO"})
+    client.app.state.summary_index.snapshot = None
+    with Session(bind=client.app.state.database_engine) as session:
+        expected = SummaryRepository(session=session).get_converted_summary_per_category(currency=Currencies.EURO)
+
+    assert indexed.status_code == status.HTTP_200_OK
+    assert indexed.json() == [summary.model_dump(mode="json") for summary in expected]
+
+
+def test_verify_rebuilds_a_diverged_index(client: TestClient):
+    category = client.post("/categories/", json={"name": "groceries"}).json()
+    create_transaction(client, category["id"], 100, "EURO")
+    with client.app.state.database_engine.begin() as connection:
+        # NOTE: the version is not bumped, the index does not see this change
+        connection.execute(update(CategoryCurrencyTotalModel).values(total=1))
+
+    (drift,) = client.post("/summary/index/verify").json()
+
+    assert (drift["category_id"], drift["currency"]) == (category["id"], "EURO")
+    assert (drift["stored_total"], drift["expected_total"]) == (100, 1)
+    assert client.post("/summary/index/verify").json() == []
+    assert client.get("/summary/").json()[0]["currencies"] == [{"currency": "EURO", "total": 1}]
+
+
+def test_verify_without_index(test_client: TestClient):
+    response = test_client.post("/summary/index/verify")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_verify_without_index_in_async_mode(app_client: Callable[..., TestClient]):
+    client = app_client(async_mode=True)
+    response = client.post("/summary/index/verify")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,248 @@
+from collections import defaultdict
+from collections.abc import Generator
+from datetime import date, datetime
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from pytest import fixture, mark, raises
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import Session
+
+from app.cache import LRUCache
+from app.commands import main
+from app.constants import Currencies
+from app.database import migrate_database
+from app.models import CategoryModel, TransactionModel
+from app.repositories.archive_repository import ArchiveRepository
+from app.repositories.summary_repository import SummaryRepository
+from app.repositories.transaction_repository import TransactionRepository
+
+
+CREATED_AT = [
+    datetime(2024, 12, 31, 23, 59),
+    datetime(2025, 1, 1),
+    datetime(2025, 1, 15, 10),
+    datetime(2025, 1, 15, 13),
+    datetime(2025, 1, 20, 8),
+    datetime(2025, 2, 10, 12),
+    datetime(2025, 2, 28, 23, 59, 59),
+    datetime(2025, 3, 9, 23),
+    datetime(2025, 3, 10, 5),
+    datetime(2025, 3, 10, 7),
+]
+
+
+def create_transactions(session: Session, categories: list[CategoryModel]) -> list[TransactionModel]:
+    transactions = [
+        TransactionModel(
+            category_id=categories[index % len(categories)].id,
+            amount=(index + 1) * 10,
+            currency=[Currencies.EURO, Currencies.LIRA][index % 2],
+            created_at=created_at,
+        )
+        for index, created_at in enumerate(CREATED_AT)
+    ]
+    session.add_all(transactions)
+    session.flush()
+    return transactions
+
+
+def expected_summary(transactions: list[TransactionModel], start, end, bucket: str) -> list[dict]:
+    totals = defaultdict(int)
+    for transaction in transactions:
+        if (start is None or transaction.created_at >= start) and (end is None or transaction.created_at < end):
+            day = transaction.created_at.date()
+            bucket_start = day if bucket == "day" else day.replace(day=1)
+            totals[(bucket_start, transaction.category_id, transaction.currency)] += transaction.amount
+
+    summary = defaultdict(lambda: defaultdict(list))
+    for (bucket_start, category_id, currency), total in sorted(totals.items()):
+        summary[bucket_start][category_id].append({"currency": currency.value, "total": total})
+    return [
+        {
+            "bucket": bucket_start.isoformat(),
+            "categories": [{"id": category_id, "currencies": currencies} for category_id, currencies in categories.items()],
+        }
+        for bucket_start, categories in summary.items()
+    ]
+
+
+@fixture(scope="function")
+def transactions(
+    session: Session,
+    groceries_category: CategoryModel,
+    entertainment_category: CategoryModel,
+) -> list[TransactionModel]:
+    return create_transactions(session, [groceries_category, entertainment_category])
+
+
+@mark.parametrize("bucket", ["day", "month"])
+@mark.parametrize(
+    "start, end",
+    [
+        (None, None),
+        (datetime(2025, 1, 15, 12), datetime(2025, 3, 10, 6)),
+        (datetime(2025, 1, 1), datetime(2025, 3, 1)),
+        (datetime(2025, 1, 15, 9), datetime(2025, 1, 15, 14)),
+        (datetime(2025, 1, 2), None),
+        (None, datetime(2025, 2, 28, 23)),
+        (datetime(2025, 3, 1), datetime(2025, 1, 1)),
+    ],
+)
+def test_range_summary(test_client: TestClient, transactions: list[TransactionModel], start, end, bucket: str):
+    params = {"bucket": bucket}
+    if start is not None:
+        params["from"] = start.isoformat()
+    if end is not None:
+        params["to"] = end.isoformat()
+
+    response = test_client.get("/summary/", params=params)
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == expected_summary(transactions, start, end, bucket)
+
+
+def test_range_summary_with_timezone(test_client: TestClient, transactions: list[TransactionModel]):
+    # 2025-01-15T14:00+02:00 is 12:00 UTC
+    response = test_client.get("/summary/", params={"from": "2025-01-15T14:00:00+02:00", "to": "2025-01-16T00:00:00Z"})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == expected_summary(transactions, datetime(2025, 1, 15, 12), datetime(2025, 1, 16), "month")
+
+
+def test_range_summary_follows_updates(session: Session, test_client: TestClient, transactions: list[TransactionModel]):
+    transactions[5].created_at = datetime(2025, 1, 3)
+    transactions[6].amount = 1
+    session.delete(transactions[7])
+    session.flush()
+    remaining = [transaction for index, transaction in enumerate(transactions) if index != 7]
+
+    response = test_client.get("/summary/", params={"bucket": "month"})
+
+    assert response.json() == expected_summary(remaining, None, None, "month")
+    assert SummaryRepository(session=session).verify_totals() == []
+
+
+def test_convert_to_can_not_be_combined(test_client: TestClient):
+    response = test_client.get("/summary/", params={"convert_to": Currencies.EURO, "bucket": "day"})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT, response.text
+
+
+# Archives
+
+
+@fixture(scope="function")
+def archive_session(tmp_path) -> Generator[Session]:
+    """The archives are files next to the database, so these tests use their own database file."""
+
+    database_url = f"sqlite:///{tmp_path / 'budget.db'}"
+    engine = create_engine(database_url)
+    migrate_database(engine)
+    try:
+        with Session(bind=engine, expire_on_commit=False) as session:
+            session.info["database_url"] = database_url
+            yield session
+    finally:
+        engine.dispose()
+
+
+def test_archive(archive_session: Session, tmp_path):
+    categories = [CategoryModel(name="groceries"), CategoryModel(name="entertainment")]
+    archive_session.add_all(categories)
+    archive_session.flush()
+    transactions = create_transactions(archive_session, categories)
+    archive_session.commit()
+    summary_repository = SummaryRepository(session=archive_session)
+    before = summary_repository.get_range_summary()
+
+    assert main(["archive", "--database-url", archive_session.info["database_url"], "--before", "2025-02"]) == 0
+
+    assert (tmp_path / "budget.archive-2024-12-31-2025-02-01.db").exists()
+    assert archive_session.execute(select(func.count()).select_from(TransactionModel)).scalar() == 5
+    assert summary_repository.verify_totals() == []
+    assert summary_repository.get_range_summary() == before
+
+    attached = []
+    event.listen(
+        archive_session.get_bind(),
+        "before_cursor_execute",
+        lambda connection, cursor, statement, *args: attached.append(statement.startswith("ATTACH")),
+    )
+
+    for start, end in [
+        (datetime(2025, 1, 15, 12), datetime(2025, 3, 10, 6)),
+        (datetime(2024, 12, 31, 12), datetime(2025, 1, 1, 12)),
+        (datetime(2025, 2, 1), datetime(2025, 3, 10, 6)),
+    ]:
+        attached.clear()
+        summary = [
+            bucket.model_dump(mode="json")
+            for bucket in summary_repository.get_range_summary(start=start, end=end, bucket="day")
+        ]
+
+        assert summary == expected_summary(transactions, start, end, "day")
+        # the archive is only attached when a partial day falls inside of it
+        assert any(attached) == (start < datetime(2025, 2, 1))
+
+
+def test_archive_invalidates_the_cached_transactions(archive_session: Session):
+    categories = [CategoryModel(name="groceries")]
+    archive_session.add_all(categories)
+    archive_session.flush()
+    transactions = create_transactions(archive_session, categories)
+    archive_session.commit()
+    cache = LRUCache(max_size=100, ttl=60)
+    transaction_repository = TransactionRepository(session=archive_session, cache=cache)
+    for transaction in transactions:
+        transaction_repository.get_transaction(transaction_id=transaction.id)
+
+    ArchiveRepository(session=archive_session, cache=cache).create_archive(before=date(2025, 2, 1))
+    archive_session.commit()
+
+    with raises(TransactionRepository.TransactionNotFound):
+        transaction_repository.get_transaction(transaction_id=transactions[0].id)
+    assert transaction_repository.get_transaction(transaction_id=transactions[-1].id).id == transactions[-1].id
+
+
+def test_archive_does_not_reuse_the_ids(archive_session: Session):
+    categories = [CategoryModel(name="groceries")]
+    archive_session.add_all(categories)
+    archive_session.flush()
+    transactions = create_transactions(archive_session, categories)
+    archive_session.commit()
+
+    # archives every transaction, the newest ones included
+    assert main(["archive", "--database-url", archive_session.info["database_url"], "--before", "2025-04"]) == 0
+    transaction = TransactionModel(category_id=categories[0].id, amount=10, currency=Currencies.EURO)
+    archive_session.add(transaction)
+    archive_session.commit()
+
+    assert transaction.id > max(transaction.id for transaction in transactions)
+
+
+def test_archive_nothing(archive_session: Session):
+    assert main(["archive", "--database-url", archive_session.info["database_url"], "--before", "2025-02"]) == 0
+
+    assert archive_session.execute(select(func.count()).select_from(TransactionModel)).scalar() == 0
+
+
+def test_rebuild_with_archives(archive_session: Session):
+    categories = [CategoryModel(name="groceries")]
+    archive_session.add_all(categories)
+    archive_session.flush()
+    transactions = create_transactions(archive_session, categories)
+    archive_session.commit()
+    assert main(["archive", "--database-url", archive_session.info["database_url"], "--before", "2025-02"]) == 0
+    summary_repository = SummaryRepository(session=archive_session)
+
+    summary_repository.rebuild_totals()
+
+    assert summary_repository.verify_totals() == []
+    assert [bucket.model_dump(mode="json") for bucket in summary_repository.get_range_summary()] == expected_summary(
+        transactions, None, None, "month"
+    )
+    assert summary_repository.get_range_summary(start=datetime(2025, 1, 1), end=datetime(2025, 1, 15, 12)) == (
+        summary_repository.get_range_summary(start=datetime(2025, 1, 1), end=datetime(2025, 1, 15, 12), bucket="month")
+    )
+    assert date(2025, 1, 1) in {bucket.bucket for bucket in summary_repository.get_range_summary(bucket="day")}
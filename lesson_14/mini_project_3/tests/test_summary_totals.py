@@ -0,0 +1,65 @@
+from sqlalchemy import create_engine, insert, update
+from sqlalchemy.orm import Session
+
+from app.constants import Currencies
+from app.models import CategoryCurrencyTotalModel, CategoryModel, DbModel, TransactionModel
+from app.repositories.summary_repository import SummaryRepository
+
+
+def test_no_drift(
+    session: Session,
+    groceries_first_euro_transaction: TransactionModel,
+    entertainment_first_lira_transaction: TransactionModel,
+):
+    assert SummaryRepository(session=session).verify_totals() == []
+
+
+def test_rebuild_fixes_drift(
+    session: Session,
+    groceries_category: CategoryModel,
+    groceries_first_euro_transaction: TransactionModel,
+    groceries_second_euro_transaction: TransactionModel,
+):
+    summary_repository = SummaryRepository(session=session)
+    session.execute(
+        update(CategoryCurrencyTotalModel)
+        .filter(CategoryCurrencyTotalModel.category_id == groceries_category.id)
+        .values(total=1)
+    )
+
+    (drift,) = summary_repository.verify_totals()
+
+    assert drift.category_id == groceries_category.id
+    assert drift.currency == Currencies.EURO
+    assert drift.stored_total == 1
+    assert drift.expected_total == groceries_first_euro_transaction.amount + groceries_second_euro_transaction.amount
+
+    summary_repository.rebuild_totals()
+
+    assert summary_repository.verify_totals() == []
+
+
+def test_totals_are_backfilled_for_existing_databases(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'budget.db'}")
+    try:
+        tables = [CategoryModel.__table__, TransactionModel.__table__]
+        DbModel.metadata.create_all(bind=engine, tables=tables)
+        with engine.begin() as connection:
+            connection.execute(insert(CategoryModel).values(id=1, name="groceries"))
+            connection.execute(
+                insert(TransactionModel),
+                [
+                    {"category_id": 1, "amount": 100, "currency": Currencies.EURO},
+                    {"category_id": 1, "amount": 200, "currency": Currencies.EURO},
+                ],
+            )
+
+        DbModel.metadata.create_all(bind=engine)
+
+        with Session(bind=engine) as session:
+            (summary,) = SummaryRepository(session=session).get_sumary_per_category()
+            assert summary.id == 1
+            assert [(total.currency, total.total) for total in summary.currencies] == [(Currencies.EURO, 300)]
+            assert SummaryRepository(session=session).verify_totals() == []
+    finally:
+        engine.dispose()
@@ -0,0 +1,57 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.constants import Currencies
+from app.models import CategoryModel, TransactionModel
+
+
+def test_update_not_found(test_client: TestClient, groceries_category: CategoryModel):
+    payload = {"category_id": groceries_category.id, "amount": 10, "currency": Currencies.EURO}
+
+    response = test_client.put("/transactions/123", json=payload)
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND, response.text
+
+
+def test_update_transaction(
+    test_client: TestClient,
+    session: Session,
+    groceries_first_euro_transaction: TransactionModel,
+    entertainment_category: CategoryModel,
+    statements: list[str],
+):
+    transaction_id = groceries_first_euro_transaction.id
+    payload = {"category_id": entertainment_category.id, "amount": 300, "currency": Currencies.LIRA}
+
+    response = test_client.put(f"/transactions/{transaction_id}", json=payload)
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == {"id": transaction_id, **payload}
+    # the UPDATE ... RETURNING, the version bump and the change log
+    assert len(statements) == 3
+    # the transaction already in the identity map is updated too
+    assert (groceries_first_euro_transaction.amount, groceries_first_euro_transaction.currency) == (300, Currencies.LIRA)
+
+
+def test_delete_not_found(test_client: TestClient):
+    response = test_client.delete("/transactions/123")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND, response.text
+
+
+def test_delete_transaction(
+    test_client: TestClient,
+    session: Session,
+    groceries_first_euro_transaction: TransactionModel,
+    statements: list[str],
+):
+    transaction_id = groceries_first_euro_transaction.id
+
+    response = test_client.delete(f"/transactions/{transaction_id}")
+
+    assert response.json() == {"msg": "Transaction deleted successfully."}
+    assert len(statements) == 3
+    assert session.execute(select(TransactionModel).filter(TransactionModel.id == transaction_id)).scalar() is None
+    assert test_client.delete(f"/transactions/{transaction_id}").status_code == status.HTTP_404_NOT_FOUND
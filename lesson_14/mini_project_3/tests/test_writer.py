@@ -0,0 +1,170 @@
+from collections.abc import Callable, Generator
+from queue import Queue
+from threading import Thread
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from pytest import fixture, raises
+from sqlalchemy import Engine, event
+
+from app.cache import LRUCache
+from app.constants import Currencies
+from app.database import create_database_engine, migrate_database
+from app.main import create_app
+from app.repositories.category_repository import CategoryRepository
+from app.repositories.transaction_repository import TransactionRepository
+from app.schemas import CreateTransaction
+from app.settings import Settings
+from app.writer import Writer, WriterClient
+
+
+@fixture(scope="function")
+def settings(database_url: str) -> Settings:
+    return Settings(database_url=database_url)
+
+
+@fixture(scope="function")
+def engine(settings: Settings) -> Generator[Engine]:
+    engine = create_database_engine(settings)
+    migrate_database(engine)
+    yield engine
+    engine.dispose()
+
+
+@fixture(scope="function")
+def commits(engine: Engine) -> list[None]:
+    committed = []
+    event.listen(engine, "commit", lambda connection: committed.append(None))
+    return committed
+
+
+@fixture(scope="function")
+def requests() -> Queue:
+    return Queue()
+
+
+@fixture(scope="function")
+def responses() -> Queue:
+    return Queue()
+
+
+@fixture(scope="function")
+def writer(engine: Engine, requests: Queue, responses: Queue) -> Generator[Writer]:
+    """A writer running in a thread instead of its own process."""
+
+    writer = Writer(engine=engine, requests=requests, responses=[responses], max_wait=0.01)
+    thread = Thread(target=writer.run)
+    thread.start()
+    yield writer
+    requests.put(None)
+    thread.join()
+
+
+@fixture(scope="function")
+def writer_client(requests: Queue, responses: Queue) -> Generator[WriterClient]:
+    client = WriterClient(requests=requests, responses=responses)
+    client.start()
+    yield client
+    client.stop()
+
+
+def test_batch_is_committed_once(engine: Engine, commits: list[None], requests: Queue, responses: Queue):
+    writer = Writer(engine=engine, requests=requests, responses=[responses])
+    new_transaction = CreateTransaction(category_id=1, amount=100, currency=Currencies.EURO)
+
+    writer.write(
+        [
+            (0, 0, CategoryRepository, "create_category", {"name": "groceries"}),
+            (0, 1, CategoryRepository, "create_category", {"name": "groceries"}),
+            (0, 2, TransactionRepository, "create_transaction", {"transaction_to_create": new_transaction}),
+            (0, 3, TransactionRepository, "delete_transaction", {"transaction_id": 10}),
+        ]
+    )
+
+    results = [responses.get_nowait() for _ in range(4)]
+    assert [(call_id, succeeded) for call_id, succeeded, _ in results] == [(0, True), (1, False), (2, True), (3, False)]
+    assert results[0][2].name == "groceries"
+    assert results[2][2].amount == 100
+    assert isinstance(results[3][2], TransactionRepository.TransactionNotFound)
+    assert len(commits) == 1
+    assert (writer.stats.batches, writer.stats.writes, writer.stats.failed) == (1, 4, 2)
+
+
+def test_waiting_writes_are_batched(engine: Engine, commits: list[None], requests: Queue, responses: Queue):
+    writer = Writer(engine=engine, requests=requests, responses=[responses], max_batch_size=2)
+    for call_id in range(5):
+        requests.put((0, call_id, CategoryRepository, "create_category", {"name": f"category {call_id}"}))
+    requests.put(None)
+
+    writer.run()
+
+    assert [responses.get_nowait()[:2] for _ in range(5)] == [(call_id, True) for call_id in range(5)]
+    assert writer.stats.batches == 3
+    assert len(commits) == 3
+
+
+def test_writes_are_sent_to_the_writer(writer: Writer, writer_client: WriterClient, engine: Engine):
+    category = CategoryRepository(session=None, writer=writer_client).create_category(name="groceries")
+
+    with raises(CategoryRepository.CategoryNotFound):
+        TransactionRepository(session=None, writer=writer_client).create_transaction(
+            transaction_to_create=CreateTransaction(category_id=category.id + 1, amount=1, currency=Currencies.EURO)
+        )
+    assert writer.stats.writes == 2
+
+
+def test_app_only_reads(
+    engine: Engine,
+    writer: Writer,
+    writer_client: WriterClient,
+    app_client: Callable[..., TestClient],
+):
+    begins = []
+
+    def record_begin(connection, cursor, statement, *args) -> None:
+        if statement.startswith("BEGIN"):
+            begins.append(statement)
+
+    client = app_client(writer=writer_client)
+    event.listen(client.app.state.database_engine, "before_cursor_execute", record_begin)
+    category = client.post("/categories/", json={"name": "groceries"}).json()
+    created = client.post("/transactions/", json={"category_id": category["id"], "amount": 1, "currency": "EURO"})
+    updated = client.put(
+        f"/transactions/{created.json()['id']}",
+        json={"category_id": category["id"], "amount": 2, "currency": "EURO"},
+    )
+    missing = client.delete("/transactions/1000")
+    duplicated = client.post("/categories/", json={"name": "groceries"})
+    transactions = client.get("/transactions/")
+
+    assert created.status_code == status.HTTP_201_CREATED
+    assert updated.json()["amount"] == 2
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+    assert duplicated.status_code == status.HTTP_409_CONFLICT
+    assert [transaction["amount"] for transaction in transactions.json()] == [2]
+    assert writer.stats.writes == 5
+    # the writes were done by the writer, the app only began read-only transactions
+    assert begins and set(begins) == {"BEGIN DEFERRED"}
+
+
+def test_writer_is_not_supported_in_async_mode(settings: Settings, writer_client: WriterClient):
+    with raises(ValueError):
+        create_app(Settings(database_url=settings.database_url, async_mode=True), writer=writer_client)
+
+
+def test_idempotent_writes_are_sent_to_the_writer(writer: Writer, writer_client: WriterClient):
+    category = CategoryRepository(session=None, writer=writer_client).create_category(name="groceries")
+    transaction_repository = TransactionRepository(session=None, writer=writer_client, idempotency_cache=LRUCache())
+    transaction = CreateTransaction(category_id=category.id, amount=1, currency=Currencies.EURO)
+
+    created, replayed = transaction_repository.create_transaction_once(
+        transaction_to_create=transaction, idempotency_key="retried", ttl=60
+    )
+    # NOTE: answered by the idempotency cache, without a write
+    cached, cached_replayed = transaction_repository.create_transaction_once(
+        transaction_to_create=transaction, idempotency_key="retried", ttl=60
+    )
+
+    assert (replayed, cached_replayed) == (False, True)
+    assert cached == created
+    assert writer.stats.writes == 2